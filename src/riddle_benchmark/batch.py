@@ -0,0 +1,272 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from litellm.llms.base_llm.base_utils import type_to_response_format_param
+from litellm.types.utils import ModelResponse
+from pydantic import BaseModel, ValidationError
+
+from riddle_benchmark.dataset.loader import RiddleSelection
+from riddle_benchmark.dataset.schema import Riddle
+from riddle_benchmark.evaluation.evaluator import Evaluator
+from riddle_benchmark.evaluation.metrics import summarize_request_metrics, summarize_scores
+from riddle_benchmark.journal import record_key
+from riddle_benchmark.models.base import Model, parse_response
+from riddle_benchmark.models.schemas import SimpleResponse, ThinkingResponse
+from riddle_benchmark.models.stats import RequestStats
+from riddle_benchmark.utils import get_logger, get_provider
+
+logger = get_logger(__name__)
+
+# Providers whose batch endpoint accepts the OpenAI batch file format
+BATCH_PROVIDERS = ["openai", "default"]
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Batch requests are billed at half the synchronous price
+BATCH_PRICE_RATIO = 0.5
+
+
+class BatchManifest(BaseModel):
+    """
+    Everything `ingest_batch_output` needs to turn a batch output file into a report.
+
+    Attributes:
+        model: Name of the model (LiteLLM format, e.g., "openai/gpt-4o").
+        use_reason: Whether the response schema includes the reason.
+        prompt: The prompt of the requests.
+        extra_params: Additional model-specific parameters of the requests.
+        samples: Number of requests per riddle.
+        data_dir: Dataset the requests were built from.
+        selection: Subset of the dataset that was exported.
+        riddle_ids: IDs of the exported riddles, in dataset order.
+        created_at: Time of the export.
+    """
+
+    model: str
+    use_reason: bool = False
+    prompt: str | None = None
+    extra_params: dict[str, Any] | None = None
+    samples: int = 1
+    data_dir: str | None = None
+    selection: dict[str, Any] | None = None
+    riddle_ids: list[str]
+    created_at: str
+
+
+def manifest_path_for(requests_path: Path) -> Path:
+    """Return the path of the manifest written next to a batch request file."""
+    return requests_path.with_suffix(".manifest.json")
+
+
+def make_custom_id(riddle_id: str, sample: int) -> str:
+    """Return the ID that ties a batch request to its riddle and sample."""
+    return f"{riddle_id}#{sample}"
+
+
+def parse_custom_id(custom_id: str) -> tuple[str, int]:
+    """
+    Parse an ID made by make_custom_id.
+
+    Raises:
+        ValueError: If the ID is malformed.
+    """
+    riddle_id, sep, sample = custom_id.rpartition("#")
+    if not sep or not sample.isdigit():
+        raise ValueError(f"Invalid custom_id: {custom_id!r}")
+    return riddle_id, int(sample)
+
+
+def _response_schema(use_reason: bool) -> type[ThinkingResponse] | type[SimpleResponse]:
+    return ThinkingResponse if use_reason else SimpleResponse
+
+
+def export_batch(
+    riddles: list[Riddle],
+    output_path: Path,
+    model_name: str,
+    use_reason: bool = False,
+    prompt: str | None = None,
+    extra_params: dict[str, Any] | None = None,
+    samples: int = 1,
+    data_dir: Path | None = None,
+    selection: RiddleSelection | None = None,
+) -> BatchManifest:
+    """
+    Write the requests of a benchmark run as an OpenAI batch input file.
+
+    The messages and response schema are the ones Model.solve sends synchronously. A
+    manifest with the run parameters is written next to the file (see manifest_path_for).
+
+    Args:
+        riddles: Riddles to export.
+        output_path: Path of the batch input file (JSONL).
+        model_name: Name of the model (LiteLLM format).
+        use_reason: Whether to include the reason in the response schema.
+        prompt: Prompt of the requests.
+        extra_params: Additional model-specific parameters added to each request body.
+        samples: Number of requests per riddle.
+        data_dir: Dataset the riddles were loaded from, recorded in the manifest.
+        selection: Subset of the dataset the riddles were selected with, recorded in the manifest.
+
+    Returns:
+        The manifest.
+
+    Raises:
+        ValueError: If the provider has no batch endpoint in the OpenAI format.
+    """
+    provider = get_provider(model_name)
+    if provider not in BATCH_PROVIDERS:
+        raise ValueError(f"Batch export is not supported for provider {provider!r} (supported: openai)")
+
+    model = Model(model_name, **(extra_params or {}))
+    response_format = type_to_response_format_param(_response_schema(use_reason))
+    body_model = model_name.split("/", 1)[1] if provider != "default" else model_name
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for riddle in riddles:
+            messages = model.build_messages(riddle, prompt)
+            for sample in range(samples):
+                request = {
+                    "custom_id": make_custom_id(riddle.id, sample),
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": body_model,
+                        "messages": messages,
+                        "response_format": response_format,
+                        **model.kwargs,
+                    },
+                }
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+    manifest = BatchManifest(
+        model=model_name,
+        use_reason=use_reason,
+        prompt=prompt,
+        extra_params=extra_params,
+        samples=samples,
+        data_dir=str(data_dir) if data_dir is not None else None,
+        selection=selection.model_dump(exclude_none=True) if selection else None,
+        riddle_ids=[riddle.id for riddle in riddles],
+        created_at=datetime.now().isoformat(),
+    )
+    with open(manifest_path_for(output_path), "w", encoding="utf-8") as f:
+        f.write(manifest.model_dump_json(indent=2))
+    return manifest
+
+
+def load_batch_output(path: Path) -> dict[tuple[str, int], dict[str, Any]]:
+    """
+    Read an OpenAI batch output (or error) file.
+
+    Args:
+        path: The JSONL file returned by the provider.
+
+    Returns:
+        The output lines keyed by (riddle ID, sample index). Malformed lines are skipped.
+    """
+    outputs: dict[tuple[str, int], dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                output = json.loads(line)
+                outputs[parse_custom_id(output["custom_id"])] = output
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping malformed batch output line {line_number} in {path}")
+    return outputs
+
+
+def _output_error(output: dict[str, Any]) -> str | None:
+    """Return the error of a batch output line, or None if the request succeeded."""
+    error = output.get("error")
+    if error:
+        return error.get("message", str(error)) if isinstance(error, dict) else str(error)
+    response = output.get("response") or {}
+    status_code = response.get("status_code")
+    if status_code != 200:
+        body = response.get("body") or {}
+        message = body.get("error", {}).get("message") if isinstance(body.get("error"), dict) else None
+        return f"Batch request failed with status {status_code}" + (f": {message}" if message else "")
+    return None
+
+
+def ingest_batch_output(
+    manifest: BatchManifest, outputs: dict[tuple[str, int], dict[str, Any]], riddles: list[Riddle]
+) -> dict[str, Any]:
+    """
+    Evaluate the outputs of a batch and build a report in the format of BenchmarkRunner.
+
+    Args:
+        manifest: The manifest written by export_batch.
+        outputs: The output lines from load_batch_output.
+        riddles: The exported riddles with their current acceptable answers (see DataLoader.load_metadata).
+
+    Returns:
+        A dictionary containing the summary and detailed results.
+    """
+    schema = _response_schema(manifest.use_reason)
+    answer_index = Evaluator.build_index({riddle.id: riddle.acceptable_answers for riddle in riddles})
+
+    results: list[dict[str, Any]] = []
+    for riddle in riddles:
+        for sample in range(manifest.samples):
+            fields: dict[str, Any] = {"riddle_id": riddle.id, **({"sample": sample} if manifest.samples > 1 else {})}
+            stats = RequestStats()
+            output = outputs.get((riddle.id, sample))
+            if output is None:
+                results.append({**fields, "error": "Missing from the batch output", "is_correct": False})
+                continue
+
+            error = _output_error(output)
+            if error is None:
+                try:
+                    body = output["response"]["body"]
+                    stats.attempts = 1
+                    stats.record_response(ModelResponse(**body))
+                    if stats.cost is not None:
+                        stats.cost *= BATCH_PRICE_RATIO
+                    content = body["choices"][0]["message"]["content"]
+                    if content is None:
+                        raise ValueError("Model returned empty content")
+                    parsed = parse_response(content, schema)
+                except (KeyError, IndexError, TypeError, ValueError, ValidationError) as e:
+                    error = str(e)
+            if error is not None:
+                results.append({**fields, "error": error, "is_correct": False, "metrics": stats.model_dump()})
+                continue
+
+            normalized_prediction, is_correct = Evaluator.score(parsed.answer, answer_index[riddle.id])
+            results.append(
+                {
+                    **fields,
+                    "question": riddle.question,
+                    "prediction": parsed.answer,
+                    "reason": getattr(parsed, "reason", None),
+                    "normalized_prediction": normalized_prediction,
+                    "acceptable_answers": riddle.acceptable_answers,
+                    "is_correct": is_correct,
+                    "metrics": stats.model_dump(),
+                }
+            )
+
+    results.sort(key=record_key)
+    summary = {
+        "model": manifest.model,
+        "timestamp": datetime.now().isoformat(),
+        "parameters": {
+            "use_reason": manifest.use_reason,
+            "prompt": manifest.prompt,
+            "extra_params": manifest.extra_params,
+            "model_kwargs": manifest.extra_params or {},
+            "selection": manifest.selection,
+            "batch": True,
+        },
+        **summarize_scores(results, [riddle.id for riddle in riddles], samples=manifest.samples),
+        "metrics": summarize_request_metrics(
+            [record["metrics"] for record in results if "metrics" in record], elapsed=0.0, completed=0
+        ),
+    }
+    return {"summary": summary, "details": results}
@@ -0,0 +1,216 @@
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from riddle_benchmark.dataset.schema import Riddle
+from riddle_benchmark.models.fake import FAKE_MODEL
+from riddle_benchmark.runner import BenchmarkRunner
+from riddle_benchmark.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class HarnessScenario(BaseModel):
+    """
+    A workload driving BenchmarkRunner against the fake provider.
+
+    Attributes:
+        name: Name of the scenario.
+        riddles: Number of synthetic riddles.
+        images: Number of distinct images the riddles cycle through.
+        concurrency: Maximum number of concurrent requests. None uses the adaptive limiter.
+        samples: Number of solves per riddle.
+        latency: Median response time of the fake provider in seconds.
+        latency_sigma: Sigma of the log-normal latency distribution.
+        error_rate: Probability of an injected 503 error.
+        rate_limit_rate: Probability of an injected 429 error.
+    """
+
+    name: str
+    riddles: int = 2000
+    images: int = 16
+    concurrency: int | None = 64
+    samples: int = 1
+    latency: float = 0.0
+    latency_sigma: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+
+
+DEFAULT_SCENARIOS = [
+    # Zero provider latency: everything measured is harness overhead
+    HarnessScenario(name="overhead"),
+    HarnessScenario(name="latency", latency=0.05, latency_sigma=0.5),
+    HarnessScenario(name="samples", riddles=500, samples=4, latency=0.02),
+    HarnessScenario(name="rate-limited", riddles=1000, concurrency=None, latency=0.02, rate_limit_rate=0.05),
+    HarnessScenario(name="errors", riddles=500, concurrency=32, latency=0.02, error_rate=0.02),
+]
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def make_png(width: int, height: int, shade: int = 0) -> bytes:
+    """
+    Encode a solid grayscale PNG image.
+
+    Args:
+        width: Width in pixels.
+        height: Height in pixels.
+        shade: Gray level (0-255).
+
+    Returns:
+        The PNG bytes.
+    """
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    rows = b"".join(b"\x00" + bytes([shade]) * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(rows))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def make_synthetic_riddles(count: int, image_dir: Path, images: int = 16) -> list[Riddle]:
+    """
+    Write synthetic images and build riddles that the fake provider answers correctly.
+
+    Args:
+        count: Number of riddles.
+        image_dir: Directory where the images are written.
+        images: Number of distinct images the riddles cycle through.
+
+    Returns:
+        The riddles.
+    """
+    image_paths = []
+    for i in range(images):
+        path = image_dir / f"synthetic_{i:03d}.png"
+        path.write_bytes(make_png(256, 256, shade=i % 256))
+        image_paths.append(path)
+
+    return [
+        Riddle(
+            id=f"synthetic_{i:06d}",
+            image_path=image_paths[i % images],
+            question=f"Synthetic riddle {i}",
+            acceptable_answers=["fake"],
+        )
+        for i in range(count)
+    ]
+
+
+def _max_rss_mb() -> float | None:
+    """Peak resident set size of the process in MiB, if the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+async def run_scenario(scenario: HarnessScenario, image_dir: Path, trace_memory: bool = False) -> dict[str, Any]:
+    """
+    Run one scenario and measure the harness.
+
+    Args:
+        scenario: The workload to run.
+        image_dir: Directory where the synthetic images are written.
+        trace_memory: Whether to measure the peak Python heap with tracemalloc (slows the run down).
+
+    Returns:
+        A report with the throughput (requests/sec), latency and queue wait, slot utilization,
+        scheduler overhead per request (time a concurrency slot sat idle) and memory.
+    """
+    riddles = make_synthetic_riddles(scenario.riddles, image_dir, images=scenario.images)
+    runner = BenchmarkRunner(
+        model_name=FAKE_MODEL,
+        extra_params={
+            "latency": scenario.latency,
+            "latency_sigma": scenario.latency_sigma,
+            "error_rate": scenario.error_rate,
+            "rate_limit_rate": scenario.rate_limit_rate,
+        },
+    )
+
+    if trace_memory:
+        tracemalloc.start()
+    started_at = time.perf_counter()
+    results = await runner.run(concurrency=scenario.concurrency, riddles=riddles, samples=scenario.samples)
+    elapsed = time.perf_counter() - started_at
+    peak_traced = None
+    if trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    details = results["details"]
+    metrics = results["summary"]["metrics"]
+    busy_time = sum(record["metrics"]["latency"] or 0.0 for record in details)
+    requests = len(details)
+
+    report: dict[str, Any] = {
+        "scenario": scenario.model_dump(),
+        "requests": requests,
+        "errors": sum(1 for record in details if "error" in record),
+        "retried_requests": metrics["retried_requests"],
+        "elapsed": elapsed,
+        "requests_per_sec": requests / elapsed if elapsed > 0 else None,
+        "latency": metrics["latency"],
+        "queue_wait": metrics["queue_wait"],
+        "slot_utilization": None,
+        "scheduler_overhead_ms": None,
+        "peak_traced_mb": peak_traced / (1024 * 1024) if peak_traced is not None else None,
+        "max_rss_mb": _max_rss_mb(),
+    }
+    if scenario.concurrency is not None and requests:
+        capacity = elapsed * scenario.concurrency
+        report["slot_utilization"] = busy_time / capacity
+        report["scheduler_overhead_ms"] = max(capacity - busy_time, 0.0) / requests * 1000
+    return report
+
+
+async def run_suite(scenarios: list[HarnessScenario] | None = None, trace_memory: bool = False) -> list[dict[str, Any]]:
+    """
+    Run the harness benchmark scenarios one after another.
+
+    Args:
+        scenarios: Scenarios to run. Defaults to DEFAULT_SCENARIOS.
+        trace_memory: Whether to measure the peak Python heap of each scenario.
+
+    Returns:
+        The report of each scenario.
+    """
+    reports = []
+    with tempfile.TemporaryDirectory(prefix="riddle_bench_") as tmp:
+        for scenario in scenarios or DEFAULT_SCENARIOS:
+            logger.info(f"Running harness scenario: {scenario.name}")
+            reports.append(await run_scenario(scenario, Path(tmp), trace_memory=trace_memory))
+    return reports
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Format a scenario report as a single log line."""
+
+    def fmt(value: float | None, spec: str) -> str:
+        return "-" if value is None else format(value, spec)
+
+    return (
+        f"{report['scenario']['name']}: {report['requests']} req in {report['elapsed']:.2f}s "
+        f"({fmt(report['requests_per_sec'], '.1f')} req/s), "
+        f"latency p50/p99 {fmt(report['latency']['p50'], '.3f')}/{fmt(report['latency']['p99'], '.3f')}s, "
+        f"utilization {fmt(report['slot_utilization'], '.1%')}, "
+        f"overhead {fmt(report['scheduler_overhead_ms'], '.2f')}ms/req, "
+        f"errors {report['errors']}, retried {report['retried_requests']}, "
+        f"max RSS {fmt(report['max_rss_mb'], '.0f')}MiB"
+    )
@@ -0,0 +1,176 @@
+from typing import Any
+
+import litellm
+from pydantic import BaseModel, Field
+
+from riddle_benchmark.models.errors import BudgetExceededError
+from riddle_benchmark.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class SpendBudget(BaseModel):
+    """
+    Spending limits of a run (or of a whole sweep).
+
+    Attributes:
+        max_cost: Maximum total cost in USD, from the LiteLLM price table. None means unlimited.
+        max_tokens: Maximum total tokens (prompt + completion) reported by the providers. None means unlimited.
+    """
+
+    max_cost: float | None = Field(default=None, gt=0)
+    max_tokens: int | None = Field(default=None, gt=0)
+
+
+class SpendReservation:
+    """Projected cost and tokens of one request, held by the tracker while the request is in flight."""
+
+    __slots__ = ("model_name", "cost", "tokens")
+
+    def __init__(self, model_name: str, cost: float, tokens: int):
+        self.model_name = model_name
+        self.cost = cost
+        self.tokens = tokens
+
+
+class SpendTracker:
+    """
+    Tracks the spend of the requests against a budget and refuses to start requests beyond it.
+
+    Before a request is sent, its cost and tokens are projected and reserved: the projection is
+    the larger of the estimate from the prompt and the completion allowance (priced with the
+    LiteLLM table) and the mean actual spend of the model's requests so far, which accounts for
+    reasoning tokens. A request is refused if the spend so far, the reservations of the requests
+    in flight and its projection would exceed the budget. From then on the budget is exhausted
+    and every new request is refused, so that a run stops instead of filling the remaining budget
+    with whichever requests happen to be cheap. The reservation is replaced by the actual usage
+    and cost once the response arrives, and released if the request fails.
+    """
+
+    def __init__(self, budget: SpendBudget):
+        """
+        Initialize the tracker.
+
+        Args:
+            budget: The spending limits, possibly shared by several models.
+        """
+        self.budget = budget
+        self.spent_cost = 0.0
+        self.spent_tokens = 0
+        self.reserved_cost = 0.0
+        self.reserved_tokens = 0
+        self.refused = 0
+        self.exhausted = False
+        # Per model: requests settled, their total cost and tokens, and unit prices from the table
+        self._requests: dict[str, int] = {}
+        self._costs: dict[str, float] = {}
+        self._tokens: dict[str, int] = {}
+        self._prices: dict[str, tuple[float, float] | None] = {}
+
+    def reserve(self, model_name: str, prompt_tokens: int, completion_tokens: int) -> SpendReservation:
+        """
+        Reserve the projected spend of a request about to be sent.
+
+        Args:
+            model_name: The LiteLLM model name.
+            prompt_tokens: Estimated prompt tokens of the request.
+            completion_tokens: Completion allowance of the request (max_tokens or the default).
+
+        Returns:
+            The reservation, to be passed to settle or release.
+
+        Raises:
+            BudgetExceededError: If the request would exceed the budget, or the budget is already exhausted.
+        """
+        cost, tokens = self.project(model_name, prompt_tokens, completion_tokens)
+        budget = self.budget
+        over_cost = budget.max_cost is not None and self.spent_cost + self.reserved_cost + cost > budget.max_cost
+        over_tokens = (
+            budget.max_tokens is not None and self.spent_tokens + self.reserved_tokens + tokens > budget.max_tokens
+        )
+        if self.exhausted or over_cost or over_tokens:
+            self.refused += 1
+            if not self.exhausted:
+                self.exhausted = True
+                logger.warning(
+                    f"Spend budget exhausted (spent ${self.spent_cost:.4f} and {self.spent_tokens} tokens, "
+                    f"${self.reserved_cost:.4f} and {self.reserved_tokens} tokens in flight): "
+                    "no new requests are sent"
+                )
+            raise BudgetExceededError(
+                f"Spend budget exhausted (max cost: {budget.max_cost}, max tokens: {budget.max_tokens})"
+            )
+
+        self.reserved_cost += cost
+        self.reserved_tokens += tokens
+        return SpendReservation(model_name, cost, tokens)
+
+    def settle(self, reservation: SpendReservation, tokens: int | None, cost: float | None) -> None:
+        """
+        Replace a reservation with the actual spend of the request.
+
+        Args:
+            reservation: The reservation of the request.
+            tokens: Total tokens reported by the provider. The reserved tokens are kept if None.
+            cost: Cost of the response. The reserved cost is kept if None (e.g., the model is not priced).
+        """
+        self.release(reservation)
+        tokens = reservation.tokens if tokens is None else tokens
+        cost = reservation.cost if cost is None else cost
+        self.spent_tokens += tokens
+        self.spent_cost += cost
+
+        model_name = reservation.model_name
+        self._requests[model_name] = self._requests.get(model_name, 0) + 1
+        self._tokens[model_name] = self._tokens.get(model_name, 0) + tokens
+        self._costs[model_name] = self._costs.get(model_name, 0.0) + cost
+
+    def release(self, reservation: SpendReservation) -> None:
+        """Drop the reservation of a request that failed before a response arrived."""
+        self.reserved_cost -= reservation.cost
+        self.reserved_tokens -= reservation.tokens
+
+    def project(self, model_name: str, prompt_tokens: int, completion_tokens: int) -> tuple[float, int]:
+        """
+        Project the cost and tokens of a request (see the class description).
+
+        Returns:
+            The projected cost in USD (0 if the model is neither priced nor observed) and tokens.
+        """
+        tokens = prompt_tokens + completion_tokens
+        cost = 0.0
+        prices = self._unit_prices(model_name)
+        if prices is not None:
+            cost = prices[0] * prompt_tokens + prices[1] * completion_tokens
+
+        requests = self._requests.get(model_name)
+        if requests:
+            tokens = max(tokens, -(-self._tokens[model_name] // requests))
+            cost = max(cost, self._costs[model_name] / requests)
+        return cost, tokens
+
+    def summary(self) -> dict[str, Any]:
+        """Return the limits, the spend so far and the number of refused requests."""
+        return {
+            **self.budget.model_dump(),
+            "spent_cost": self.spent_cost,
+            "spent_tokens": self.spent_tokens,
+            "exhausted": self.exhausted,
+            "refused_requests": self.refused,
+        }
+
+    def _unit_prices(self, model_name: str) -> tuple[float, float] | None:
+        """Return the prompt and completion price per token of a model, or None if it is not priced."""
+        if model_name not in self._prices:
+            try:
+                prices = litellm.cost_per_token(model=model_name, prompt_tokens=1, completion_tokens=1)
+            except Exception as e:
+                logger.debug(f"Could not price {model_name}: {e}")
+                prices = None
+            if prices is None and self.budget.max_cost is not None:
+                logger.warning(
+                    f"{model_name} is not in the LiteLLM price table: its cost is only counted "
+                    "when the provider reports it"
+                )
+            self._prices[model_name] = prices
+        return self._prices[model_name]
@@ -1,23 +1,47 @@
 import argparse
 import asyncio
+import contextlib
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from dotenv import load_dotenv
 
-from riddle_benchmark.runner import BenchmarkRunner
-from riddle_benchmark.utils import get_assets_path, get_logger, get_prompt_assets_path
+# Only lightweight modules are imported here so that --help and argument errors return
+# immediately; LiteLLM, tenacity, tqdm and the pydantic models are imported by the commands
+# that use them (see tests/test_cli.py for the startup budget).
+from riddle_benchmark.concurrency import parse_concurrency
+from riddle_benchmark.dataset.packed import PACK_SUFFIX
+from riddle_benchmark.journal import (
+    RecordKey,
+    ResultJournal,
+    completed_records,
+    find_journal,
+    journal_path_for,
+    load_journal,
+)
+from riddle_benchmark.models.cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_BYTES, CacheMode, ResponseCache
+from riddle_benchmark.models.errors import DEFAULT_BREAKER_THRESHOLD
+from riddle_benchmark.models.images import DEFAULT_IMAGE_CACHE_MAX_BYTES, ImageFormat, configure_image_cache
+from riddle_benchmark.profiling import get_profiler
+from riddle_benchmark.utils import get_assets_path, get_logger, load_prompt
+from riddle_benchmark.warehouse import DEFAULT_WAREHOUSE_PATH, ResultsWarehouse
+
+if TYPE_CHECKING:
+    from riddle_benchmark.budget import SpendTracker
+    from riddle_benchmark.dataset.loader import RiddleSelection
+    from riddle_benchmark.dataset.preprocess import ImagePreprocessor
+    from riddle_benchmark.models.policy import RequestPolicy
 
 logger = get_logger(__name__)
 
+PROFILE_CAPTURES = ["cprofile", "tracemalloc"]
 
-def main() -> None:
-    # .env ファイルをロード
-    load_dotenv()
 
-    parser = argparse.ArgumentParser(description="Run the Riddle Benchmark.")
-    parser.add_argument("--model", type=str, default="gpt-4o", help="The name of the model to benchmark.")
+def _add_common_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments shared by the single-model run and the sweep."""
     parser.add_argument("--reason", action="store_true", help="Include reason in the response schema.")
     parser.add_argument(
         "--prompt",
@@ -31,79 +55,1106 @@ def main() -> None:
         type=str,
         help='Additional model-specific parameters as JSON string (e.g., \'{"reasoning_effort": "high"}\').',
     )
+    parser.add_argument(
+        "--prompt-cache",
+        action="store_true",
+        help="Send the prompt as a system message shared by all riddles so that providers can cache it "
+        "(marked with cache_control for Anthropic and Bedrock). Cached prompt tokens are reported.",
+    )
     parser.add_argument(
         "--output-dir",
         type=str,
         default=None,
         help="Directory to save the results file. If not specified, saves to the current directory.",
     )
+    parser.add_argument(
+        "--db",
+        type=str,
+        default=None,
+        help=f"Also add the results to this SQLite results database (e.g., {DEFAULT_WAREHOUSE_PATH}).",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        choices=[mode.value for mode in CacheMode],
+        default=CacheMode.OFF.value,
+        help="Response cache mode: read (serve hits, store misses), write (always query and overwrite), "
+        "readonly (serve hits, never store) or off.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Directory of the response cache (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+        help="Maximum size of the response cache in MiB. Least recently used entries are evicted.",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Answer only from the response cache and never call the provider. Uncached riddles are errors.",
+    )
+    parser.add_argument(
+        "--image-cache-mb",
+        type=int,
+        default=DEFAULT_IMAGE_CACHE_MAX_BYTES // (1024 * 1024),
+        help="Memory budget in MiB for encoded images shared across retries and models.",
+    )
+    parser.add_argument(
+        "--image-max-edge",
+        type=_positive_int,
+        default=None,
+        help="Downscale images whose longer edge exceeds this many pixels before sending them.",
+    )
+    parser.add_argument(
+        "--image-format",
+        type=str,
+        choices=[image_format.value for image_format in ImageFormat],
+        default=None,
+        help="Re-encode images to this format before sending them (default: keep the original format).",
+    )
+    parser.add_argument(
+        "--image-quality",
+        type=int,
+        choices=range(1, 101),
+        metavar="1-100",
+        default=None,
+        help="Encoder quality of --image-format jpeg or webp.",
+    )
+    parser.add_argument(
+        "--image-variant-dir",
+        type=str,
+        default=None,
+        help="Directory where derived images are cached, keyed by the source image and the options above "
+        "(default: images/ under --cache-dir).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=_positive_float,
+        default=None,
+        help="Seconds after which an attempt is abandoned and retried (default: no timeout).",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=_positive_float,
+        default=None,
+        help="Seconds after which a riddle fails, including retries (default: no deadline).",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate of any request slower than the p95 of the recent latencies of the model "
+        "and keep the first response, to cut tail latency.",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=DEFAULT_BREAKER_THRESHOLD,
+        help="Consecutive hard failures (authentication, unknown model, exhausted retries) after which the "
+        f"model's remaining requests fail immediately (default: {DEFAULT_BREAKER_THRESHOLD}). 0 disables it.",
+    )
+    parser.add_argument(
+        "--samples",
+        type=_positive_int,
+        default=1,
+        help="Number of independent solves per riddle. With more than one, pass@k and bootstrap "
+        "confidence intervals are reported.",
+    )
+    parser.add_argument(
+        "--max-cost",
+        type=_positive_float,
+        default=None,
+        help="Spend budget in USD (from the LiteLLM price table), shared by all models of a sweep. No new "
+        "request is sent once the spend so far plus the projected cost of the request would exceed it; the "
+        "remaining riddles are marked as unfinished and can be solved later with --resume.",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=_positive_int,
+        default=None,
+        help="Budget of total tokens (prompt + completion) reported by the providers, enforced like --max-cost. "
+        "Not the completion limit of each request (see --extra-params).",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        nargs="*",
+        choices=PROFILE_CAPTURES,
+        default=None,
+        help="Time each stage of the harness (loading, encoding, parsing, scoring, ...) and save the breakdown "
+        "as profile_<timestamp>.json next to the results. Add 'cprofile' for a cProfile capture (also saved "
+        "as .prof) and 'tracemalloc' for the allocations of each stage (slower).",
+    )
+    _add_dataset_arguments(parser)
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        help="Journal (.jsonl) of an interrupted run, or a directory containing them, to resume. "
+        "Answered riddles are skipped and errored ones are solved again.",
+    )
+
+
+def _add_dataset_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments that choose the dataset and the riddles to benchmark."""
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=None,
+        help="Dataset directory containing metadata.jsonl, or a packed dataset file. Defaults to the bundled assets.",
+    )
+    parser.add_argument("--ids", type=str, nargs="+", default=None, help="Benchmark only these riddle IDs.")
+    parser.add_argument("--limit", type=_positive_int, default=None, help="Benchmark at most this many riddles.")
+    parser.add_argument(
+        "--sample",
+        type=_positive_int,
+        default=None,
+        help="Benchmark a random subset of this many riddles (see --seed). Not to be confused with --samples.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of --sample (default: 0).")
+    parser.add_argument(
+        "--shard",
+        type=_shard_type,
+        default=None,
+        help="Benchmark only shard i of n ('i/n', 0-based) of the selected riddles, e.g. to split a run "
+        "across machines. Merge the results afterwards with the merge subcommand.",
+    )
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for a positive integer."""
+    try:
+        parsed = int(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid positive integer: {value!r}") from e
+    if parsed < 1:
+        raise argparse.ArgumentTypeError(f"invalid positive integer: {value!r}")
+    return parsed
+
+
+def _positive_float(value: str) -> float:
+    """argparse type for a positive number (e.g., seconds)."""
+    try:
+        parsed = float(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid positive number: {value!r}") from e
+    if not parsed > 0:
+        raise argparse.ArgumentTypeError(f"invalid positive number: {value!r}")
+    return parsed
+
+
+def _concurrency_type(value: str) -> int | None:
+    """argparse type for `--concurrency`: "auto" (None) or a positive integer."""
+    try:
+        return parse_concurrency(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            f"invalid concurrency: {value!r} (expected 'auto' or a positive integer)"
+        ) from e
+
+
+def _shard_type(value: str) -> tuple[int, int]:
+    """Argument type for the `--shard` option ("i/n")."""
+    from riddle_benchmark.dataset.loader import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def _build_selection(args: argparse.Namespace) -> "RiddleSelection | None":
+    """Build the dataset selection from the subsetting options (None selects every riddle)."""
+    from riddle_benchmark.dataset.loader import RiddleSelection
+
+    if args.ids is None and args.limit is None and args.sample is None and args.shard is None:
+        return None
+    selection = RiddleSelection(ids=args.ids, limit=args.limit, sample=args.sample, seed=args.seed, shard=args.shard)
+    logger.info(f"Dataset selection: {selection.model_dump(exclude_none=True)}")
+    return selection
+
+
+def _build_request_policy(args: argparse.Namespace) -> "RequestPolicy | None":
+    """Build the request timeouts, hedging and circuit breaker from the command line options (None for defaults)."""
+    breaker_threshold = args.breaker_threshold if args.breaker_threshold > 0 else None
+    if (
+        args.timeout is None
+        and args.deadline is None
+        and not args.hedge
+        and breaker_threshold == DEFAULT_BREAKER_THRESHOLD
+    ):
+        return None
+
+    from riddle_benchmark.models.policy import RequestPolicy
+
+    return RequestPolicy(
+        timeout=args.timeout, deadline=args.deadline, hedge=args.hedge, breaker_threshold=breaker_threshold
+    )
+
+
+def _build_image_preprocessor(args: argparse.Namespace) -> "ImagePreprocessor | None":
+    """Build the image preprocessing stage from the command line options (None sends the original images)."""
+    if args.image_max_edge is None and args.image_format is None and args.image_quality is None:
+        return None
+
+    from riddle_benchmark.dataset.preprocess import ImagePreprocessor, ImageVariant
+
+    variant = ImageVariant(max_edge=args.image_max_edge, format=args.image_format, quality=args.image_quality)
+    cache_dir = Path(args.image_variant_dir) if args.image_variant_dir else Path(args.cache_dir) / "images"
+    logger.info(f"Image variant: {variant.name} (cache: {cache_dir})")
+    return ImagePreprocessor(variant, cache_dir)
+
+
+def _build_spend_tracker(args: argparse.Namespace) -> "SpendTracker | None":
+    """Build the spend budget from `--max-cost` and `--max-tokens` (None if neither is set)."""
+    if args.max_cost is None and args.max_tokens is None:
+        return None
+
+    from riddle_benchmark.budget import SpendBudget, SpendTracker
+
+    return SpendTracker(SpendBudget(max_cost=args.max_cost, max_tokens=args.max_tokens))
+
+
+def _parse_json_object(value: str | None, option: str) -> dict[str, Any] | None:
+    """
+    Parse a JSON object given on the command line.
+
+    Returns:
+        The parsed dictionary, or None if the value is not given.
+
+    Raises:
+        ValueError: If the value is not a valid JSON object.
+    """
+    if not value:
+        return None
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in {option}: {e}") from e
+    if not isinstance(parsed, dict):
+        raise ValueError(f"{option} must be a valid JSON object")
+    return parsed
+
+
+def _build_response_cache(args: argparse.Namespace) -> ResponseCache | None:
+    """Create the response cache from the command line options, or None if disabled."""
+    if not args.replay and args.cache == CacheMode.OFF:
+        return None
+    response_cache = ResponseCache(
+        cache_dir=Path(args.cache_dir),
+        mode=CacheMode(args.cache),
+        max_bytes=args.cache_max_mb * 1024 * 1024,
+        replay=args.replay,
+    )
+    logger.info(f"Response cache: {response_cache.cache_dir} (mode: {response_cache.mode}, replay: {args.replay})")
+    return response_cache
+
+
+def _start_profile(args: argparse.Namespace) -> None:
+    """Start the stage profiler if `--profile` is given."""
+    if args.profile is None:
+        return
+    get_profiler().start(cprofile="cprofile" in args.profile, trace_memory="tracemalloc" in args.profile)
+
+
+def _save_profile(args: argparse.Namespace) -> None:
+    """Stop the stage profiler started by `--profile` and save its breakdown next to the results."""
+    profiler = get_profiler()
+    if not profiler.enabled:
+        return
+    report = profiler.stop()
+    output_dir = Path(args.output_dir or ".")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    profile_path = output_dir / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(profile_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    if "cprofile" in report:
+        profiler.dump_cprofile(profile_path.with_suffix(".prof"))
+
+    logger.info("--- ステージ別の所要時間 ---")
+    for name, stage in report["stages"].items():
+        allocated = f", 確保 {stage['allocated'] / 1024:.0f} KiB" if stage["allocated"] is not None else ""
+        logger.info(
+            f"{name}: 合計 {stage['total']:.3f}s / {stage['count']} 回 (平均 {stage['mean'] * 1000:.3f}ms){allocated}"
+        )
+    if report["overhead_per_request"] is not None:
+        logger.info(f"ハーネスのオーバーヘッド: {report['overhead_per_request'] * 1000:.3f}ms / リクエスト")
+    logger.info(f"プロファイルは {profile_path} に保存されました。")
+
+
+def _open_warehouse(db: str | None) -> contextlib.AbstractContextManager[ResultsWarehouse | None]:
+    """Open the results database given by `--db`, or a null context if the option is not set."""
+    return ResultsWarehouse(Path(db)) if db else contextlib.nullcontext()
+
+
+def _build_output_path(model_name: str, output_dir: str | None) -> Path:
+    """Return the path of the results file for a model."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Remove provider prefix if present (e.g. "gemini/gemini-1.5-pro" -> "gemini-1.5-pro")
+    model_name_for_file = model_name.split("/")[-1]
+
+    # 出力パスの決定
+    default_filename = f"results_{model_name_for_file}_{timestamp}.json"
+    if output_dir:
+        output_dir_path = Path(output_dir)
+        output_dir_path.mkdir(parents=True, exist_ok=True)
+        return output_dir_path / default_filename
+    return Path(default_filename)
+
+
+def _prepare_journal(
+    model_name: str, output_path: Path, resume: str | None
+) -> tuple[Path, dict[RecordKey, dict[str, Any]]]:
+    """
+    Decide which journal a run appends to and which answers it reuses.
+
+    Args:
+        model_name: Name of the model.
+        output_path: Path of the results file of this run.
+        resume: The `--resume` option: a journal file, a directory of journals, or None.
+
+    Returns:
+        The journal path (the resumed journal, or a new one next to the results file)
+        and the answered records to reuse keyed by (riddle ID, sample index).
+    """
+    if resume:
+        resume_path = Path(resume)
+        journal_path = find_journal(resume_path, model_name) if resume_path.is_dir() else resume_path
+        if journal_path is not None and journal_path.exists():
+            resumed = completed_records(load_journal(journal_path))
+            logger.info(f"{model_name}: {journal_path} から {len(resumed)} 件の回答を再開します")
+            return journal_path, resumed
+        logger.warning(f"{model_name}: 再開するジャーナルが見つかりません: {resume_path}")
+    return journal_path_for(output_path), {}
+
+
+def _log_summary(summary: dict[str, Any], label: str | None = None) -> None:
+    """Log a short summary of a benchmark run, with the label of its configuration in a grid."""
+    logger.info("--- 結果サマリー ---")
+    logger.info(f"モデル: {summary['model']}")
+    if label is not None and label != summary["model"]:
+        logger.info(f"条件: {label}")
+    if "samples" not in summary:
+        logger.info(f"正解数: {summary['correct_answers']} / {summary['total_questions']}")
+        logger.info(f"正答率: {summary['accuracy']:.2%}")
+    else:
+        low, high = summary["accuracy_ci"]
+        logger.info(f"サンプル数: {summary['samples']} / 問")
+        logger.info(f"正解数: {summary['correct_answers']} / {summary['total_samples']}")
+        logger.info(f"正答率: {summary['accuracy']:.2%} (95%信頼区間: {low:.2%} - {high:.2%})")
+        logger.info(", ".join(f"pass@{k}: {value:.2%}" for k, value in summary["pass_at_k"].items()))
+
+    metrics = summary.get("metrics")
+    if metrics:
+        latency = metrics["latency"]
+        if latency["p50"] is not None:
+            logger.info(
+                f"レイテンシ: p50 {latency['p50']:.2f}s / p95 {latency['p95']:.2f}s / p99 {latency['p99']:.2f}s"
+            )
+        if metrics["throughput"] is not None:
+            logger.info(f"スループット: {metrics['throughput']:.2f} req/s")
+        if metrics.get("hedged_requests"):
+            logger.info(f"ヘッジしたリクエスト: {metrics['hedged_requests']}")
+        if metrics.get("shared_requests"):
+            logger.info(f"他の条件と共有したリクエスト: {metrics['shared_requests']}")
+        if metrics.get("cached_tokens") and metrics["prompt_tokens"]:
+            logger.info(
+                f"キャッシュ済みプロンプトトークン: {metrics['cached_tokens']} / {metrics['prompt_tokens']} "
+                f"({metrics['cached_tokens'] / metrics['prompt_tokens']:.1%})"
+            )
+        if metrics["total_cost"] is not None:
+            logger.info(f"コスト: ${metrics['total_cost']:.4f}")
+        if metrics.get("image_bytes") and metrics["requests"]:
+            logger.info(f"画像サイズ: 平均 {metrics['image_bytes'] / metrics['requests'] / 1024:.1f} KiB / リクエスト")
+    budget = summary.get("budget")
+    if budget:
+        limits = [
+            f"${budget['spent_cost']:.4f} / ${budget['max_cost']:.4f}" if budget["max_cost"] is not None else None,
+            f"{budget['spent_tokens']} / {budget['max_tokens']} トークン" if budget["max_tokens"] is not None else None,
+        ]
+        logger.info(f"予算: {', '.join(limit for limit in limits if limit)}")
+        if budget["unfinished"]:
+            logger.info(f"予算を超えるため送信しなかったサンプル: {budget['unfinished']}")
+
+
+def _log_comparison(comparison: dict[str, Any]) -> None:
+    """Log the pairwise decisions of a sequential comparison."""
+    logger.info("--- 比較結果 ---")
+    logger.info(
+        f"使用した問題: {comparison['riddles_used']} / {comparison['riddles_available']} "
+        f"({'早期終了' if comparison['stopped_early'] else '全問'}, リクエスト数 {comparison['requests']})"
+    )
+    if comparison.get("budget_exhausted"):
+        logger.warning("予算を使い切ったため比較を打ち切りました")
+    for pair in comparison["pairs"]:
+        first, second = pair["models"]
+        counts = f"{first} のみ正解 {pair['wins']} / {second} のみ正解 {pair['losses']}, p = {pair['p_value']:.4f}"
+        if pair["decided"]:
+            logger.info(f"{first} vs {second}: {pair['winner']} が優位 ({counts})")
+        else:
+            logger.info(f"{first} vs {second}: 判定できず ({counts})")
 
-    args = parser.parse_args()
+
+def run_main(argv: list[str]) -> None:
+    """Benchmark a single model."""
+    parser = argparse.ArgumentParser(description="Run the Riddle Benchmark.")
+    parser.add_argument("--model", type=str, default="gpt-4o", help="The name of the model to benchmark.")
+    parser.add_argument(
+        "--concurrency",
+        type=_concurrency_type,
+        default=5,
+        help="Maximum number of concurrent requests, or 'auto' to adapt it to the provider's latency "
+        "and rate-limit errors.",
+    )
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute budget of the model.")
+    parser.add_argument(
+        "--tpm", type=float, default=None, help="Tokens-per-minute budget (prompt + completion) of the model."
+    )
+    _add_common_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    from riddle_benchmark.ratelimit import RateLimit, RateLimiter
+    from riddle_benchmark.runner import BenchmarkRunner
 
     # Parse extra_params if provided
-    extra_params = None
-    if args.extra_params:
-        try:
-            extra_params = json.loads(args.extra_params)
-            if not isinstance(extra_params, dict):
-                logger.error("--extra-params must be a valid JSON object")
-                return
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in --extra-params: {e}")
-            return
+    try:
+        extra_params = _parse_json_object(args.extra_params, "--extra-params")
+    except ValueError as e:
+        logger.error(str(e))
+        return
 
     logger.info("ベンチマークを開始します...")
     logger.info(f"(Model: {args.model}, Reason: {args.reason}, Prompt: {args.prompt})")
     if extra_params:
         logger.info(f"Extra params: {extra_params}")
 
-    # data_dir は assets ディレクトリを指定 (core.pyのヘルパーを利用)
-    assets_dir = get_assets_path()
-
-    prompt = None
-    if args.prompt and args.prompt != "0":
-        prompt_filename = f"{int(args.prompt):02d}.txt"
-        prompt_path = get_prompt_assets_path() / prompt_filename
-        if prompt_path.exists():
-            prompt = prompt_path.read_text(encoding="utf-8")
-        else:
-            logger.warning(f"プロンプトファイルが見つかりません: {prompt_path}")
+    # data_dir は assets ディレクトリ（またはパック済みデータセット）を指定
+    assets_dir = Path(args.data_dir) if args.data_dir else get_assets_path()
 
+    configure_image_cache(args.image_cache_mb * 1024 * 1024)
     runner = BenchmarkRunner(
         model_name=args.model,
         data_dir=assets_dir,
+        selection=_build_selection(args),
         use_reason=args.reason,
-        prompt=prompt,
+        prompt=load_prompt(args.prompt),
         extra_params=extra_params,
+        response_cache=_build_response_cache(args),
+        rate_limiter=RateLimiter(RateLimit(rpm=args.rpm, tpm=args.tpm)) if args.rpm or args.tpm else None,
+        prompt_cache=args.prompt_cache,
+        request_policy=_build_request_policy(args),
+        image_preprocessor=_build_image_preprocessor(args),
+        spend=_build_spend_tracker(args),
     )
 
+    output_path = _build_output_path(args.model, args.output_dir)
+    journal_path, resumed = _prepare_journal(args.model, output_path, args.resume)
+    logger.info(f"Journal: {journal_path}")
+
     try:
-        results = asyncio.run(runner.run())
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        # Remove provider prefix if present (e.g. "gemini/gemini-1.5-pro" -> "gemini-1.5-pro")
-        model_name_for_file = args.model.split("/")[-1]
-
-        # 出力パスの決定
-        default_filename = f"results_{model_name_for_file}_{timestamp}.json"
-        if args.output_dir:
-            output_dir = Path(args.output_dir)
-            output_dir.mkdir(parents=True, exist_ok=True)
-            output_path = output_dir / default_filename
-        else:
-            output_path = Path(default_filename)
+        _start_profile(args)
+        try:
+            with ResultJournal(journal_path) as journal:
+                results = asyncio.run(
+                    runner.run(concurrency=args.concurrency, journal=journal, resumed=resumed, samples=args.samples)
+                )
+        finally:
+            # Also when the run fails or is interrupted: that is often when the profile is wanted
+            _save_profile(args)
 
-        runner.save_report(output_path)
+        with _open_warehouse(args.db) as warehouse:
+            runner.save_report(output_path, warehouse)
         logger.info(f"完了しました。結果は {output_path} に保存されました。")
 
         # 簡易サマリー表示
-        summary = results["summary"]
-        logger.info("--- 結果サマリー ---")
-        logger.info(f"モデル: {summary['model']}")
-        logger.info(f"正解数: {summary['correct_answers']} / {summary['total_questions']}")
-        logger.info(f"正答率: {summary['accuracy']:.2%}")
+        _log_summary(results["summary"])
+
+    except Exception as e:
+        logger.error(f"実行中にエラーが発生しました: {e}", exc_info=True)
+
+
+def sweep_main(argv: list[str]) -> None:
+    """Benchmark several models concurrently in one process."""
+    from pydantic import ValidationError
+
+    from riddle_benchmark.evaluation.metrics import DEFAULT_CONFIDENCE
+    from riddle_benchmark.ratelimit import parse_rate_limits
+    from riddle_benchmark.sweep import (
+        DEFAULT_COMPARE_BATCH,
+        DEFAULT_PROVIDER_CONCURRENCY,
+        MAJOR_MODELS,
+        SweepRunner,
+        build_sweep_models,
+        load_sweep_grid,
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="riddle-benchmark sweep", description="Run the Riddle Benchmark for several models concurrently."
+    )
+    parser.add_argument(
+        "--models",
+        type=str,
+        nargs="+",
+        default=MAJOR_MODELS,
+        help="Names of the models to benchmark. Defaults to the major models listed in the README.",
+    )
+    parser.add_argument(
+        "--grid",
+        type=str,
+        default=None,
+        help="JSON file describing a grid of models, prompts, reason settings and extra parameters "
+        '(e.g., {"models": [...], "prompts": ["1", "2"], "reason": [false, true], '
+        '"extra_params": [{"reasoning_effort": "low"}, {"reasoning_effort": "high"}]}). Every combination '
+        "is benchmarked in this process and identical requests are sent once. Replaces --models, "
+        "--reasoning-effort, --model-params, --prompt and --reason.",
+    )
+    parser.add_argument(
+        "--reasoning-effort",
+        type=str,
+        default="none",
+        help="reasoning_effort for every model that supports it (e.g., low, medium, high). 'none' disables it.",
+    )
+    parser.add_argument(
+        "--model-params",
+        type=str,
+        help='Per-model parameters as JSON object keyed by model name (e.g., \'{"openai/gpt-5": {"seed": 1}}\').',
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=_concurrency_type,
+        default=DEFAULT_PROVIDER_CONCURRENCY,
+        help="Maximum number of concurrent requests per provider, or 'auto' to adapt it to each provider's "
+        "latency and rate-limit errors.",
+    )
+    parser.add_argument(
+        "--provider-limits",
+        type=str,
+        help="Concurrency overrides per provider as JSON object (e.g., '{\"bedrock\": 2}').",
+    )
+    parser.add_argument(
+        "--rate-limits",
+        type=str,
+        help="Requests/tokens-per-minute budgets as JSON object keyed by model name or provider "
+        '(e.g., \'{"openai": {"rpm": 500, "tpm": 200000}, "gemini/gemini-2.5-pro": {"rpm": 150}}\').',
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Only decide which model is better: solve shuffled riddles in batches and stop as soon as a "
+        "sequential test on the paired outcomes reaches --confidence for every pair of models. "
+        "The selected riddles are the maximum budget.",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=DEFAULT_CONFIDENCE,
+        help=f"Confidence of the --compare decisions (default: {DEFAULT_CONFIDENCE}).",
+    )
+    parser.add_argument(
+        "--compare-batch",
+        type=_positive_int,
+        default=DEFAULT_COMPARE_BATCH,
+        help=f"Riddles added between two checks of the --compare test (default: {DEFAULT_COMPARE_BATCH}).",
+    )
+    _add_common_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.compare and args.grid is None and len(args.models) < 2:
+        parser.error("--compare needs at least two models")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence must be between 0 and 1")
+
+    try:
+        extra_params = _parse_json_object(args.extra_params, "--extra-params")
+        model_params = _parse_json_object(args.model_params, "--model-params")
+        provider_limits = _parse_json_object(args.provider_limits, "--provider-limits")
+        rate_limits = parse_rate_limits(_parse_json_object(args.rate_limits, "--rate-limits") or {})
+    except ValueError as e:
+        logger.error(str(e))
+        return
+
+    if args.grid is not None:
+        try:
+            sweep_models = load_sweep_grid(Path(args.grid)).expand()
+        except (OSError, ValidationError) as e:
+            logger.error(f"グリッドを読み込めません: {args.grid}: {e}")
+            return
+        if args.compare and len(sweep_models) < 2:
+            parser.error("--compare needs at least two configurations")
+        logger.info("グリッドスイープを開始します...")
+        logger.info(f"(Configurations: {len(sweep_models)})")
+    else:
+        sweep_models = build_sweep_models(
+            args.models,
+            reasoning_effort=args.reasoning_effort,
+            extra_params=extra_params,
+            model_params=model_params,
+        )
+        logger.info("スイープを開始します...")
+        logger.info(f"(Models: {len(sweep_models)}, Reason: {args.reason}, Prompt: {args.prompt})")
+
+    configure_image_cache(args.image_cache_mb * 1024 * 1024)
+    sweep = SweepRunner(
+        sweep_models,
+        data_dir=Path(args.data_dir) if args.data_dir else get_assets_path(),
+        selection=_build_selection(args),
+        use_reason=args.reason,
+        prompt=load_prompt(args.prompt),
+        provider_concurrency=args.concurrency,
+        provider_limits=provider_limits,
+        response_cache=_build_response_cache(args),
+        rate_limits=rate_limits,
+        samples=args.samples,
+        prompt_cache=args.prompt_cache,
+        request_policy=_build_request_policy(args),
+        image_preprocessor=_build_image_preprocessor(args),
+        spend=_build_spend_tracker(args),
+    )
+
+    # Keyed by label: the model name, or the model and its configuration in a grid
+    output_paths = {runner.label: _build_output_path(runner.label, args.output_dir) for runner in sweep.runners}
+    journal_paths: dict[str, Path] = {}
+    resumed: dict[str, dict[RecordKey, dict[str, Any]]] = {}
+    for label, output_path in output_paths.items():
+        journal_paths[label], resumed[label] = _prepare_journal(label, output_path, args.resume)
 
+    try:
+        _start_profile(args)
+        with contextlib.ExitStack() as stack:
+            # Saved last, also when the sweep fails or is interrupted
+            stack.callback(_save_profile, args)
+            journals = {label: stack.enter_context(ResultJournal(path)) for label, path in journal_paths.items()}
+            if args.compare:
+                reports, comparison = asyncio.run(
+                    sweep.compare(
+                        confidence=args.confidence,
+                        batch_size=args.compare_batch,
+                        seed=args.seed,
+                        journals=journals,
+                        resumed=resumed,
+                    )
+                )
+                outcomes: list[dict[str, Any] | BaseException] = list(reports)
+            else:
+                outcomes = asyncio.run(sweep.run(journals=journals, resumed=resumed))
     except Exception as e:
         logger.error(f"実行中にエラーが発生しました: {e}", exc_info=True)
+        return
+
+    with _open_warehouse(args.db) as warehouse:
+        for runner, outcome in zip(sweep.runners, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                logger.error(f"{runner.label} の実行中にエラーが発生しました: {outcome}")
+                continue
+            output_path = output_paths[runner.label]
+            runner.save_report(output_path, warehouse)
+            _log_summary(outcome["summary"], label=runner.label)
+
+    if args.grid is not None:
+        # Not named results_*.json either: it indexes the reports of the grid
+        overview = sweep.overview(outcomes, output_paths)
+        overview_path = Path(args.output_dir or ".") / f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(overview_path, "w", encoding="utf-8") as f:
+            json.dump(overview, f, indent=2, ensure_ascii=False)
+        logger.info(f"他の条件と共有したリクエスト: {overview['shared_requests']}")
+        logger.info(f"グリッドの一覧は {overview_path} に保存されました。")
+
+    if args.compare:
+        # Not named results_*.json, so that rescore and leaderboard do not take it for a report
+        comparison_path = Path(args.output_dir or ".") / f"comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(comparison_path, "w", encoding="utf-8") as f:
+            json.dump(comparison, f, indent=2, ensure_ascii=False)
+        _log_comparison(comparison)
+        logger.info(f"比較結果は {comparison_path} に保存されました。")
+
+
+def bench_main(argv: list[str]) -> None:
+    """Measure the harness itself against the local fake provider."""
+    from riddle_benchmark.bench import DEFAULT_SCENARIOS, format_report, run_suite
+
+    scenario_names = [scenario.name for scenario in DEFAULT_SCENARIOS]
+    parser = argparse.ArgumentParser(
+        prog="riddle-benchmark bench",
+        description="Benchmark the harness throughput offline with synthetic riddles and the local/fake provider.",
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=str,
+        nargs="+",
+        choices=scenario_names,
+        default=scenario_names,
+        help="Scenarios to run (default: all).",
+    )
+    parser.add_argument("--riddles", type=_positive_int, default=None, help="Override the number of riddles.")
+    parser.add_argument(
+        "--concurrency",
+        type=_concurrency_type,
+        default=argparse.SUPPRESS,
+        help="Override the concurrency of every scenario ('auto' for the adaptive limiter).",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="Measure the peak Python heap with tracemalloc (slower)."
+    )
+    parser.add_argument("--output", type=str, default=None, help="Write the reports to this JSON file.")
+
+    args = parser.parse_args(argv)
+
+    overrides: dict[str, Any] = {}
+    if args.riddles is not None:
+        overrides["riddles"] = args.riddles
+    if "concurrency" in args:
+        overrides["concurrency"] = args.concurrency
+    scenarios = [
+        scenario.model_copy(update=overrides) for scenario in DEFAULT_SCENARIOS if scenario.name in args.scenarios
+    ]
+
+    reports = asyncio.run(run_suite(scenarios, trace_memory=args.trace_memory))
+
+    logger.info("--- ハーネスベンチマーク ---")
+    for report in reports:
+        logger.info(format_report(report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        logger.info(f"Report saved to {args.output}")
+
+
+def rescore_main(argv: list[str]) -> None:
+    """Re-evaluate saved reports against the current metadata without calling any model."""
+    parser = argparse.ArgumentParser(
+        prog="riddle-benchmark rescore",
+        description="Re-score saved result files against the current acceptable answers.",
+    )
+    parser.add_argument(
+        "paths", type=str, nargs="+", help="Result files, or directories containing results_*.json files."
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=None,
+        help="Directory to write the re-scored reports to. If not specified, the reports are rewritten in place.",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=None,
+        help="Dataset directory containing metadata.jsonl. Defaults to the bundled assets.",
+    )
+
+    args = parser.parse_args(argv)
+
+    from riddle_benchmark.dataset.loader import DataLoader
+    from riddle_benchmark.evaluation.evaluator import Evaluator
+    from riddle_benchmark.evaluation.rescore import find_reports, rescore_file
+
+    report_paths = find_reports(Path(path) for path in args.paths)
+    if not report_paths:
+        logger.error("再採点する結果ファイルが見つかりません")
+        sys.exit(1)
+
+    data_dir = Path(args.data_dir) if args.data_dir else get_assets_path()
+    answers = DataLoader(data_dir).load_answers()
+    index = Evaluator.build_index(answers)
+
+    for path in report_paths:
+        output_path = Path(args.output_dir) / path.name if args.output_dir else path
+        try:
+            previous, report = rescore_file(path, answers, index, output_path)
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            logger.error(f"{path} を再採点できません: {e}")
+            continue
+        summary = report["summary"]
+        before = f"{previous['accuracy']:.2%}" if isinstance(previous.get("accuracy"), int | float) else "-"
+        logger.info(
+            f"{path.name}: 正答率 {before} -> {summary['accuracy']:.2%} "
+            f"({summary['correct_answers']} / {summary.get('total_samples', summary['total_questions'])})"
+        )
+
+
+def batch_main(argv: list[str]) -> None:
+    """Export batch API requests, or turn the output of a batch into a report."""
+    parser = argparse.ArgumentParser(
+        prog="riddle-benchmark batch",
+        description="Run the benchmark through a provider's batch API (OpenAI batch file format).",
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write the requests as a batch input file.")
+    export_parser.add_argument("--model", type=str, default="gpt-4o", help="The name of the model to benchmark.")
+    export_parser.add_argument("--reason", action="store_true", help="Include reason in the response schema.")
+    export_parser.add_argument(
+        "--prompt", type=str, choices=["0", "1", "2"], default="2", help="The prompt ID to use (0, 1 or 2)."
+    )
+    export_parser.add_argument("--extra-params", type=str, help="Additional model-specific parameters as JSON string.")
+    export_parser.add_argument("--samples", type=_positive_int, default=1, help="Number of requests per riddle.")
+    _add_dataset_arguments(export_parser)
+    export_parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="Path of the batch input file (JSONL). A .manifest.json file is written next to it.",
+    )
+
+    ingest_parser = subparsers.add_parser("ingest", help="Evaluate a batch output file into a results file.")
+    ingest_parser.add_argument("output_file", type=str, help="The batch output (or error) file from the provider.")
+    ingest_parser.add_argument("--manifest", type=str, required=True, help="The manifest written by 'batch export'.")
+    ingest_parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=None,
+        help="Dataset to evaluate against. Defaults to the dataset of the export.",
+    )
+    ingest_parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=None,
+        help="Directory to save the results file. If not specified, saves to the current directory.",
+    )
+
+    args = parser.parse_args(argv)
+
+    from riddle_benchmark.batch import (
+        BatchManifest,
+        export_batch,
+        ingest_batch_output,
+        load_batch_output,
+        manifest_path_for,
+    )
+    from riddle_benchmark.dataset.loader import DataLoader, RiddleSelection
+
+    if args.action == "export":
+        try:
+            extra_params = _parse_json_object(args.extra_params, "--extra-params")
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        data_dir = Path(args.data_dir) if args.data_dir else get_assets_path()
+        selection = _build_selection(args)
+        riddles = DataLoader(data_dir, selection).load()
+        output_path = Path(args.output)
+        try:
+            export_batch(
+                riddles,
+                output_path,
+                model_name=args.model,
+                use_reason=args.reason,
+                prompt=load_prompt(args.prompt),
+                extra_params=extra_params,
+                samples=args.samples,
+                data_dir=data_dir,
+                selection=selection,
+            )
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        logger.info(f"{len(riddles) * args.samples} 件のリクエストを {output_path} に書き出しました")
+        logger.info(f"マニフェスト: {manifest_path_for(output_path)}")
+        return
+
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = BatchManifest.model_validate_json(f.read())
+    data_dir_option = args.data_dir or manifest.data_dir
+    data_dir = Path(data_dir_option) if data_dir_option else get_assets_path()
+    riddles = DataLoader(data_dir, RiddleSelection(ids=manifest.riddle_ids)).load_metadata()
+    if len(riddles) < len(manifest.riddle_ids):
+        logger.warning(f"{len(manifest.riddle_ids) - len(riddles)} 問がデータセットに見つかりません")
+
+    results = ingest_batch_output(manifest, load_batch_output(Path(args.output_file)), riddles)
+
+    output_path = _build_output_path(manifest.model, args.output_dir)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    logger.info(f"完了しました。結果は {output_path} に保存されました。")
+    _log_summary(results["summary"])
+
+
+def pack_main(argv: list[str]) -> None:
+    """Pack a dataset into a single indexed file."""
+    parser = argparse.ArgumentParser(
+        prog="riddle-benchmark pack",
+        description="Pack metadata.jsonl and the images into a single memory-mappable file for fast loading.",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=None,
+        help="Dataset directory containing metadata.jsonl. Defaults to the bundled assets.",
+    )
+    parser.add_argument(
+        "--output", type=str, required=True, help=f"Path of the packed file (e.g., dataset{PACK_SUFFIX})."
+    )
+    parser.add_argument("--ids", type=str, nargs="+", default=None, help="Pack only these riddle IDs.")
+
+    args = parser.parse_args(argv)
+
+    from riddle_benchmark.dataset.loader import DataLoader, RiddleSelection
+
+    data_dir = Path(args.data_dir) if args.data_dir else get_assets_path()
+    selection = RiddleSelection(ids=args.ids) if args.ids else None
+    try:
+        count = DataLoader(data_dir, selection).pack(Path(args.output))
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+    logger.info(f"{count} 問を {args.output} にパックしました")
+
+
+def merge_main(argv: list[str]) -> None:
+    """Merge the result files of the shards of a run."""
+    parser = argparse.ArgumentParser(
+        prog="riddle-benchmark merge",
+        description="Merge the result files of a model's shards (--shard) into a single report.",
+    )
+    parser.add_argument("paths", type=str, nargs="+", help="Result files of the shards.")
+    parser.add_argument("--output", type=str, required=True, help="Path of the merged results file.")
+
+    args = parser.parse_args(argv)
+
+    from riddle_benchmark.evaluation.rescore import merge_reports
+
+    reports = []
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    try:
+        merged = merge_reports(reports)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2, ensure_ascii=False)
+    logger.info(f"{len(reports)} 件の結果を {args.output} に統合しました")
+    _log_summary(merged["summary"])
+
+
+def _format_selection(selection: str | None) -> str:
+    """Summarize a stored dataset selection, e.g. "sample=50 seed=1 shard=0/4" ("all" for the whole dataset)."""
+    fields = json.loads(selection) if selection else {}
+    parts = []
+    if fields.get("ids") is not None:
+        parts.append(f"ids={len(fields['ids'])}")
+    if fields.get("sample") is not None:
+        parts.append(f"sample={fields['sample']} seed={fields.get('seed', 0)}")
+    if fields.get("shard") is not None:
+        parts.append(f"shard={fields['shard'][0]}/{fields['shard'][1]}")
+    if fields.get("limit") is not None:
+        parts.append(f"limit={fields['limit']}")
+    return " ".join(parts) or "all"
+
+
+def _format_leaderboard(rows: list[dict[str, Any]]) -> list[str]:
+    """Format leaderboard rows as the lines of a text table."""
+    header = [
+        "#",
+        "model",
+        "prompt",
+        "reason",
+        "params",
+        "selection",
+        "image",
+        "accuracy",
+        "correct",
+        "cost",
+        "latency",
+        "runs",
+    ]
+    table = [header]
+    for rank, row in enumerate(rows, start=1):
+        table.append(
+            [
+                str(rank),
+                row["model"],
+                row["prompt_id"] or "-",
+                "yes" if row["use_reason"] else "no",
+                row["extra_params"] if row["extra_params"] not in (None, "{}") else "-",
+                _format_selection(row["selection"]),
+                row["image_variant"] or "-",
+                f"{row['accuracy']:.2%}" if row["accuracy"] is not None else "-",
+                f"{row['correct_answers']}/{row['total_questions'] * row['samples']}"
+                if row["total_questions"] is not None
+                else "-",
+                f"${row['total_cost']:.4f}" if row["total_cost"] is not None else "-",
+                f"{row['mean_latency']:.2f}s" if row["mean_latency"] is not None else "-",
+                str(row["runs_count"]),
+            ]
+        )
+    widths = [max(len(line[i]) for line in table) for i in range(len(header))]
+    return ["  ".join(cell.ljust(width) for cell, width in zip(line, widths, strict=True)).rstrip() for line in table]
+
+
+def leaderboard_main(argv: list[str]) -> None:
+    """Ingest result files into the results database and show the leaderboard."""
+    parser = argparse.ArgumentParser(
+        prog="riddle-benchmark leaderboard",
+        description="Rank the stored runs by accuracy, optionally ingesting result files first.",
+    )
+    parser.add_argument(
+        "--db",
+        type=str,
+        default=str(DEFAULT_WAREHOUSE_PATH),
+        help=f"Path of the SQLite results database (default: {DEFAULT_WAREHOUSE_PATH}).",
+    )
+    parser.add_argument(
+        "--ingest",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Result files, or directories containing results_*.json files, to add first. "
+        "Files that are already stored are skipped.",
+    )
+    parser.add_argument("--model", type=str, default=None, help="Show only models matching this LIKE pattern.")
+    parser.add_argument("--limit", type=_positive_int, default=100, help="Maximum number of rows (default: 100).")
+    parser.add_argument("--format", type=str, choices=["table", "json"], default="table", help="Output format.")
+
+    args = parser.parse_args(argv)
+
+    from riddle_benchmark.evaluation.rescore import find_reports
+
+    with ResultsWarehouse(Path(args.db)) as warehouse:
+        if args.ingest:
+            ingested, skipped = warehouse.ingest_files(find_reports(Path(path) for path in args.ingest))
+            logger.info(f"{ingested} 件の結果を取り込みました（{skipped} 件はスキップ）")
+        rows = warehouse.leaderboard(model=args.model, limit=args.limit)
+
+    if args.format == "json":
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    elif not rows:
+        logger.info("結果がありません")
+    else:
+        for line in _format_leaderboard(rows):
+            logger.info(line)
+
+
+COMMANDS = {
+    "sweep": sweep_main,
+    "bench": bench_main,
+    "rescore": rescore_main,
+    "merge": merge_main,
+    "pack": pack_main,
+    "batch": batch_main,
+    "leaderboard": leaderboard_main,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    # .env ファイルをロード
+    load_dotenv()
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Subcommands are dispatched by the first argument; anything else is a single-model run
+    if argv and argv[0] in COMMANDS:
+        COMMANDS[argv[0]](argv[1:])
+    else:
+        run_main(argv)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+from riddle_benchmark.utils import get_logger, get_provider
+
+logger = get_logger(__name__)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Check whether an exception signals that the provider is throttling requests.
+
+    LiteLLM maps provider throttling to exceptions with status code 429.
+
+    Args:
+        error: The exception raised by a request.
+
+    Returns:
+        True if the exception is a rate-limit error.
+    """
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+class ConcurrencyLimiter:
+    """
+    Bounds the number of in-flight requests.
+
+    Requests are made inside `async with limiter.slot():`. The latency and outcome of
+    each request are reported to `on_complete`, which adaptive limiters override: by the
+    slot, or by the caller itself for each attempt made in the slot (see Model.solve).
+    """
+
+    def __init__(self, limit: int):
+        """
+        Initialize the limiter.
+
+        Args:
+            limit: The maximum number of concurrent requests.
+        """
+        self._limit = float(limit)
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current maximum number of concurrent requests."""
+        return max(1, int(self._limit))
+
+    @property
+    def capacity(self) -> int:
+        """The largest value the limit can reach, e.g. to size a pool of workers."""
+        return self.limit
+
+    @property
+    def in_flight(self) -> int:
+        """The number of requests currently holding a slot."""
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self, report: bool = True) -> AsyncIterator[None]:
+        """
+        Hold a request slot for the duration of the context.
+
+        Args:
+            report: Whether to report the latency and outcome of the whole context to on_complete.
+                False when the requests made in the slot report each attempt themselves, so that
+                rate-limit errors that are retried within the slot are seen by the limiter.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+        start = time.monotonic()
+        error: BaseException | None = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            latency = time.monotonic() - start
+            async with self._condition:
+                self._in_flight -= 1
+                if report and not isinstance(error, asyncio.CancelledError):
+                    self.on_complete(latency, error)
+                self._condition.notify_all()
+
+    def on_complete(self, latency: float, error: BaseException | None) -> None:
+        """
+        Record the outcome of a request.
+
+        Args:
+            latency: Wall time of the request in seconds.
+            error: The exception raised by the request, or None on success.
+        """
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    AIMD (additive increase, multiplicative decrease) concurrency limiter.
+
+    The limit grows by about one slot per window of successful requests while latency
+    and the error rate are healthy, is cut by `backoff_ratio` on rate-limit errors, and
+    shrinks gently when latency rises well above its moving average or errors pile up.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+        error_rate_threshold: float = 0.2,
+        window: int = 20,
+    ):
+        """
+        Initialize the adaptive limiter.
+
+        Args:
+            initial_limit: The starting maximum number of concurrent requests.
+            min_limit: The lower bound of the limit.
+            max_limit: The upper bound of the limit.
+            backoff_ratio: Factor applied to the limit on a rate-limit error.
+            latency_tolerance: Latency above this multiple of the moving average counts as congestion.
+            error_rate_threshold: Error rate over the recent window above which the limit shrinks.
+            window: Number of recent requests used to compute the error rate.
+        """
+        super().__init__(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.error_rate_threshold = error_rate_threshold
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._avg_latency: float | None = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_limit
+
+    def on_complete(self, latency: float, error: BaseException | None) -> None:
+        previous = self.limit
+        self._outcomes.append(error is None)
+
+        if error is not None and is_rate_limit_error(error):
+            self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+        elif error is not None:
+            error_rate = 1 - sum(self._outcomes) / len(self._outcomes)
+            if len(self._outcomes) >= 5 and error_rate > self.error_rate_threshold:
+                self._limit = max(float(self.min_limit), self._limit * 0.9)
+        else:
+            congested = self._avg_latency is not None and latency > self.latency_tolerance * self._avg_latency
+            if congested:
+                self._limit = max(float(self.min_limit), self._limit * 0.9)
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            # Exponential moving average of successful latencies
+            self._avg_latency = latency if self._avg_latency is None else 0.9 * self._avg_latency + 0.1 * latency
+
+        if self.limit != previous:
+            logger.debug(f"Concurrency limit changed: {previous} -> {self.limit}")
+
+
+class ProviderLimiters:
+    """
+    Registry of concurrency limiters keyed by provider prefix.
+
+    Models of the same provider (e.g., "openai/", "gemini/", "bedrock/") share a limiter.
+    """
+
+    def __init__(self, factory: Callable[[str], ConcurrencyLimiter]):
+        """
+        Initialize the registry.
+
+        Args:
+            factory: Creates the limiter for a provider name.
+        """
+        self.factory = factory
+        self._limiters: dict[str, ConcurrencyLimiter] = {}
+
+    def for_model(self, model_name: str) -> ConcurrencyLimiter:
+        """
+        Return the limiter of the model's provider, creating it on first use.
+
+        Args:
+            model_name: The LiteLLM model name.
+
+        Returns:
+            The limiter shared by the provider.
+        """
+        provider = get_provider(model_name)
+        if provider not in self._limiters:
+            self._limiters[provider] = self.factory(provider)
+        return self._limiters[provider]
+
+    def items(self) -> list[tuple[str, ConcurrencyLimiter]]:
+        """Return the providers and their limiters."""
+        return list(self._limiters.items())
+
+
+def make_limiter(concurrency: int | None) -> ConcurrencyLimiter:
+    """
+    Create a limiter from a concurrency setting.
+
+    Args:
+        concurrency: A fixed maximum number of concurrent requests, or None for adaptive.
+
+    Returns:
+        A fixed or adaptive concurrency limiter.
+    """
+    if concurrency is None:
+        return AdaptiveConcurrencyLimiter()
+    return ConcurrencyLimiter(concurrency)
+
+
+def parse_concurrency(value: str) -> int | None:
+    """
+    Parse a `--concurrency` option value.
+
+    Args:
+        value: "auto" or a positive integer.
+
+    Returns:
+        The fixed concurrency, or None for "auto".
+
+    Raises:
+        ValueError: If the value is neither "auto" nor a positive integer.
+    """
+    if value == "auto":
+        return None
+    concurrency = int(value)
+    if concurrency < 1:
+        raise ValueError("concurrency must be a positive integer or 'auto'")
+    return concurrency
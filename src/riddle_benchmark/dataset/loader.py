@@ -1,11 +1,93 @@
+import itertools
 import json
-from collections.abc import Generator
+import random
+from collections.abc import Generator, Iterable, Iterator
 from pathlib import Path
+from typing import Any
 
+from pydantic import BaseModel, Field
+
+from riddle_benchmark.dataset.packed import PackedDataset, is_packed_dataset, pack_dataset
 from riddle_benchmark.dataset.schema import Riddle
 from riddle_benchmark.utils import get_assets_path
 
 
+class RiddleSelection(BaseModel):
+    """
+    Subset of the dataset to load.
+
+    The filters are applied in this order: `ids`, `sample`, `shard`, `limit`.
+    Shards split the selected riddles round-robin, so the same selection with
+    every shard index from 0 to n-1 covers each riddle exactly once.
+
+    Attributes:
+        ids: Riddle IDs to keep (in dataset order).
+        sample: Number of riddles drawn at random without replacement.
+        seed: Seed of the random draw.
+        shard: Shard index and number of shards, e.g. (0, 4) for the first of four shards.
+        limit: Maximum number of riddles.
+    """
+
+    ids: list[str] | None = None
+    sample: int | None = Field(default=None, ge=1)
+    seed: int = 0
+    shard: tuple[int, int] | None = None
+    limit: int | None = Field(default=None, ge=1)
+
+    def apply(self, entries: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        """
+        Select metadata entries.
+
+        Only `sample` needs every entry at once; the other filters stream, so that a limit
+        stops reading the metadata as soon as enough riddles are selected.
+
+        Args:
+            entries: Decoded lines of metadata.jsonl in dataset order.
+
+        Returns:
+            The selected entries in dataset order.
+        """
+        selected = iter(entries)
+        if self.ids is not None:
+            ids = set(self.ids)
+            selected = (entry for entry in selected if entry.get("id") in ids)
+        if self.sample is not None:
+            candidates = list(selected)
+            if self.sample < len(candidates):
+                # Draw positions rather than entries so that the dataset order is kept
+                positions = sorted(random.Random(self.seed).sample(range(len(candidates)), self.sample))
+                candidates = [candidates[i] for i in positions]
+            selected = iter(candidates)
+        if self.shard is not None:
+            index, count = self.shard
+            selected = itertools.islice(selected, index, None, count)
+        if self.limit is not None:
+            selected = itertools.islice(selected, self.limit)
+        return selected
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """
+    Parse a shard specification "i/n" (0 <= i < n).
+
+    Args:
+        value: The specification, e.g. "0/4".
+
+    Returns:
+        The shard index and number of shards.
+
+    Raises:
+        ValueError: If the specification is malformed or out of range.
+    """
+    index, sep, count = value.partition("/")
+    if not sep or not index.strip().isdigit() or not count.strip().isdigit():
+        raise ValueError(f"Invalid shard {value!r}: expected 'i/n', e.g. '0/4'")
+    shard = int(index), int(count)
+    if not 0 <= shard[0] < shard[1]:
+        raise ValueError(f"Invalid shard {value!r}: the index must be between 0 and n-1")
+    return shard
+
+
 class DataLoader:
     """
     Loader for riddle datasets.
@@ -16,16 +98,20 @@ class DataLoader:
       images/         # Contains image files
     """
 
-    def __init__(self, data_dir: Path | None = None):
+    def __init__(self, data_dir: Path | None = None, selection: RiddleSelection | None = None):
         """
         Initialize the data loader.
 
         Args:
-            data_dir: Path to the assets directory. If None, uses the default assets path.
+            data_dir: Path to the assets directory, or to a packed dataset file (see `pack`).
+                If None, uses the default assets path.
+            selection: Subset of the riddles to load. If None, loads every riddle.
         """
         self.data_dir = data_dir or get_assets_path()
+        self.selection = selection
         self.metadata_path = self.data_dir / "metadata.jsonl"
         self.images_dir = self.data_dir / "images"
+        self.packed = PackedDataset(self.data_dir) if is_packed_dataset(self.data_dir) else None
 
     def load(self) -> list[Riddle]:
         """
@@ -36,6 +122,35 @@ class DataLoader:
         """
         return list(self.iter_load())
 
+    def load_metadata(self) -> list[Riddle]:
+        """
+        Load the selected riddles from the metadata only, without checking or reading their images.
+
+        Enough to score answers, e.g. of a batch output.
+
+        Raises:
+            FileNotFoundError: If metadata.jsonl is not found.
+        """
+        return [
+            Riddle(
+                id=data["id"],
+                image_path=self.data_dir / data.get("file_name", ""),
+                acceptable_answers=data["answers"],
+                question=data.get("question"),
+                hint=data.get("hint"),
+            )
+            for data in self._iter_selected()
+        ]
+
+    def count(self) -> int:
+        """
+        Count the selected riddles without building them or checking their images.
+
+        Raises:
+            FileNotFoundError: If metadata.jsonl is not found.
+        """
+        return sum(1 for _ in self._iter_selected())
+
     def iter_load(self) -> Generator[Riddle]:
         """
         Iteratively load riddles from the dataset.
@@ -47,6 +162,92 @@ class DataLoader:
             FileNotFoundError: If metadata.jsonl is not found.
             ValueError: If an image file specified in metadata is missing.
         """
+        if self.packed is not None:
+            yield from self._iter_packed(self.packed)
+            return
+
+        for data in self._iter_selected():
+            # Handle HF ImageFolder format where image path might be relative to data_dir
+            # "file_name": "images/riddle_001.png" -> we need full path
+            image_rel_path = data.get("file_name")
+            if not image_rel_path:
+                raise ValueError(f"Missing 'file_name' in metadata: {data}")
+
+            full_image_path = self.data_dir / image_rel_path
+
+            if not full_image_path.exists():
+                raise ValueError(f"Image file not found: {full_image_path}")
+
+            # Map JSON fields to Riddle schema
+            # Expecting metadata to contain: id, question, answers, etc.
+            # 'answers' in JSONL -> 'acceptable_answers' in Schema
+            yield Riddle(
+                id=data["id"],
+                image_path=full_image_path,
+                acceptable_answers=data["answers"],  # Mapping 'answers' to 'acceptable_answers'
+                question=data.get("question"),
+                hint=data.get("hint"),
+            )
+
+    def pack(self, output_path: Path) -> int:
+        """
+        Write the selected riddles and their images into a single packed file.
+
+        Loading the packed file reads one index instead of a metadata file and one file per
+        image, and its images are memory-mapped instead of read.
+
+        Args:
+            output_path: Path of the packed file.
+
+        Returns:
+            The number of packed riddles.
+
+        Raises:
+            FileNotFoundError: If metadata.jsonl is not found.
+            ValueError: If an image file is missing or the dataset is already packed.
+        """
+        if self.packed is not None:
+            raise ValueError(f"Dataset is already packed: {self.data_dir}")
+        return pack_dataset(self._iter_selected(), self.data_dir, output_path)
+
+    def load_answers(self) -> dict[str, list[str]]:
+        """
+        Load only the acceptable answers of each riddle, without checking the images.
+
+        Returns:
+            Acceptable answers keyed by riddle ID.
+
+        Raises:
+            FileNotFoundError: If metadata.jsonl is not found.
+        """
+        return {data["id"]: data["answers"] for data in self._iter_selected()}
+
+    def _iter_selected(self) -> Iterable[dict[str, Any]]:
+        """Yield the metadata entries of the selection, before any Riddle is built."""
+        if self.selection is None:
+            return self._iter_metadata()
+        return self.selection.apply(self._iter_metadata())
+
+    def _iter_packed(self, packed: PackedDataset) -> Generator[Riddle]:
+        """Yield the selected riddles of a packed dataset with zero-copy views of their images."""
+        for data in self._iter_selected():
+            yield Riddle(
+                id=data["id"],
+                image_path=self.data_dir / data["file_name"],
+                acceptable_answers=data["answers"],
+                question=data.get("question"),
+                hint=data.get("hint"),
+                image_data=packed.image(data),
+                image_mime_type=data["mime_type"],
+            )
+
+    def _iter_metadata(self) -> Iterator[dict[str, Any]]:
+        """Yield the decoded lines of metadata.jsonl (or the packed index), skipping blank and malformed ones."""
+        if self.packed is not None:
+            return iter(self.packed.entries)
+        return self._read_metadata()
+
+    def _read_metadata(self) -> Generator[dict[str, Any]]:
         if not self.metadata_path.exists():
             raise FileNotFoundError(f"Metadata file not found at {self.metadata_path}")
 
@@ -55,29 +256,7 @@ class DataLoader:
                 if not line.strip():
                     continue
                 try:
-                    data = json.loads(line)
+                    yield json.loads(line)
                 except json.JSONDecodeError:
                     print(f"Error decoding JSON: {line}")
                     continue
-
-                # Handle HF ImageFolder format where image path might be relative to data_dir
-                # "file_name": "images/riddle_001.png" -> we need full path
-                image_rel_path = data.get("file_name")
-                if not image_rel_path:
-                    raise ValueError(f"Missing 'file_name' in metadata: {data}")
-
-                full_image_path = self.data_dir / image_rel_path
-
-                if not full_image_path.exists():
-                    raise ValueError(f"Image file not found: {full_image_path}")
-
-                # Map JSON fields to Riddle schema
-                # Expecting metadata to contain: id, question, answers, etc.
-                # 'answers' in JSONL -> 'acceptable_answers' in Schema
-                yield Riddle(
-                    id=data["id"],
-                    image_path=full_image_path,
-                    acceptable_answers=data["answers"],  # Mapping 'answers' to 'acceptable_answers'
-                    question=data.get("question"),
-                    hint=data.get("hint"),
-                )
@@ -0,0 +1,146 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from riddle_benchmark.models.images import detect_mime_type
+
+PACK_MAGIC = b"RIDPACK1"
+PACK_SUFFIX = ".ridpack"
+
+# Magic followed by the byte length of the JSON index
+_HEADER = struct.Struct(f">{len(PACK_MAGIC)}sQ")
+
+# Enough leading bytes to recognize the image formats of detect_mime_type
+_SIGNATURE_BYTES = 16
+
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def is_packed_dataset(path: Path) -> bool:
+    """Return whether the path is a packed dataset file (rather than an assets directory)."""
+    if not path.is_file():
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(PACK_MAGIC)) == PACK_MAGIC
+
+
+def pack_dataset(entries: Iterable[dict[str, Any]], data_dir: Path, output_path: Path) -> int:
+    """
+    Write metadata entries and their images into a single indexed file.
+
+    Layout: an 8-byte magic, the length of the JSON index (big-endian uint64), the
+    JSON index, then the raw image bytes. Each index entry is the metadata line plus
+    the "offset" (from the end of the index), "length" and "mime_type" of its image.
+
+    Args:
+        entries: Decoded lines of metadata.jsonl.
+        data_dir: The assets directory the "file_name" of each entry is relative to.
+        output_path: Path of the packed file.
+
+    Returns:
+        The number of packed riddles.
+
+    Raises:
+        ValueError: If an entry has no "file_name", its image is missing, or it changed while packing.
+    """
+    # First pass: sizes and types only, so that images are streamed rather than held in memory
+    index: list[dict[str, Any]] = []
+    image_paths: list[Path] = []
+    offset = 0
+    for data in entries:
+        image_rel_path = data.get("file_name")
+        if not image_rel_path:
+            raise ValueError(f"Missing 'file_name' in metadata: {data}")
+        image_path = data_dir / image_rel_path
+        try:
+            with open(image_path, "rb") as image_file:
+                head = image_file.read(_SIGNATURE_BYTES)
+                length = os.fstat(image_file.fileno()).st_size
+        except FileNotFoundError as e:
+            raise ValueError(f"Image file not found: {image_path}") from e
+        index.append({**data, "offset": offset, "length": length, "mime_type": detect_mime_type(head, image_path)})
+        image_paths.append(image_path)
+        offset += length
+    encoded_index = json.dumps(index, ensure_ascii=False).encode("utf-8")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(output_path, "wb") as f:
+            f.write(_HEADER.pack(PACK_MAGIC, len(encoded_index)))
+            f.write(encoded_index)
+            for image_path, entry in zip(image_paths, index, strict=True):
+                try:
+                    with open(image_path, "rb") as image_file:
+                        _copy_image(image_file, f, entry["length"], image_path)
+                except FileNotFoundError as e:
+                    raise ValueError(f"Image file removed while packing: {image_path}") from e
+    except BaseException:
+        # A pack with shifted offsets would load without error: do not leave it behind
+        output_path.unlink(missing_ok=True)
+        raise
+    return len(index)
+
+
+def _copy_image(source: BinaryIO, target: BinaryIO, length: int, image_path: Path) -> None:
+    """
+    Copy exactly the indexed number of bytes of an image.
+
+    Raises:
+        ValueError: If the image changed size since it was indexed, which would shift every later offset.
+    """
+    remaining = length
+    while remaining:
+        chunk = source.read(min(remaining, _COPY_CHUNK_BYTES))
+        if not chunk:
+            break
+        target.write(chunk)
+        remaining -= len(chunk)
+    if remaining or source.read(1):
+        raise ValueError(f"Image file changed while packing: {image_path}")
+
+
+class PackedDataset:
+    """
+    Read-only view of a packed dataset file.
+
+    The file is memory-mapped: opening it reads only the index, and images are
+    returned as zero-copy views into the mapping.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Open a packed dataset.
+
+        Args:
+            path: Path of the packed file.
+
+        Raises:
+            ValueError: If the file is not a packed dataset.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"Not a packed dataset: {path}")
+        magic, index_size = _HEADER.unpack_from(self._mmap)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"Not a packed dataset: {path}")
+        self._data_start = _HEADER.size + index_size
+        self.entries: list[dict[str, Any]] = json.loads(self._mmap[_HEADER.size : self._data_start])
+
+    def image(self, entry: dict[str, Any]) -> memoryview:
+        """
+        Return the image bytes of an index entry without copying them.
+
+        Args:
+            entry: An entry of `entries`.
+
+        Returns:
+            A read-only view of the image bytes.
+        """
+        start = self._data_start + entry["offset"]
+        return memoryview(self._mmap)[start : start + entry["length"]]
@@ -0,0 +1,194 @@
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+from pydantic import BaseModel, Field, model_validator
+
+from riddle_benchmark.dataset.schema import Riddle
+from riddle_benchmark.models.cache import DEFAULT_CACHE_DIR
+from riddle_benchmark.models.images import ImageFormat, detect_mime_type
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+DEFAULT_IMAGE_VARIANT_DIR = DEFAULT_CACHE_DIR / "images"
+
+# Suffix of the renamed image path of each MIME type (see ImagePreprocessor.apply)
+_SUFFIXES = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp", "image/gif": ".gif"}
+
+# Pillow formats whose encoder takes a quality
+_LOSSY_FORMATS = frozenset({"JPEG", "WEBP"})
+
+
+class ImageVariant(BaseModel):
+    """
+    Derived version of the riddle images sent to the models.
+
+    Attributes:
+        max_edge: Images whose longer edge exceeds this many pixels are downscaled to it,
+            keeping the aspect ratio. None keeps the resolution.
+        format: Format the images are re-encoded to. None keeps the format of each image.
+        quality: Encoder quality (1-100) for JPEG and WebP. None uses the encoder default.
+            Dropped when the format is PNG, which is lossless, so that it does not split
+            the variant name and the cache entries of identical images.
+    """
+
+    max_edge: int | None = Field(default=None, ge=1)
+    format: ImageFormat | None = None
+    quality: int | None = Field(default=None, ge=1, le=100)
+
+    @model_validator(mode="after")
+    def _drop_lossless_quality(self) -> Self:
+        if self.format is not None and self.format.value.upper() not in _LOSSY_FORMATS:
+            self.quality = None
+        return self
+
+    @property
+    def name(self) -> str:
+        """Short label of the variant recorded in reports, e.g. "max768-jpeg-q80"."""
+        parts = []
+        if self.max_edge is not None:
+            parts.append(f"max{self.max_edge}")
+        if self.format is not None:
+            parts.append(self.format.value)
+        if self.quality is not None:
+            parts.append(f"q{self.quality}")
+        return "-".join(parts) or "original"
+
+
+class ImagePreprocessor:
+    """
+    Derives the image of each riddle according to a variant, with an on-disk cache.
+
+    Derived images are stored in files named by the SHA-256 of the source image and the
+    variant parameters, so each one is computed once across runs and models, and an edited
+    source image gets a new entry.
+    """
+
+    def __init__(self, variant: ImageVariant, cache_dir: Path | None = DEFAULT_IMAGE_VARIANT_DIR):
+        """
+        Initialize the preprocessor.
+
+        Args:
+            variant: How the images are derived.
+            cache_dir: Directory of the derived images. None disables the cache.
+        """
+        self.variant = variant
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def apply(self, riddle: Riddle) -> Riddle:
+        """
+        Return a copy of a riddle carrying its derived image.
+
+        The copy holds the derived bytes in image_data, and its image_path is renamed after
+        the variant (e.g., "images/001.max768-jpeg.jpg") so that encoded images of different
+        variants never share an entry of the image cache.
+
+        Args:
+            riddle: The riddle as loaded from the dataset.
+
+        Returns:
+            The riddle with the derived image.
+
+        Raises:
+            OSError: If the source image cannot be read or decoded.
+        """
+        source = bytes(riddle.image_data) if riddle.image_data is not None else riddle.image_path.read_bytes()
+        data = self.derive(source)
+        mime_type = detect_mime_type(data[:16])
+        path = riddle.image_path
+        return riddle.model_copy(
+            update={
+                "image_path": path.with_name(f"{path.stem}.{self.variant.name}{_SUFFIXES.get(mime_type, '')}"),
+                "image_data": memoryview(data),
+                "image_mime_type": mime_type,
+            }
+        )
+
+    def derive(self, source: bytes) -> bytes:
+        """
+        Derive an image, reusing the cached result if there is one.
+
+        Args:
+            source: The bytes of the source image.
+
+        Returns:
+            The bytes of the derived image.
+        """
+        path = self._entry_path(self.make_key(source)) if self.cache_dir is not None else None
+        if path is not None:
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                pass
+            else:
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        data = self._transform(source)
+        if path is not None:
+            _write_atomic(path, data)
+        return data
+
+    def make_key(self, source: bytes) -> str:
+        """Return the hex SHA-256 identifying the derived image of a source image."""
+        digest = hashlib.sha256(source)
+        digest.update(self.variant.model_dump_json().encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        assert self.cache_dir is not None
+        return self.cache_dir / key[:2] / f"{key}.img"
+
+    def _transform(self, source: bytes) -> bytes:
+        """Resize and re-encode an image. The source is returned as is if nothing changes."""
+        from PIL import Image
+
+        variant = self.variant
+        with Image.open(io.BytesIO(source)) as opened:
+            image: Image.Image = opened
+            image_format = variant.format.value.upper() if variant.format is not None else (opened.format or "PNG")
+            resize = variant.max_edge is not None and max(image.size) > variant.max_edge
+            # The quality only matters to lossy encoders, e.g. not to a PNG source kept as PNG
+            quality = variant.quality if image_format in _LOSSY_FORMATS else None
+            if not resize and variant.format is None and quality is None:
+                return source
+            if resize:
+                assert variant.max_edge is not None
+                image.thumbnail((variant.max_edge, variant.max_edge), Image.Resampling.LANCZOS)
+            if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = _flatten(image)
+
+            buffer = io.BytesIO()
+            options = {"quality": quality} if quality is not None else {}
+            image.save(buffer, format=image_format, **options)
+        return buffer.getvalue()
+
+
+def _flatten(image: "Image.Image") -> "Image.Image":
+    """Composite an image with transparency onto white, as JPEG has no alpha channel."""
+    from PIL import Image
+
+    rgba = image.convert("RGBA")
+    background = Image.new("RGB", rgba.size, "white")
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write a file so that concurrent runs never observe a partial entry."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
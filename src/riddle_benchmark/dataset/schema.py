@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Riddle(BaseModel):
@@ -13,10 +13,17 @@ class Riddle(BaseModel):
         acceptable_answers: List of acceptable answers
         question: The riddle question (optional)
         hint: Optional hint for the riddle
+        image_data: Image bytes already in memory (e.g., a view into a packed dataset).
+            If set, image_path is only used as a name and is not read.
+        image_mime_type: MIME type of image_data
     """
 
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     id: str
     image_path: Path
     acceptable_answers: list[str]
     question: str | None = None
     hint: str | None = None
+    image_data: memoryview | None = Field(default=None, exclude=True, repr=False)
+    image_mime_type: str | None = None
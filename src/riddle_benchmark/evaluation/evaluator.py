@@ -1,7 +1,11 @@
 import unicodedata
+from collections.abc import Iterable, Mapping
 
 from riddle_benchmark.dataset.schema import Riddle
 
+# Normalized acceptable answers keyed by riddle ID
+AnswerIndex = dict[str, frozenset[str]]
+
 
 class Evaluator:
     """
@@ -39,6 +43,64 @@ class Evaluator:
 
         return text
 
+    @classmethod
+    def normalize_answers(cls, answers: Iterable[str]) -> frozenset[str]:
+        """
+        Normalize a list of acceptable answers into a set for constant-time lookups.
+
+        Args:
+            answers: The acceptable answers.
+
+        Returns:
+            The set of normalized answers.
+        """
+        return frozenset(cls.normalize(answer) for answer in answers)
+
+    @classmethod
+    def build_index(cls, answers: Mapping[str, Iterable[str]]) -> AnswerIndex:
+        """
+        Normalize the acceptable answers of every riddle once.
+
+        Args:
+            answers: Acceptable answers keyed by riddle ID.
+
+        Returns:
+            The normalized answer sets keyed by riddle ID.
+        """
+        return {riddle_id: cls.normalize_answers(riddle_answers) for riddle_id, riddle_answers in answers.items()}
+
+    @classmethod
+    def score(cls, prediction: str, normalized_answers: frozenset[str]) -> tuple[str, bool]:
+        """
+        Normalize a prediction and check it against precomputed normalized answers.
+
+        Args:
+            prediction: The model's predicted answer.
+            normalized_answers: The normalized acceptable answers of the riddle.
+
+        Returns:
+            The normalized prediction and whether it is correct.
+        """
+        normalized_prediction = cls.normalize(prediction)
+        return normalized_prediction, normalized_prediction in normalized_answers
+
+    @classmethod
+    def evaluate_batch(cls, predictions: Iterable[tuple[str, str]], index: AnswerIndex) -> list[tuple[str, bool]]:
+        """
+        Score many predictions against an answer index in one pass.
+
+        Args:
+            predictions: Pairs of riddle ID and predicted answer.
+            index: The normalized answer sets from build_index.
+
+        Returns:
+            The normalized prediction and its correctness, in the order of `predictions`.
+
+        Raises:
+            KeyError: If a riddle ID is not in the index.
+        """
+        return [cls.score(prediction, index[riddle_id]) for riddle_id, prediction in predictions]
+
     @classmethod
     def evaluate(cls, prediction: str, riddle: Riddle) -> bool:
         """
@@ -51,10 +113,4 @@ class Evaluator:
         Returns:
             True if the prediction is correct, False otherwise.
         """
-        normalized_prediction = cls.normalize(prediction)
-
-        for answer in riddle.acceptable_answers:
-            if normalized_prediction == cls.normalize(answer):
-                return True
-
-        return False
+        return cls.score(prediction, cls.normalize_answers(riddle.acceptable_answers))[1]
@@ -0,0 +1,342 @@
+import math
+import random
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+DEFAULT_BOOTSTRAP_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+
+
+def pass_at_k(n: int, c: int, k: int) -> float:
+    """
+    Unbiased estimator of pass@k: the probability that at least one of k samples is correct.
+
+    Args:
+        n: Number of samples drawn for the riddle.
+        c: Number of correct samples.
+        k: Number of attempts allowed.
+
+    Returns:
+        1 - C(n - c, k) / C(n, k).
+    """
+    if n - c < k:
+        return 1.0
+    return 1.0 - math.comb(n - c, k) / math.comb(n, k)
+
+
+def default_ks(samples: int) -> list[int]:
+    """Return the k values reported for a number of samples: 1, powers of two and the number itself."""
+    ks = {samples}
+    k = 1
+    while k < samples:
+        ks.add(k)
+        k *= 2
+    return sorted(ks)
+
+
+def _mean(values: Sequence[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile of already sorted values."""
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def compute_sample_statistics(
+    outcomes: Mapping[str, Sequence[bool]],
+    ks: Sequence[int] | None = None,
+    resamples: int = DEFAULT_BOOTSTRAP_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Summarize repeated samples with accuracy, pass@k and bootstrap confidence intervals.
+
+    A riddle's solve rate and pass@k values only depend on its sample and correct counts, so
+    riddles are grouped by those counts. Resampling riddles with replacement then amounts to
+    drawing how many riddles of each group the resample contains, a multinomial draw made of
+    one binomial draw per group. Each resample thus costs the number of groups (e.g., 9 with
+    8 samples per riddle) instead of the number of riddles.
+
+    Args:
+        outcomes: Correctness of each sample, keyed by riddle ID.
+        ks: The k values of pass@k. Defaults to default_ks of the largest sample count.
+        resamples: Number of bootstrap resamples.
+        confidence: Confidence level of the intervals.
+        seed: Seed of the bootstrap, so that reports are reproducible.
+
+    Returns:
+        A dictionary with "mean_accuracy", "accuracy_ci", "pass_at_k", "pass_at_k_ci"
+        and "solve_rate" (per riddle).
+    """
+    riddle_ids = list(outcomes)
+    counts = [(len(outcomes[riddle_id]), sum(outcomes[riddle_id])) for riddle_id in riddle_ids]
+    if ks is None:
+        ks = default_ks(max((n for n, _ in counts), default=1))
+
+    def rates(n: int, c: int) -> tuple[float, dict[int, float]]:
+        solve_rate = c / n if n else 0.0
+        return solve_rate, {k: pass_at_k(n, c, k) if n >= k else float(c > 0) for k in ks}
+
+    groups = Counter(counts)
+    group_rates = {count: rates(*count) for count in groups}
+    solve_rates = [group_rates[count][0] for count in counts]
+
+    def weighted_mean(weights: Mapping[tuple[int, int], int], size: int) -> tuple[float, dict[int, float]]:
+        accuracy = sum(weight * group_rates[count][0] for count, weight in weights.items()) / size
+        pass_rates = {k: sum(weight * group_rates[count][1][k] for count, weight in weights.items()) / size for k in ks}
+        return accuracy, pass_rates
+
+    # Bootstrap over riddles: every resample reuses the same group draw for all metrics
+    rng = random.Random(seed)
+    size = len(riddle_ids)
+    accuracy_draws = []
+    pass_draws: dict[int, list[float]] = {k: [] for k in ks}
+    if size:
+        for _ in range(resamples):
+            weights = {}
+            remaining, unassigned = size, size
+            for count, group_size in groups.items():
+                # Binomial draw of the group's share of the riddles not yet drawn into earlier groups
+                drawn = (
+                    rng.binomialvariate(remaining, group_size / unassigned) if group_size < unassigned else remaining
+                )
+                weights[count] = drawn
+                remaining -= drawn
+                unassigned -= group_size
+            accuracy, pass_rates = weighted_mean(weights, size)
+            accuracy_draws.append(accuracy)
+            for k in ks:
+                pass_draws[k].append(pass_rates[k])
+
+    def interval(draws: list[float]) -> list[float]:
+        if not draws:
+            return [0.0, 0.0]
+        draws = sorted(draws)
+        alpha = (1.0 - confidence) / 2
+        return [_percentile(draws, alpha), _percentile(draws, 1.0 - alpha)]
+
+    mean_accuracy, mean_pass_rates = weighted_mean(groups, size) if size else (0.0, dict.fromkeys(ks, 0.0))
+    return {
+        "mean_accuracy": mean_accuracy,
+        "accuracy_ci": interval(accuracy_draws),
+        "pass_at_k": {str(k): mean_pass_rates[k] for k in ks},
+        "pass_at_k_ci": {str(k): interval(pass_draws[k]) for k in ks},
+        "solve_rate": dict(zip(riddle_ids, solve_rates, strict=True)),
+    }
+
+
+def sequential_sign_test(wins: int, losses: int, alpha: float) -> dict[str, Any]:
+    """
+    Anytime-valid sign test of paired outcomes, for deciding a comparison as data arrives.
+
+    Only discordant pairs count: under the null hypothesis each is equally likely to favor
+    either model. The evidence is the mixture likelihood ratio of a uniform prior on the win
+    probability against 1/2, B(wins + 1, losses + 1) * 2^(wins + losses). It is a martingale
+    under the null, so by Ville's inequality stopping as soon as it reaches 1 / alpha keeps
+    the error rate below alpha however often it is checked.
+
+    Args:
+        wins: Pairs that only the first model answered correctly.
+        losses: Pairs that only the second model answered correctly.
+        alpha: Error rate of the decision (1 - confidence).
+
+    Returns:
+        A dictionary with the counts, the "evidence" (likelihood ratio), the anytime-valid
+        "p_value" (min(1, 1 / evidence)) and whether the comparison is "decided".
+    """
+    n = wins + losses
+    log_evidence = math.lgamma(wins + 1) + math.lgamma(losses + 1) - math.lgamma(n + 2) + n * math.log(2)
+    evidence = math.exp(log_evidence)
+    return {
+        "wins": wins,
+        "losses": losses,
+        "evidence": evidence,
+        "p_value": min(1.0, 1.0 / evidence),
+        "decided": log_evidence >= -math.log(alpha),
+    }
+
+
+def _distribution(values: Sequence[float]) -> dict[str, float | None]:
+    """Mean and tail percentiles of a latency distribution (None if empty)."""
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    return {
+        "mean": _mean(ordered),
+        "p50": _percentile(ordered, 0.50),
+        "p95": _percentile(ordered, 0.95),
+        "p99": _percentile(ordered, 0.99),
+    }
+
+
+# Summed metrics of the requests, keyed by their name in the summary
+_TOTALS = {
+    "prompt_tokens": "prompt_tokens",
+    "cached_tokens": "cached_tokens",
+    "completion_tokens": "completion_tokens",
+    "reasoning_tokens": "reasoning_tokens",
+    "total_cost": "cost",
+    "image_bytes": "image_bytes",
+}
+
+
+class RunStatistics:
+    """
+    Scores and request metrics of a run, accumulated record by record.
+
+    Only the outcome of each sample and the latencies are kept, so that the records
+    themselves can be streamed to a journal instead of being held until the run ends.
+    """
+
+    def __init__(self) -> None:
+        self.outcomes: dict[str, list[bool]] = {}
+        self.unfinished = 0
+        self._requests = 0
+        self._latencies: list[float] = []
+        self._queue_waits: list[float] = []
+        self._counts: Counter[str] = Counter()
+        self._totals: dict[str, int | float] = {}
+
+    def add_riddle(self, riddle_id: str) -> None:
+        """Count a riddle of the run, so that its missing samples are scored as incorrect."""
+        self.outcomes.setdefault(riddle_id, [])
+
+    def add(self, record: Mapping[str, Any]) -> None:
+        """
+        Add a result record. Records of riddles that were not added are ignored by the scores.
+
+        Args:
+            record: The result of one sample ("riddle_id", "is_correct" and optionally "metrics").
+        """
+        outcomes = self.outcomes.get(record["riddle_id"])
+        if outcomes is not None:
+            outcomes.append(bool(record.get("is_correct")))
+        if record.get("unfinished"):
+            self.unfinished += 1
+        metrics = record.get("metrics")
+        if metrics is not None:
+            self.add_metrics(metrics)
+
+    def add_metrics(self, metrics: Mapping[str, Any]) -> None:
+        """Add the "metrics" entry of a result record."""
+        self._requests += 1
+        if metrics.get("latency") is not None:
+            self._latencies.append(metrics["latency"])
+        if metrics.get("queue_wait") is not None:
+            self._queue_waits.append(metrics["queue_wait"])
+        self._counts["retried_requests"] += metrics.get("attempts", 0) > 1
+        self._counts["cache_hits"] += bool(metrics.get("cache_hit"))
+        self._counts["hedged_requests"] += bool(metrics.get("hedged"))
+        self._counts["shared_requests"] += bool(metrics.get("shared"))
+        for name, key in _TOTALS.items():
+            if metrics.get(key) is not None:
+                self._totals[name] = self._totals.get(name, 0) + metrics[key]
+
+    def scores(self, samples: int = 1) -> dict[str, Any]:
+        """
+        Compute the accuracy fields of a report summary; missing and errored samples count as incorrect.
+
+        Args:
+            samples: Number of samples per riddle.
+
+        Returns:
+            "total_questions", "correct_answers" and "accuracy", plus "samples", "total_samples",
+            "accuracy_ci", "pass_at_k", "pass_at_k_ci" and "solve_rate" with more than one sample.
+        """
+        total_samples = len(self.outcomes) * samples
+        correct_count = sum(sum(values) for values in self.outcomes.values())
+        summary: dict[str, Any] = {
+            "total_questions": len(self.outcomes),
+            "correct_answers": correct_count,
+            "accuracy": correct_count / total_samples if total_samples > 0 else 0,
+        }
+
+        if samples > 1:
+            # Pad missing samples as incorrect so that every riddle has the same number of draws
+            padded = {
+                riddle_id: values + [False] * (samples - len(values)) for riddle_id, values in self.outcomes.items()
+            }
+            statistics = compute_sample_statistics(padded)
+            summary.update(
+                {
+                    "samples": samples,
+                    "total_samples": total_samples,
+                    "accuracy_ci": statistics["accuracy_ci"],
+                    "pass_at_k": statistics["pass_at_k"],
+                    "pass_at_k_ci": statistics["pass_at_k_ci"],
+                    "solve_rate": statistics["solve_rate"],
+                }
+            )
+        return summary
+
+    def request_metrics(self, elapsed: float, completed: int) -> dict[str, Any]:
+        """
+        Aggregate the per-request instrumentation of the run.
+
+        Args:
+            elapsed: Wall time of the run in seconds.
+            completed: Number of requests completed during the run (excluding resumed ones).
+
+        Returns:
+            A dictionary with latency and queue wait percentiles (seconds), throughput
+            (requests per second), retry, cache, hedge and shared request counts, token totals, total cost and
+            the total size of the images sent.
+        """
+        return {
+            "requests": self._requests,
+            "latency": _distribution(self._latencies),
+            "queue_wait": _distribution(self._queue_waits),
+            "elapsed": elapsed,
+            "throughput": completed / elapsed if elapsed > 0 else None,
+            "retried_requests": self._counts["retried_requests"],
+            "cache_hits": self._counts["cache_hits"],
+            "hedged_requests": self._counts["hedged_requests"],
+            "shared_requests": self._counts["shared_requests"],
+            **{name: self._totals.get(name) for name in _TOTALS},
+        }
+
+
+def summarize_request_metrics(metrics: Sequence[Mapping[str, Any]], elapsed: float, completed: int) -> dict[str, Any]:
+    """
+    Aggregate the per-request instrumentation of a run (see RunStatistics.request_metrics).
+
+    Args:
+        metrics: The "metrics" entries of the result records.
+        elapsed: Wall time of the run in seconds.
+        completed: Number of requests completed during the run (excluding resumed ones).
+    """
+    statistics = RunStatistics()
+    for entry in metrics:
+        statistics.add_metrics(entry)
+    return statistics.request_metrics(elapsed, completed)
+
+
+def summarize_scores(
+    records: Sequence[Mapping[str, Any]], riddle_ids: Sequence[str], samples: int = 1
+) -> dict[str, Any]:
+    """
+    Compute the accuracy fields of a report summary from its result records.
+
+    Records of riddles that are not in `riddle_ids` are ignored; missing and errored samples count as incorrect.
+
+    Args:
+        records: The result records ("riddle_id", "is_correct" and, with several samples, "sample").
+        riddle_ids: IDs of all riddles of the run.
+        samples: Number of samples per riddle.
+
+    Returns:
+        "total_questions", "correct_answers" and "accuracy", plus "samples", "total_samples",
+        "accuracy_ci", "pass_at_k", "pass_at_k_ci" and "solve_rate" with more than one sample.
+    """
+    statistics = RunStatistics()
+    for riddle_id in riddle_ids:
+        statistics.add_riddle(riddle_id)
+    for record in records:
+        statistics.add(record)
+    return statistics.scores(samples)
@@ -0,0 +1,141 @@
+import json
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from riddle_benchmark.evaluation.evaluator import AnswerIndex, Evaluator
+from riddle_benchmark.evaluation.metrics import summarize_request_metrics, summarize_scores
+from riddle_benchmark.journal import RecordKey, record_key
+from riddle_benchmark.utils import get_logger
+
+logger = get_logger(__name__)
+
+REPORT_PATTERN = "results_*.json"
+
+
+def find_reports(paths: Iterable[Path]) -> list[Path]:
+    """
+    Expand the given files and directories into report files.
+
+    Args:
+        paths: Report files, or directories searched (non-recursively) for results_*.json.
+
+    Returns:
+        The report paths in sorted order, without duplicates.
+    """
+    reports: set[Path] = set()
+    for path in paths:
+        if path.is_dir():
+            reports.update(path.glob(REPORT_PATTERN))
+        else:
+            reports.add(path)
+    return sorted(reports)
+
+
+def rescore_report(report: dict[str, Any], answers: Mapping[str, list[str]], index: AnswerIndex) -> dict[str, Any]:
+    """
+    Re-evaluate the predictions of a report against the current answers and recompute its summary.
+
+    Records that errored stay incorrect. Records of riddles that are no longer in the metadata
+    keep their previous evaluation. The report is updated in place.
+
+    Args:
+        report: A report as written by BenchmarkRunner.save_report.
+        answers: Acceptable answers keyed by riddle ID (see DataLoader.load_answers).
+        index: The normalized answer sets from Evaluator.build_index.
+
+    Returns:
+        The updated report.
+    """
+    details: list[dict[str, Any]] = report.get("details", [])
+    scored = [record for record in details if "prediction" in record and record["riddle_id"] in index]
+    scores = Evaluator.evaluate_batch(((record["riddle_id"], record["prediction"] or "") for record in scored), index)
+    for record, (normalized_prediction, is_correct) in zip(scored, scores, strict=True):
+        record["normalized_prediction"] = normalized_prediction
+        record["acceptable_answers"] = answers[record["riddle_id"]]
+        record["is_correct"] = is_correct
+
+    missing = {record["riddle_id"] for record in details if "prediction" in record and record["riddle_id"] not in index}
+    if missing:
+        logger.warning(f"Riddles not found in metadata (kept as is): {', '.join(sorted(missing))}")
+
+    summary: dict[str, Any] = report.setdefault("summary", {})
+    riddle_ids = list(dict.fromkeys(record["riddle_id"] for record in details))
+    summary.update(summarize_scores(details, riddle_ids, samples=summary.get("samples", 1)))
+    summary["rescored_at"] = datetime.now().isoformat()
+    return report
+
+
+def rescore_file(
+    path: Path, answers: Mapping[str, list[str]], index: AnswerIndex, output_path: Path
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    Re-score a saved report file.
+
+    Args:
+        path: The report to read.
+        answers: Acceptable answers keyed by riddle ID (see DataLoader.load_answers).
+        index: The normalized answer sets from Evaluator.build_index.
+        output_path: Where to write the re-scored report (may be `path` itself).
+
+    Returns:
+        The summary before re-scoring and the re-scored report.
+    """
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    previous = dict(report.get("summary", {}))
+    rescore_report(report, answers, index)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return previous, report
+
+
+def merge_reports(reports: Sequence[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Merge the reports of the shards of a run into a single report.
+
+    A later report wins when the same (riddle ID, sample index) appears twice. The
+    summary parameters are taken from the first report, and throughput is computed
+    against the longest shard since the shards are assumed to run in parallel.
+
+    Args:
+        reports: Reports of the same model, as written by BenchmarkRunner.save_report.
+
+    Returns:
+        The merged report.
+
+    Raises:
+        ValueError: If no report is given or the reports are of different models.
+    """
+    if not reports:
+        raise ValueError("No reports to merge")
+    models = {report.get("summary", {}).get("model") for report in reports}
+    if len(models) > 1:
+        raise ValueError(f"Cannot merge reports of different models: {', '.join(sorted(map(str, models)))}")
+
+    records: dict[RecordKey, dict[str, Any]] = {}
+    for report in reports:
+        for record in report.get("details", []):
+            records[record_key(record)] = record
+    details = [records[key] for key in sorted(records)]
+
+    first = reports[0].get("summary", {})
+    parameters = dict(first.get("parameters", {}))
+    if parameters.get("selection"):
+        parameters["selection"] = {k: v for k, v in parameters["selection"].items() if k != "shard"} or None
+    metrics = [record["metrics"] for record in details if "metrics" in record]
+    elapsed = max(report.get("summary", {}).get("metrics", {}).get("elapsed") or 0.0 for report in reports)
+
+    summary = {
+        "model": first.get("model"),
+        "timestamp": datetime.now().isoformat(),
+        "parameters": parameters,
+        **summarize_scores(
+            details, list(dict.fromkeys(record["riddle_id"] for record in details)), samples=first.get("samples", 1)
+        ),
+        "metrics": summarize_request_metrics(metrics, elapsed=elapsed, completed=len(metrics)),
+        "merged_from": len(reports),
+    }
+    return {"summary": summary, "details": details}
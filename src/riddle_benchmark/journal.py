@@ -0,0 +1,161 @@
+import json
+import os
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from riddle_benchmark.utils import get_logger
+
+logger = get_logger(__name__)
+
+JOURNAL_SUFFIX = ".jsonl"
+DEFAULT_FSYNC_EVERY = 16
+DEFAULT_FSYNC_INTERVAL = 5.0  # seconds
+
+# (riddle ID, sample index) identifying a result record
+RecordKey = tuple[str, int]
+
+
+class ResultJournal:
+    """
+    Append-only JSONL journal of per-riddle results.
+
+    Each record is written and flushed as soon as it completes, so a crashed or
+    interrupted run can be resumed from it. Records are fsynced in batches (every
+    `fsync_every` records or `fsync_interval` seconds) to avoid one disk sync per answer.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fsync_every: int = DEFAULT_FSYNC_EVERY,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        """
+        Open the journal for appending.
+
+        Args:
+            path: Path of the journal file. Existing records are kept.
+            fsync_every: Number of records written between two fsyncs.
+            fsync_interval: Maximum number of seconds between two fsyncs.
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def write(self, record: dict[str, Any]) -> None:
+        """
+        Append a result record.
+
+        Args:
+            record: The result of one riddle (must contain "riddle_id").
+        """
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        """Force the written records to disk."""
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """Sync and close the journal."""
+        if self._file.closed:
+            return
+        self._file.flush()
+        self.sync()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def record_key(record: dict[str, Any]) -> RecordKey:
+    """Return the (riddle ID, sample index) identifying a result record."""
+    return str(record["riddle_id"]), int(record.get("sample", 0))
+
+
+def load_journal(path: Path) -> dict[RecordKey, dict[str, Any]]:
+    """
+    Read the records of a journal.
+
+    A truncated last line (e.g., from a crash while writing) is skipped. When a riddle
+    sample appears several times, the latest record wins.
+
+    Args:
+        path: Path of the journal file.
+
+    Returns:
+        The latest record of each riddle sample, keyed by (riddle ID, sample index).
+    """
+    records: dict[RecordKey, dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping unreadable line {line_number} of journal {path}")
+                continue
+            if isinstance(record, dict) and "riddle_id" in record:
+                records[record_key(record)] = record
+    return records
+
+
+def completed_records(records: dict[RecordKey, dict[str, Any]]) -> dict[RecordKey, dict[str, Any]]:
+    """
+    Select the records of riddles that were answered (i.e., did not end in an error).
+
+    Args:
+        records: Records as returned by load_journal.
+
+    Returns:
+        The answered records keyed by (riddle ID, sample index).
+    """
+    return {key: record for key, record in records.items() if "error" not in record}
+
+
+def journal_path_for(report_path: Path) -> Path:
+    """Return the journal path that accompanies a results file."""
+    return report_path.with_suffix(JOURNAL_SUFFIX)
+
+
+def find_journal(directory: Path, model_name: str) -> Path | None:
+    """
+    Find the most recent journal of a model in a directory.
+
+    Journals are named after the results file (results_<model>_<timestamp>.jsonl).
+
+    Args:
+        directory: Directory to search.
+        model_name: The model name (the provider prefix is ignored).
+
+    Returns:
+        The path of the latest journal, or None if there is none.
+    """
+    model_name_for_file = model_name.split("/")[-1]
+    candidates = sorted(directory.glob(f"results_{model_name_for_file}_*{JOURNAL_SUFFIX}"))
+    # Other models whose name starts with this one (e.g., gpt-5 and gpt-5-mini) share the prefix
+    prefix_length = len(f"results_{model_name_for_file}_")
+    candidates = [path for path in candidates if path.stem[prefix_length:].replace("_", "").isdigit()]
+    return candidates[-1] if candidates else None
@@ -1,91 +1,467 @@
-import base64
+import asyncio
 import json
 import logging
-from pathlib import Path
+import time
 from typing import Any, TypeVar
 
 import litellm
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
     before_sleep_log,
-    retry,
-    stop_after_attempt,
+    retry_if_exception,
     wait_exponential,
 )
 
+from riddle_benchmark.budget import SpendTracker
+from riddle_benchmark.concurrency import ConcurrencyLimiter, is_rate_limit_error
 from riddle_benchmark.dataset.schema import Riddle
-from riddle_benchmark.utils import get_logger
+from riddle_benchmark.models.cache import CacheMissError, RequestDeduplicator, ResponseCache
+from riddle_benchmark.models.errors import CircuitBreaker, ErrorKind, classify_error
+from riddle_benchmark.models.fake import FAKE_PROVIDER, register_fake_provider
+from riddle_benchmark.models.images import get_image_cache
+from riddle_benchmark.models.policy import LatencyTracker, RequestPolicy
+from riddle_benchmark.models.stats import RequestStats, response_cost
+from riddle_benchmark.profiling import profile_stage
+from riddle_benchmark.ratelimit import (
+    DEFAULT_RATE_LIMIT_PAUSE,
+    RateLimiter,
+    completion_allowance,
+    estimate_request_tokens,
+    get_retry_after,
+)
+from riddle_benchmark.utils import get_logger, get_provider
 
 logger = get_logger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+MAX_ATTEMPTS = 3  # 最大3回
+# Rate-limit errors are transient by nature and get more attempts, spaced by Retry-After
+MAX_RATE_LIMIT_ATTEMPTS = 6
+
+# Error kinds worth another attempt; request and configuration errors would fail the same way again
+RETRYABLE_ERRORS = [ErrorKind.RATE_LIMIT, ErrorKind.TRANSIENT, ErrorKind.SCHEMA]
+# Error kinds that show the provider is unreachable or unusable, as opposed to answering badly
+HARD_FAILURES = [ErrorKind.RATE_LIMIT, ErrorKind.TRANSIENT, ErrorKind.CONFIG]
+
+# Providers that cache a prompt prefix only up to an explicit cache_control marker; the others
+# (OpenAI, Gemini) cache repeated prefixes automatically
+PROMPT_CACHE_MARKER_PROVIDERS = ["anthropic", "bedrock"]
+
+_backoff = wait_exponential(multiplier=1, min=1, max=10)  # 指数バックオフ: 1秒、2秒、4秒、最大10秒
+
+
+def _last_error(retry_state: RetryCallState) -> BaseException | None:
+    return retry_state.outcome.exception() if retry_state.outcome is not None else None
+
+
+def _stop(retry_state: RetryCallState) -> bool:
+    """Stop after MAX_ATTEMPTS, or MAX_RATE_LIMIT_ATTEMPTS if the last attempt was rate limited."""
+    error = _last_error(retry_state)
+    max_attempts = MAX_RATE_LIMIT_ATTEMPTS if error is not None and is_rate_limit_error(error) else MAX_ATTEMPTS
+    return retry_state.attempt_number >= max_attempts
+
+
+def _wait(retry_state: RetryCallState) -> float:
+    """
+    Wait for the provider's Retry-After if given, otherwise back off exponentially.
+
+    A response that did not match the schema is asked again immediately, since the provider is not overloaded.
+    """
+    error = _last_error(retry_state)
+    if error is not None:
+        if classify_error(error) == ErrorKind.SCHEMA:
+            return 0.0
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return retry_after
+    return _backoff(retry_state)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    # Cancellation (e.g., by the deadline) is never retried
+    return isinstance(error, Exception) and classify_error(error) in RETRYABLE_ERRORS
+
+
+def parse_response[S: BaseModel](content: str, response_schema: type[S]) -> S:
+    """
+    Parse the response content, repairing JSON wrapped in text or a code fence.
+
+    Raises:
+        ValidationError: If the content does not match the schema even after the repair.
+    """
+    try:
+        return response_schema.model_validate_json(content)
+    except ValidationError:
+        start, end = content.find("{"), content.rfind("}")
+        if start == -1 or end <= start or (start == 0 and end == len(content) - 1):
+            raise
+        parsed = response_schema.model_validate_json(content[start : end + 1])
+        logger.debug("[Response] Repaired JSON wrapped in extra text")
+        return parsed
+
 
 class Model:
     """
     A unified interface for LLMs using LiteLLM.
     """
 
-    def __init__(self, model_name: str, **kwargs: Any):
+    def __init__(
+        self,
+        model_name: str,
+        response_cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        prompt_cache: bool = False,
+        policy: RequestPolicy | None = None,
+        deduplicator: RequestDeduplicator | None = None,
+        spend: SpendTracker | None = None,
+        **kwargs: Any,
+    ):
         """
         Initialize the model wrapper.
 
         Args:
             model_name: The name of the model to use (e.g., "gpt-4o", "gemini-1.5-pro").
+                "local/fake" uses the built-in fake provider.
+            response_cache: Optional on-disk cache of responses keyed by request content.
+            rate_limiter: Optional requests/tokens-per-minute limiter, possibly shared with other models.
+            prompt_cache: Whether to send the prompt as a separate system message so that providers
+                can cache it as a shared prefix (see build_messages).
+            policy: Timeouts and hedging of the requests. None waits for every request without hedging.
+            deduplicator: Optional deduplicator shared with other models, through which identical
+                requests are sent once.
+            spend: Optional spend budget, possibly shared with other models, which refuses to send
+                requests once it would be exceeded.
             **kwargs: Additional arguments to pass to litellm.completion.
         """
         self.model_name = model_name
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+        self.prompt_cache = prompt_cache
+        self.policy = policy or RequestPolicy()
+        self.deduplicator = deduplicator
+        self.spend = spend
+        self.latencies = (
+            LatencyTracker(self.policy.hedge_quantile, self.policy.hedge_min_samples) if self.policy.hedge else None
+        )
+        self.breaker = (
+            CircuitBreaker(model_name, self.policy.breaker_threshold, self.policy.breaker_cooldown)
+            if self.policy.breaker_threshold is not None
+            else None
+        )
         self.kwargs = kwargs
 
-    @retry(
-        stop=stop_after_attempt(3),  # 最大3回
-        wait=wait_exponential(multiplier=1, min=1, max=10),  # 指数バックオフ: 1秒、2秒、4秒、最大10秒
-        before_sleep=before_sleep_log(logger, logging.WARNING),
-        reraise=True,  # 最終的に失敗した場合は例外を再発生
-    )
-    async def solve(self, riddle: Riddle, response_schema: type[T], prompt: str | None = None) -> T:
+        if get_provider(model_name) == FAKE_PROVIDER:
+            register_fake_provider()
+
+    async def solve(
+        self,
+        riddle: Riddle,
+        response_schema: type[T],
+        prompt: str | None = None,
+        messages: list[dict[str, Any]] | None = None,
+        sample: int = 0,
+        stats: RequestStats | None = None,
+        limiter: ConcurrencyLimiter | None = None,
+    ) -> T:
         """
         Solve a riddle using the LLM with automatic retry on API errors.
 
+        If a response cache is configured, byte-identical requests are served from it
+        without calling the provider.
+
         Args:
             riddle: The riddle to solve.
             response_schema: The Pydantic model to use for the response schema.
             prompt: Optional prompt to use for the request.
+            messages: Messages already built by build_messages for this riddle and prompt,
+                shared by repeated samples. Built from the riddle if None.
+            sample: Index of the sample when the riddle is solved several times.
+            stats: Optional object filled with the attempt count, token usage and cost of the call.
+            limiter: Optional concurrency limiter to which the latency and outcome of every attempt
+                (including rate-limited ones that are retried) are reported, so that an adaptive
+                limit backs off while the retries are still running.
 
         Returns:
             The parsed response object (instance of response_schema).
 
         Raises:
+            CacheMissError: If the cache is in replay mode and has no entry for the request.
+            TimeoutError: If the request did not complete within the deadline of the policy.
+            CircuitOpenError: If the circuit breaker of the model is open after repeated failures.
+            BudgetExceededError: If the request was not sent because the spend budget is exhausted.
             Various exceptions from litellm if all retry attempts fail.
         """
-        messages = self._construct_messages(riddle, prompt)
+        if messages is None:
+            messages = self.build_messages(riddle, prompt)
 
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"[Request] Model: {self.model_name}, Riddle ID: {riddle.id}")
-            logger.debug(f"[Request] Messages: {self._format_messages_for_log(messages)}")
+            with profile_stage("format_log"):
+                formatted = self._format_messages_for_log(messages)
+            logger.debug(f"[Request] Messages: {formatted}")
             logger.debug(f"[Request] Extra params: {self.kwargs}")
 
-        response = await litellm.acompletion(
-            model=self.model_name,
-            messages=messages,
-            response_format=response_schema,
-            **self.kwargs,
-        )
-
-        content = response.choices[0].message.content
-        if content is None:
-            raise ValueError("Model returned empty content")
+        cache_key = None
+        if self.response_cache is not None:
+            with profile_stage("cache_lookup"):
+                cache_key = self.response_cache.make_key(
+                    self.model_name, messages, response_schema, self.kwargs, sample=sample
+                )
+                cached_content = self.response_cache.get(cache_key)
+            if cached_content is not None:
+                logger.debug(f"[Cache] Hit for riddle ID: {riddle.id}")
+                if stats is not None:
+                    stats.cache_hit = True
+                with profile_stage("parse"):
+                    # The raw content is cached, so it may need the same repair as when it was received
+                    return parse_response(cached_content, response_schema)
+            if self.response_cache.replay:
+                raise CacheMissError(f"No cached response for riddle {riddle.id} (replay mode)")
+
+        shared = False
+        try:
+            async with asyncio.timeout(self.policy.deadline):
+                if self.deduplicator is None:
+                    content, parsed = await self._complete(messages, response_schema, stats, limiter)
+                else:
+                    if cache_key is None:
+                        cache_key = ResponseCache.make_key(
+                            self.model_name, messages, response_schema, self.kwargs, sample=sample
+                        )
+                    (content, parsed), shared = await self.deduplicator.fetch(
+                        cache_key, lambda: self._complete(messages, response_schema, stats, limiter)
+                    )
+                    if shared and stats is not None:
+                        stats.shared = True
+        except TimeoutError as e:
+            if self.policy.deadline is None:
+                raise
+            raise TimeoutError(f"Request did not complete within {self.policy.deadline}s") from e
 
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"[Response] Riddle ID: {riddle.id}")
             logger.debug(f"[Response] Content: {content}")
 
-        return response_schema.model_validate_json(content)
+        if self.response_cache is not None and cache_key is not None and not shared:
+            self.response_cache.put(cache_key, content, model_name=self.model_name)
+
+        return parsed
 
-    def _construct_messages(self, riddle: Riddle, prompt: str | None = None) -> list[dict[str, Any]]:
+    async def _complete(
+        self,
+        messages: list[dict[str, Any]],
+        response_schema: type[T],
+        stats: RequestStats | None = None,
+        limiter: ConcurrencyLimiter | None = None,
+    ) -> tuple[str, T]:
+        """
+        Send the request to the provider and parse the response, retrying on errors.
+
+        Errors are retried according to their kind (see ErrorKind): configuration and rejected
+        requests fail at once, and malformed responses are asked again without backoff. The
+        outcome is reported to the circuit breaker, which rejects the request up front while
+        the model is failing: a response counts as a success and a hard failure as a failure,
+        while rejected requests, malformed responses and cancellations leave it as is. Each
+        attempt is bounded by the timeout of the policy and, with hedging enabled, duplicated
+        once it runs longer than the recent latency quantile.
+
+        Args:
+            messages: The messages payload.
+            response_schema: The Pydantic model to use for the response schema.
+            stats: Optional object filled with the attempt count, token usage and cost.
+            limiter: Optional concurrency limiter to which the outcome of every attempt is reported.
+
+        Returns:
+            A tuple of the raw response content and the parsed response object.
+        """
+        if self.breaker is None:
+            return await self._complete_with_retries(messages, response_schema, stats, limiter)
+
+        trial = self.breaker.check()
+        try:
+            result = await self._complete_with_retries(messages, response_schema, stats, limiter)
+        except asyncio.CancelledError:
+            if trial:
+                self.breaker.release_trial()
+            raise
+        except Exception as e:
+            if classify_error(e) in HARD_FAILURES:
+                self.breaker.record_failure(e)
+            elif trial:
+                # Neither a rejected request nor a malformed response tells whether the model is up
+                self.breaker.release_trial()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _complete_with_retries(
+        self,
+        messages: list[dict[str, Any]],
+        response_schema: type[T],
+        stats: RequestStats | None = None,
+        limiter: ConcurrencyLimiter | None = None,
+    ) -> tuple[str, T]:
+        """Run the attempts of _complete."""
+        estimated_tokens = (
+            estimate_request_tokens(messages, self.kwargs)
+            if self.rate_limiter is not None or self.spend is not None
+            else 0
+        )
+
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception(_is_retryable),
+            stop=_stop,
+            wait=_wait,
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True,  # 最終的に失敗した場合は例外を再発生
+        ):
+            with attempt:
+                if stats is not None:
+                    stats.attempts += 1
+
+                started_at = time.perf_counter()
+                try:
+                    async with asyncio.timeout(self.policy.timeout):
+                        if self.latencies is None:
+                            response = await self._send(messages, response_schema, estimated_tokens, limiter)
+                        else:
+                            response = await self._send_hedged(
+                                messages, response_schema, estimated_tokens, self.latencies.threshold(), stats, limiter
+                            )
+                except TimeoutError as e:
+                    if self.policy.timeout is None:
+                        raise
+                    error = TimeoutError(f"Attempt timed out after {self.policy.timeout}s")
+                    # The requests cut off by the timeout were cancelled, so _send did not report them
+                    if limiter is not None:
+                        limiter.on_complete(time.perf_counter() - started_at, error)
+                    raise error from e
+                if self.latencies is not None:
+                    self.latencies.record(time.perf_counter() - started_at)
+
+                if self.rate_limiter is not None:
+                    usage = getattr(response, "usage", None)
+                    total_tokens = getattr(usage, "total_tokens", None)
+                    if isinstance(total_tokens, int):
+                        self.rate_limiter.reconcile(estimated_tokens, total_tokens)
+                if stats is not None:
+                    stats.record_response(response)
+
+                content = response.choices[0].message.content
+                if content is None:
+                    raise ValueError("Model returned empty content")
+
+                with profile_stage("parse"):
+                    return content, parse_response(content, response_schema)
+
+        raise RuntimeError("Retry loop exited without a result")
+
+    async def _send(
+        self,
+        messages: list[dict[str, Any]],
+        response_schema: type[T],
+        estimated_tokens: int,
+        limiter: ConcurrencyLimiter | None = None,
+    ) -> Any:
+        """
+        Send one request to the provider, admitted by the spend budget and the rate limiter if any.
+
+        Rate-limit errors pause the limiter for the provider's Retry-After period. Every request
+        (including retries and hedges) reserves its projected spend, which is replaced by the
+        actual usage once the response arrives, and reports its latency and outcome to the
+        concurrency limiter, if any. Cancelled requests (e.g., the loser of a hedge) are not reported;
+        attempts cut off by the timeout are reported by _complete_with_retries.
+        """
+        started_at = 0.0
+        reservation = None
+        if self.spend is not None:
+            completion_tokens = completion_allowance(self.kwargs)
+            reservation = self.spend.reserve(self.model_name, estimated_tokens - completion_tokens, completion_tokens)
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(estimated_tokens)
+            started_at = time.monotonic()
+            response = await litellm.acompletion(
+                model=self.model_name,
+                messages=messages,
+                response_format=response_schema,
+                **self.kwargs,
+            )
+        except BaseException as e:
+            if limiter is not None and started_at and isinstance(e, Exception):
+                limiter.on_complete(time.monotonic() - started_at, e)
+            if reservation is not None:
+                assert self.spend is not None
+                self.spend.release(reservation)
+            if self.rate_limiter is not None and is_rate_limit_error(e):
+                retry_after = get_retry_after(e)
+                self.rate_limiter.pause(DEFAULT_RATE_LIMIT_PAUSE if retry_after is None else retry_after)
+            raise
+        if reservation is not None:
+            assert self.spend is not None
+            total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+            self.spend.settle(
+                reservation, total_tokens if isinstance(total_tokens, int) else None, response_cost(response)
+            )
+        if limiter is not None:
+            limiter.on_complete(time.monotonic() - started_at, None)
+        return response
+
+    async def _send_hedged(
+        self,
+        messages: list[dict[str, Any]],
+        response_schema: type[T],
+        estimated_tokens: int,
+        hedge_after: float | None,
+        stats: RequestStats | None = None,
+        limiter: ConcurrencyLimiter | None = None,
+    ) -> Any:
+        """
+        Send a request, and a duplicate if it is still running after `hedge_after` seconds.
+
+        The first successful response wins and the other request is cancelled. The attempt
+        fails only if both requests fail.
+        """
+        primary = asyncio.ensure_future(self._send(messages, response_schema, estimated_tokens, limiter))
+        tasks = {primary}
+        try:
+            if hedge_after is None:
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                logger.debug(f"[Hedge] Duplicating a request running for more than {hedge_after:.2f}s")
+                if stats is not None:
+                    stats.hedged = True
+                tasks.add(asyncio.ensure_future(self._send(messages, response_schema, estimated_tokens, limiter)))
+
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task_error = task.exception()
+                    if task_error is None:
+                        return task.result()
+                    error = task_error
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def build_messages(self, riddle: Riddle, prompt: str | None = None) -> list[dict[str, Any]]:
         """
         Construct the messages payload for LiteLLM.
 
+        By default the prompt, question and image are sent as a single user message. With
+        prompt caching enabled, the prompt becomes a system message that is identical for
+        every riddle, so that it forms a prefix the provider can cache; it is marked with
+        cache_control for the providers that require it.
+
         Args:
             riddle: The riddle object.
             prompt: Optional prompt to use for the request.
@@ -93,8 +469,14 @@ class Model:
         Returns:
             A list of message dictionaries.
         """
+        messages: list[dict[str, Any]] = []
         text_components = []
-        if prompt:
+        if prompt and self.prompt_cache:
+            system_part: dict[str, Any] = {"type": "text", "text": prompt}
+            if get_provider(self.model_name) in PROMPT_CACHE_MARKER_PROVIDERS:
+                system_part["cache_control"] = {"type": "ephemeral"}
+            messages.append({"role": "system", "content": [system_part]})
+        elif prompt:
             text_components.append(prompt)
 
         question_hint_components = []
@@ -122,20 +504,27 @@ class Model:
         content.append(
             {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{self._encode_image(riddle.image_path)}"},
+                "image_url": {"url": self._encode_image(riddle)},
             }
         )
 
-        messages = [{"role": "user", "content": content}]
+        messages.append({"role": "user", "content": content})
 
         return messages
 
-    def _encode_image(self, image_path: Path) -> str:
+    def _encode_image(self, riddle: Riddle) -> str:
         """
-        Encode an image file to base64 string.
+        Encode the image of a riddle to a base64 data URL.
+
+        The encoded URL is shared through the process-wide image cache, so retries,
+        repeated samples and other models reuse the same buffer. Images already in
+        memory (from a packed dataset) are encoded without touching the file system.
         """
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
+        if riddle.image_data is not None:
+            return get_image_cache().get_data_url_from_bytes(
+                str(riddle.image_path), riddle.image_data, riddle.image_mime_type
+            )
+        return get_image_cache().get_data_url(riddle.image_path)
 
     def _format_messages_for_log(self, messages: list[dict[str, Any]]) -> str:
         """
@@ -0,0 +1,266 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from enum import StrEnum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from riddle_benchmark.utils import get_logger
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = Path(".riddle_cache")
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512 MiB
+
+
+class CacheMode(StrEnum):
+    """
+    How the response cache interacts with provider calls.
+
+    - read: Serve hits from the cache and store misses (read-through).
+    - write: Always call the provider and overwrite the cached entry.
+    - readonly: Serve hits from the cache but never store new entries.
+    - off: Disable the cache entirely.
+    """
+
+    READ = "read"
+    WRITE = "write"
+    READONLY = "readonly"
+    OFF = "off"
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request has no cached response."""
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of raw model responses.
+
+    Each entry is a JSON file named by the SHA-256 of the request (model name, messages,
+    response schema and extra parameters), so byte-identical requests from any run map
+    to the same entry. The total size is bounded by evicting the least recently used
+    entries.
+
+    The entries and their sizes are indexed in memory in access order, from a single scan of
+    the directory (ordered by modification time, which reads refresh) the first time an entry
+    is stored, so that writes and evictions do not rescan the cache. Entries written or read
+    by other processes meanwhile are only ordered by that scan.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        mode: CacheMode = CacheMode.READ,
+        max_bytes: int | None = DEFAULT_CACHE_MAX_BYTES,
+        replay: bool = False,
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            cache_dir: Directory where cache entries are stored.
+            mode: How the cache interacts with provider calls.
+            max_bytes: Maximum total size of the cache in bytes. None means unbounded.
+            replay: If True, never call the provider; a cache miss raises CacheMissError.
+        """
+        self.cache_dir = cache_dir
+        self.mode = CacheMode.READONLY if replay else mode
+        self.max_bytes = max_bytes
+        self.replay = replay
+        # Entry sizes in least to most recently used order, loaded on the first write
+        self._index: OrderedDict[Path, int] | None = None
+        self._total_bytes = 0
+
+    @property
+    def can_read(self) -> bool:
+        """Whether cached responses may be served."""
+        return self.mode in (CacheMode.READ, CacheMode.READONLY)
+
+    @property
+    def can_write(self) -> bool:
+        """Whether new responses may be stored."""
+        return self.mode in (CacheMode.READ, CacheMode.WRITE)
+
+    @staticmethod
+    def make_key(
+        model_name: str,
+        messages: list[dict[str, Any]],
+        response_schema: "type[BaseModel]",
+        kwargs: dict[str, Any],
+        sample: int = 0,
+    ) -> str:
+        """
+        Compute the cache key for a request.
+
+        Args:
+            model_name: The name of the model.
+            messages: The messages payload sent to the provider.
+            response_schema: The Pydantic model used as the response format.
+            kwargs: Additional parameters passed to the provider.
+            sample: Index of the sample when a request is repeated, so that each sample
+                gets its own entry. Sample 0 shares the key of a single request.
+
+        Returns:
+            A hex SHA-256 digest identifying the request.
+        """
+        payload: dict[str, Any] = {
+            "model": model_name,
+            "messages": messages,
+            "schema": response_schema.model_json_schema(),
+            "kwargs": kwargs,
+        }
+        if sample:
+            payload["sample"] = sample
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Look up a cached response.
+
+        Args:
+            key: The cache key from make_key.
+
+        Returns:
+            The cached response content, or None on a miss (or if reading is disabled).
+        """
+        if not self.can_read:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+        # Touch the entry so that eviction is least-recently-used rather than oldest-written,
+        # also for the index built by later runs
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if self._index is not None and path in self._index:
+            self._index.move_to_end(path)
+
+        content = entry.get("content")
+        return content if isinstance(content, str) else None
+
+    def put(self, key: str, content: str, model_name: str | None = None) -> None:
+        """
+        Store a response in the cache.
+
+        Args:
+            key: The cache key from make_key.
+            content: The raw response content.
+            model_name: Optional model name stored alongside the entry for inspection.
+        """
+        if not self.can_write:
+            return
+
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"model": model_name, "content": content}, ensure_ascii=False).encode("utf-8")
+        index = self._load_index()
+
+        # Write atomically so that concurrent runs never observe a partial entry
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        self._total_bytes += len(data) - index.pop(path, 0)
+        index[path] = len(data)
+
+        if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> OrderedDict[Path, int]:
+        """Return the index of the entries, scanning the directory the first time."""
+        if self._index is None:
+            entries = []
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((path, size) for _, path, size in entries)
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        assert self.max_bytes is not None and self._index is not None
+        evicted = 0
+        while self._total_bytes > self.max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} cache entries (cache size: {self._total_bytes} bytes)")
+
+
+class RequestDeduplicator:
+    """
+    Sends identical requests once and shares the response, e.g. across the cells of a sweep grid.
+
+    Requests are identified by their response cache key (see ResponseCache.make_key). The first
+    request with a key is sent in a task of its own, so that a caller giving up (e.g., at its
+    deadline) does not cancel it for the others; identical requests made while it is in flight
+    wait for it and share its result. Completed requests are forgotten, so that responses are
+    not held for the rest of the run; identical requests made afterwards are served by the
+    response cache, if any.
+    """
+
+    def __init__(self) -> None:
+        self.shared = 0
+        self._tasks: dict[str, asyncio.Task[Any]] = {}
+
+    async def fetch[R](self, key: str, send: Callable[[], Awaitable[R]]) -> tuple[R, bool]:
+        """
+        Send a request unless an identical one was already sent.
+
+        Args:
+            key: The cache key of the request.
+            send: Sends the request. Only called for the first request with the key.
+
+        Returns:
+            The result of the request, and whether it was shared with an earlier identical request.
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(send())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        result: R = await asyncio.shield(task)
+        if shared:
+            self.shared += 1
+        return result, shared
+
+    def _forget(self, key: str, task: asyncio.Task[Any]) -> None:
+        # Retrieving the exception also keeps asyncio from logging it when no caller is left
+        if not task.cancelled():
+            task.exception()
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
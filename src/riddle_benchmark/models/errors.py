@@ -0,0 +1,163 @@
+import time
+from enum import StrEnum
+
+from riddle_benchmark.concurrency import is_rate_limit_error
+from riddle_benchmark.utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN = 30.0
+
+# Errors about the content of one request rather than the model configuration
+_REQUEST_ERRORS = ["ContentPolicyViolationError", "ContextWindowExceededError"]
+
+# Bad requests that every request of the model would get (LiteLLM rejects them before sending)
+_CONFIG_ERRORS = ["UnsupportedParamsError"]
+
+# Authentication, permission and unknown model: the model is unusable whatever the request
+_CONFIG_STATUS_CODES = frozenset({401, 403, 404})
+
+
+class ErrorKind(StrEnum):
+    """
+    How a failed attempt is handled.
+
+    - rate_limit: Throttled (429). Retried after Retry-After, with more attempts.
+    - transient: Timeouts, connection errors and 5xx, or unknown errors. Retried with backoff.
+    - schema: The model answered but the response did not match the schema. Asked again immediately.
+    - request: This request was rejected (e.g., content policy, context window, spend budget, or
+      another 4xx such as an unreadable image). Not retried.
+    - config: The model is unusable (authentication, permission, unknown model, unsupported
+      parameters). Not retried, and counts towards opening the circuit breaker.
+    """
+
+    RATE_LIMIT = "rate_limit"
+    TRANSIENT = "transient"
+    SCHEMA = "schema"
+    REQUEST = "request"
+    CONFIG = "config"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the provider while the circuit breaker of a model is open."""
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised instead of calling the provider once the spend budget of the run is exhausted."""
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    """
+    Classify the exception of a failed attempt.
+
+    LiteLLM maps provider errors to exceptions carrying the HTTP status code.
+
+    Args:
+        error: The exception raised by the attempt.
+
+    Returns:
+        The kind of error, which decides whether and how the attempt is retried.
+    """
+    if is_rate_limit_error(error):
+        return ErrorKind.RATE_LIMIT
+    # Retrying would be refused as well, and the model is not at fault
+    if isinstance(error, BudgetExceededError):
+        return ErrorKind.REQUEST
+    # Includes pydantic's ValidationError and json.JSONDecodeError
+    if isinstance(error, ValueError):
+        return ErrorKind.SCHEMA
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names.intersection(_REQUEST_ERRORS):
+        return ErrorKind.REQUEST
+    if names.intersection(_CONFIG_ERRORS):
+        return ErrorKind.CONFIG
+    status_code = getattr(error, "status_code", None)
+    if status_code in _CONFIG_STATUS_CODES:
+        return ErrorKind.CONFIG
+    # Other client errors (e.g., a 400 for an unreadable image) are about this request only,
+    # so that one bad input does not open the circuit for the whole model
+    if isinstance(status_code, int) and 400 <= status_code < 500 and status_code != 408:
+        return ErrorKind.REQUEST
+    return ErrorKind.TRANSIENT
+
+
+class CircuitBreaker:
+    """
+    Stops calling a model after consecutive hard failures.
+
+    Configuration errors and requests that failed after all their retries count as hard
+    failures; any successful request resets the count. When `threshold` consecutive hard
+    failures occur the circuit opens and requests fail immediately with CircuitOpenError.
+    After `cooldown` seconds a single trial request is let through: its success closes
+    the circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self, name: str, threshold: int = DEFAULT_BREAKER_THRESHOLD, cooldown: float = DEFAULT_BREAKER_COOLDOWN
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Name of the model, for logging.
+            threshold: Number of consecutive hard failures that opens the circuit.
+            cooldown: Seconds the circuit stays open before a trial request.
+        """
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._last_error: BaseException | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests are currently rejected."""
+        return self._opened_at is not None
+
+    def check(self) -> bool:
+        """
+        Admit a request, or reject it while the circuit is open.
+
+        Returns:
+            Whether the request is admitted as the trial request of an open circuit.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (and no trial request is due).
+        """
+        if self._opened_at is None:
+            return False
+        if not self._trial_in_flight and time.monotonic() - self._opened_at >= self.cooldown:
+            self._trial_in_flight = True
+            return True
+        raise CircuitOpenError(f"Circuit breaker open for {self.name} after repeated failures: {self._last_error}")
+
+    def record_success(self) -> None:
+        """Reset the failure count and close the circuit."""
+        if self._opened_at is not None:
+            logger.info(f"{self.name}: circuit breaker closed")
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Let another trial request through after a trial that was inconclusive (e.g., cancelled)."""
+        self._trial_in_flight = False
+
+    def record_failure(self, error: BaseException) -> None:
+        """Count a hard failure, opening the circuit at the threshold or after a failed trial."""
+        self._failures += 1
+        self._last_error = error
+        if self._opened_at is not None:
+            if self._trial_in_flight:
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+            return
+        if self._failures >= self.threshold:
+            self._opened_at = time.monotonic()
+            logger.error(
+                f"{self.name}: {self._failures} consecutive failures, failing fast for {self.cooldown:.0f}s "
+                f"(last error: {error})"
+            )
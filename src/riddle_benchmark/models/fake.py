@@ -0,0 +1,140 @@
+import asyncio
+import json
+import math
+import random
+from typing import Any
+
+import httpx
+import litellm
+from litellm.exceptions import RateLimitError, ServiceUnavailableError
+from litellm.llms.custom_llm import CustomLLM
+from litellm.types.utils import ModelResponse
+from pydantic import BaseModel
+
+from riddle_benchmark.ratelimit import estimate_prompt_tokens
+
+FAKE_PROVIDER = "local"
+FAKE_MODEL = f"{FAKE_PROVIDER}/fake"
+
+_FAKE_REQUEST = httpx.Request("POST", "http://localhost/fake")
+
+
+class FakeProviderConfig(BaseModel):
+    """
+    Behaviour of the fake provider, given as extra parameters of the request
+    (e.g., `--extra-params '{"latency": 0.2, "rate_limit_rate": 0.05}'`).
+
+    Attributes:
+        latency: Median response time in seconds.
+        latency_sigma: Sigma of the log-normal latency distribution. 0 means constant latency.
+        error_rate: Probability that a request fails with a 503 error.
+        rate_limit_rate: Probability that a request fails with a 429 error.
+        retry_after: Retry-After header (in seconds) sent with injected 429 errors. None omits it.
+        answer: The answer returned in the "answer" field of the response schema.
+        completion_tokens: Completion tokens reported in the usage.
+    """
+
+    latency: float = 0.0
+    latency_sigma: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float | None = 0.0
+    answer: str = "fake"
+    completion_tokens: int = 16
+
+
+def _fake_instance(schema: dict[str, Any], answer: str) -> dict[str, Any]:
+    """Build an object that satisfies a flat JSON schema of the response."""
+    defaults: dict[str, Any] = {"integer": 0, "number": 0.0, "boolean": False, "array": [], "object": {}}
+    instance: dict[str, Any] = {}
+    for name, field in schema.get("properties", {}).items():
+        field_type = field.get("type", "string")
+        if field_type == "string":
+            instance[name] = answer if name == "answer" else f"fake {name}"
+        else:
+            instance[name] = defaults.get(field_type)
+    return instance
+
+
+class FakeLLM(CustomLLM):
+    """
+    Stand-in LLM provider that answers locally without network access.
+
+    It returns schema-valid answers after a configurable latency and injects errors and
+    rate-limit responses at configurable rates, so that the concurrency, retry and I/O
+    paths of the harness can be measured offline.
+    """
+
+    def __init__(self, seed: int | None = None):
+        """
+        Initialize the fake provider.
+
+        Args:
+            seed: Seed of the latency and error draws.
+        """
+        super().__init__()
+        self.rng = random.Random(seed)
+
+    def sample_latency(self, config: FakeProviderConfig) -> float:
+        """Draw a response time from the configured log-normal distribution."""
+        if config.latency <= 0:
+            return 0.0
+        if config.latency_sigma <= 0:
+            return config.latency
+        return self.rng.lognormvariate(math.log(config.latency), config.latency_sigma)
+
+    async def acompletion(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        optional_params: dict[str, Any] = kwargs.get("optional_params") or {}
+        config = FakeProviderConfig.model_validate(
+            {key: value for key, value in optional_params.items() if key in FakeProviderConfig.model_fields}
+        )
+        model = kwargs.get("model", "fake")
+
+        await asyncio.sleep(self.sample_latency(config))
+
+        draw = self.rng.random()
+        if draw < config.rate_limit_rate:
+            headers = {} if config.retry_after is None else {"retry-after": str(config.retry_after)}
+            raise RateLimitError(
+                "Injected rate limit",
+                llm_provider=FAKE_PROVIDER,
+                model=model,
+                response=httpx.Response(429, headers=headers, request=_FAKE_REQUEST),
+            )
+        if draw < config.rate_limit_rate + config.error_rate:
+            raise ServiceUnavailableError(
+                "Injected error",
+                llm_provider=FAKE_PROVIDER,
+                model=model,
+                response=httpx.Response(503, request=_FAKE_REQUEST),
+            )
+
+        response_format = optional_params.get("response_format") or {}
+        schema = response_format.get("json_schema", {}).get("schema", {"properties": {"answer": {}}})
+        prompt_tokens = estimate_prompt_tokens(kwargs.get("messages") or [])
+        return ModelResponse(
+            model=model,
+            choices=[{"message": {"role": "assistant", "content": json.dumps(_fake_instance(schema, config.answer))}}],
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": config.completion_tokens,
+                "total_tokens": prompt_tokens + config.completion_tokens,
+            },
+        )
+
+
+def register_fake_provider(seed: int | None = None) -> None:
+    """
+    Register the fake provider with LiteLLM under the "local/" prefix (e.g., "local/fake").
+
+    Registering again is a no-op.
+
+    Args:
+        seed: Seed of the latency and error draws.
+    """
+    if any(entry.get("provider") == FAKE_PROVIDER for entry in litellm.custom_provider_map):
+        return
+    litellm.custom_provider_map = [
+        *litellm.custom_provider_map,
+        {"provider": FAKE_PROVIDER, "custom_handler": FakeLLM(seed)},
+    ]
@@ -0,0 +1,203 @@
+import base64
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from enum import StrEnum
+from pathlib import Path
+
+DEFAULT_IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MiB
+
+# Magic numbers of the image formats accepted by the providers
+_SIGNATURES: list[tuple[bytes, str]] = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+class ImageFormat(StrEnum):
+    """Formats images can be re-encoded to before they are sent (see dataset.preprocess)."""
+
+    PNG = "png"
+    JPEG = "jpeg"
+    WEBP = "webp"
+
+
+def detect_mime_type(data: bytes, path: Path | None = None) -> str:
+    """
+    Detect the MIME type of image data.
+
+    The content signature takes precedence over the file extension so that mislabeled
+    files are still sent with the correct type.
+
+    Args:
+        data: The raw image bytes.
+        path: Optional path of the image, used as a fallback hint.
+
+    Returns:
+        The MIME type (e.g., "image/png"). Defaults to "image/jpeg" if unknown.
+    """
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+
+    if path is not None:
+        guessed, _ = mimetypes.guess_type(path.name)
+        if guessed and guessed.startswith("image/"):
+            return guessed
+
+    return "image/jpeg"
+
+
+def encode_data_url(data: bytes | memoryview, path: Path | None = None, mime_type: str | None = None) -> str:
+    """
+    Encode image bytes as a base64 data URL.
+
+    Args:
+        data: The raw image bytes.
+        path: Optional path of the image, used as a MIME type hint.
+        mime_type: MIME type of the image, if already known. Detected from the data otherwise.
+
+    Returns:
+        The data URL (e.g., "data:image/png;base64,...").
+    """
+    if mime_type is None:
+        mime_type = detect_mime_type(bytes(data[:16]), path)
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+class ImageCache:
+    """
+    Process-wide LRU cache of encoded image data URLs.
+
+    Entries are keyed by (path, mtime, size) so that an edited image is re-encoded, and
+    the total size of the cached URLs is bounded by max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_IMAGE_CACHE_MAX_BYTES):
+        """
+        Initialize the image cache.
+
+        Args:
+            max_bytes: Maximum total size of cached data URLs in bytes.
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of the cached data URLs in bytes."""
+        return self._total_bytes
+
+    def get_data_url(self, image_path: Path) -> str:
+        """
+        Return the data URL of an image, encoding it on first use.
+
+        Args:
+            image_path: Path to the image file.
+
+        Returns:
+            The data URL of the image.
+        """
+        try:
+            stat = image_path.stat()
+        except OSError:
+            # Without a stable key there is nothing to cache; let open() report the error
+            return self._encode(image_path)
+
+        return self._get((str(image_path), stat.st_mtime_ns, stat.st_size), lambda: self._encode(image_path))
+
+    def get_data_url_from_bytes(self, name: str, data: bytes | memoryview, mime_type: str | None = None) -> str:
+        """
+        Return the data URL of in-memory image bytes, encoding them on first use.
+
+        The bytes are keyed by their hash, as the name alone may be shared by different images
+        (e.g., the same file name in two packed datasets, or a dataset packed again).
+
+        Args:
+            name: Name identifying the image (e.g., its path inside a packed dataset).
+            data: The raw image bytes.
+            mime_type: MIME type of the image, if already known.
+
+        Returns:
+            The data URL of the image.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        return self._get((f"{name}@{digest}", -1, len(data)), lambda: encode_data_url(data, Path(name), mime_type))
+
+    def _get(self, key: tuple[str, int, int], encode: Callable[[], str]) -> str:
+        """Look up a data URL, encoding and caching it on a miss."""
+        with self._lock:
+            data_url = self._entries.get(key)
+            if data_url is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data_url
+
+        data_url = encode()
+
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries and len(data_url) <= self.max_bytes:
+                self._entries[key] = data_url
+                self._total_bytes += len(data_url)
+                self._evict()
+
+        return data_url
+
+    def resize(self, max_bytes: int) -> None:
+        """
+        Change the memory budget, evicting entries if necessary.
+
+        Args:
+            max_bytes: Maximum total size of cached data URLs in bytes.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove all cached entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes. Caller holds the lock."""
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= len(evicted)
+
+    @staticmethod
+    def _encode(image_path: Path) -> str:
+        with open(image_path, "rb") as image_file:
+            return encode_data_url(image_file.read(), image_path)
+
+
+_image_cache = ImageCache()
+
+
+def get_image_cache() -> ImageCache:
+    """Return the process-wide image cache."""
+    return _image_cache
+
+
+def configure_image_cache(max_bytes: int) -> None:
+    """
+    Set the memory budget of the process-wide image cache.
+
+    Args:
+        max_bytes: Maximum total size of cached data URLs in bytes.
+    """
+    _image_cache.resize(max_bytes)
@@ -0,0 +1,70 @@
+from collections import deque
+
+from pydantic import BaseModel, Field
+
+from riddle_benchmark.models.errors import DEFAULT_BREAKER_COOLDOWN, DEFAULT_BREAKER_THRESHOLD
+
+DEFAULT_HEDGE_QUANTILE = 0.95
+# Successful requests observed before hedging starts, so that the quantile is meaningful
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+DEFAULT_LATENCY_WINDOW = 200
+
+
+class RequestPolicy(BaseModel):
+    """
+    Timeouts, hedging and circuit breaking of the requests of a model.
+
+    Attributes:
+        timeout: Seconds after which an attempt is abandoned and retried. None waits forever.
+        deadline: Seconds after which a solve call fails, including retries and backoff. None waits forever.
+        hedge: Whether to send a duplicate of an attempt that runs longer than the hedge quantile
+            of the recent latencies, and keep whichever response arrives first.
+        hedge_quantile: Latency quantile after which an attempt is hedged.
+        hedge_min_samples: Number of successful attempts observed before hedging starts.
+        breaker_threshold: Consecutive hard failures after which the model's requests fail fast
+            (see CircuitBreaker). None disables the breaker.
+        breaker_cooldown: Seconds the requests fail fast before a trial request.
+    """
+
+    timeout: float | None = Field(default=None, gt=0)
+    deadline: float | None = Field(default=None, gt=0)
+    hedge: bool = False
+    hedge_quantile: float = Field(default=DEFAULT_HEDGE_QUANTILE, gt=0, lt=1)
+    hedge_min_samples: int = Field(default=DEFAULT_HEDGE_MIN_SAMPLES, ge=1)
+    breaker_threshold: int | None = Field(default=DEFAULT_BREAKER_THRESHOLD, ge=1)
+    breaker_cooldown: float = Field(default=DEFAULT_BREAKER_COOLDOWN, ge=0)
+
+
+class LatencyTracker:
+    """
+    Sliding window of the latencies of successful attempts, used to spot stragglers.
+    """
+
+    def __init__(
+        self,
+        quantile: float = DEFAULT_HEDGE_QUANTILE,
+        min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+        window: int = DEFAULT_LATENCY_WINDOW,
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            quantile: The latency quantile returned by `threshold`.
+            min_samples: Number of latencies needed before `threshold` returns a value.
+            window: Number of recent latencies kept.
+        """
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        """Add the latency of a successful attempt."""
+        self._latencies.append(latency)
+
+    def threshold(self) -> float | None:
+        """Return the latency quantile of the window, or None while there are too few samples."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
@@ -0,0 +1,82 @@
+from typing import Any
+
+import litellm
+from pydantic import BaseModel
+
+from riddle_benchmark.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class RequestStats(BaseModel):
+    """
+    Instrumentation of one solve call, filled in by Model.solve.
+
+    Token counts and cost are summed over the attempts that got a response (including the ones
+    retried because the response could not be parsed), and stay None when the provider does not
+    report them (or the response was served from the cache).
+
+    Attributes:
+        attempts: Number of provider calls made, including retries.
+        cache_hit: Whether the response was served from the response cache.
+        hedged: Whether a duplicate request was sent because an attempt was slow.
+        shared: Whether the response of an identical request (e.g., from another cell of a sweep
+            grid) was reused instead of sending this one.
+        prompt_tokens: Prompt tokens (text and images) reported by the provider.
+        cached_tokens: Part of the prompt tokens read from the provider's prompt cache, if reported.
+        completion_tokens: Completion tokens reported by the provider.
+        reasoning_tokens: Part of the completion tokens spent on reasoning, if reported.
+        cost: Estimated cost in USD from the LiteLLM price table.
+    """
+
+    attempts: int = 0
+    cache_hit: bool = False
+    hedged: bool = False
+    shared: bool = False
+    prompt_tokens: int | None = None
+    cached_tokens: int | None = None
+    completion_tokens: int | None = None
+    reasoning_tokens: int | None = None
+    cost: float | None = None
+
+    def record_response(self, response: Any) -> None:
+        """
+        Add the token usage and cost of a LiteLLM response to those of the previous attempts.
+
+        Args:
+            response: The response returned by litellm.acompletion.
+        """
+        usage = getattr(response, "usage", None)
+        self.prompt_tokens = _add(self.prompt_tokens, _as_int(getattr(usage, "prompt_tokens", None)))
+        prompt_details = getattr(usage, "prompt_tokens_details", None)
+        self.cached_tokens = _add(self.cached_tokens, _as_int(getattr(prompt_details, "cached_tokens", None)))
+        self.completion_tokens = _add(self.completion_tokens, _as_int(getattr(usage, "completion_tokens", None)))
+        details = getattr(usage, "completion_tokens_details", None)
+        self.reasoning_tokens = _add(self.reasoning_tokens, _as_int(getattr(details, "reasoning_tokens", None)))
+        self.cost = _add(self.cost, response_cost(response))
+
+
+def _as_int(value: Any) -> int | None:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _add[N: (int, float)](total: N | None, value: N | None) -> N | None:
+    """Add a reported value to a running total, either of which may be unreported (None)."""
+    if value is None:
+        return total
+    return value if total is None else total + value
+
+
+def response_cost(response: Any) -> float | None:
+    """Return the cost LiteLLM computed for a response, or None if the model is not priced."""
+    hidden_params = getattr(response, "_hidden_params", None)
+    if isinstance(hidden_params, dict):
+        cost = hidden_params.get("response_cost")
+        if isinstance(cost, int | float):
+            return float(cost)
+    try:
+        cost = litellm.completion_cost(completion_response=response)
+    except Exception as e:
+        logger.debug(f"Could not compute the cost of the response: {e}")
+        return None
+    return float(cost) if isinstance(cost, int | float) else None
@@ -0,0 +1,208 @@
+import cProfile
+import pstats
+import time
+import tracemalloc
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+# The stage around each request to the provider, over which the harness overhead is spread
+REQUEST_STAGE = "solve"
+
+# Stages that await the provider or a worker thread: their wall time includes whatever other tasks
+# run meanwhile, so they are not counted as harness overhead and their allocations are not attributed
+AWAITING_STAGES = frozenset({REQUEST_STAGE, "prepare_messages"})
+
+DEFAULT_TOP_ENTRIES = 25
+
+_NULL_STAGE: AbstractContextManager[None] = nullcontext()
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "max", "allocated")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.allocated = 0
+
+
+class _StageTimer:
+    """Context manager timing one execution of a stage."""
+
+    __slots__ = ("_stats", "_trace", "_started_at", "_traced_at")
+
+    def __init__(self, stats: _StageStats, trace: bool):
+        self._stats = stats
+        self._trace = trace
+        self._started_at = 0.0
+        self._traced_at = 0
+
+    def __enter__(self) -> None:
+        if self._trace:
+            self._traced_at = tracemalloc.get_traced_memory()[0]
+        self._started_at = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        elapsed = time.perf_counter() - self._started_at
+        stats = self._stats
+        stats.count += 1
+        stats.total += elapsed
+        stats.max = max(stats.max, elapsed)
+        if self._trace:
+            stats.allocated += tracemalloc.get_traced_memory()[0] - self._traced_at
+
+
+class StageProfiler:
+    """
+    Process-wide timers around the stages of the harness (loading, encoding, parsing, ...).
+
+    While disabled, `stage` returns a shared no-op context manager, so the instrumentation
+    costs one attribute check per stage. Once started, it accumulates the wall time of each
+    stage and, optionally, the net memory allocated in it (tracemalloc) and a cProfile capture
+    of the whole process.
+
+    The timers are not thread-safe: stages are timed on the event loop only, and work done in
+    worker threads is timed as the stage awaiting it.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._stages: dict[str, _StageStats] = {}
+        self._trace_memory = False
+        self._cprofile: cProfile.Profile | None = None
+        self._started_at = 0.0
+
+    def start(self, cprofile: bool = False, trace_memory: bool = False) -> None:
+        """
+        Reset the timings and start profiling.
+
+        Args:
+            cprofile: Whether to also capture a cProfile of the process.
+            trace_memory: Whether to attribute allocations to the stages with tracemalloc (slower).
+        """
+        self._stages = {}
+        self._trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._cprofile = cProfile.Profile() if cprofile else None
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        self._started_at = time.perf_counter()
+        self.enabled = True
+
+    def stop(self, top: int = DEFAULT_TOP_ENTRIES) -> dict[str, Any]:
+        """
+        Stop profiling and return the breakdown.
+
+        Args:
+            top: Number of functions and allocation sites listed in the captures.
+
+        Returns:
+            The elapsed time, the count, total, mean and maximum time (and net allocated bytes)
+            of each stage, the harness overhead per request, and the cProfile and tracemalloc
+            captures if they were enabled.
+        """
+        self.enabled = False
+        elapsed = time.perf_counter() - self._started_at
+        stages = {
+            name: {
+                "count": stats.count,
+                "total": stats.total,
+                "mean": stats.total / stats.count if stats.count else None,
+                "max": stats.max,
+                "allocated": stats.allocated if self._trace_memory and name not in AWAITING_STAGES else None,
+            }
+            for name, stats in sorted(self._stages.items(), key=lambda item: -item[1].total)
+        }
+        requests = self._stages[REQUEST_STAGE].count if REQUEST_STAGE in self._stages else 0
+        overhead = sum(stats.total for name, stats in self._stages.items() if name not in AWAITING_STAGES)
+        report: dict[str, Any] = {
+            "elapsed": elapsed,
+            "stages": stages,
+            "overhead_per_request": overhead / requests if requests else None,
+        }
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            report["cprofile"] = _top_functions(pstats.Stats(self._cprofile), top)
+        if self._trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            report["memory"] = {
+                "peak": tracemalloc.get_traced_memory()[1],
+                "top": [
+                    {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:top]
+                ],
+            }
+            tracemalloc.stop()
+        return report
+
+    def dump_cprofile(self, path: Path) -> None:
+        """Write the cProfile capture of the last run in pstats format (e.g., for snakeviz)."""
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(path)
+
+    def stage(self, name: str) -> AbstractContextManager[None]:
+        """
+        Return a context manager timing one execution of a stage.
+
+        Args:
+            name: Name of the stage, e.g. "build_messages".
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        stats = self._stages.get(name)
+        if stats is None:
+            stats = self._stages[name] = _StageStats()
+        return _StageTimer(stats, self._trace_memory)
+
+    def iterate[T](self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Iterate, timing how long each item takes to produce as a stage (e.g., reading the dataset).
+
+        Args:
+            name: Name of the stage.
+            iterable: The iterable to time.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+
+def _top_functions(stats: pstats.Stats, top: int) -> list[dict[str, Any]]:
+    """The functions with the highest cumulative time of a cProfile capture."""
+    entries = []
+    # pstats keeps (primitive calls, calls, total time, cumulative time, callers) per function
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():  # type: ignore[attr-defined]
+        entries.append(
+            {"function": f"{filename}:{line}({function})", "calls": calls, "total": total, "cumulative": cumulative}
+        )
+    entries.sort(key=lambda entry: -entry["cumulative"])
+    return entries[:top]
+
+
+_profiler = StageProfiler()
+
+
+def get_profiler() -> StageProfiler:
+    """Return the process-wide stage profiler."""
+    return _profiler
+
+
+def profile_stage(name: str) -> AbstractContextManager[None]:
+    """Time one execution of a stage with the process-wide profiler (a no-op unless it is started)."""
+    return _profiler.stage(name)
@@ -0,0 +1,339 @@
+import asyncio
+import base64
+import email.utils
+import struct
+import time
+from collections.abc import Mapping
+from typing import Any
+
+from pydantic import BaseModel
+
+from riddle_benchmark.utils import get_logger, get_provider
+
+logger = get_logger(__name__)
+
+# Completion allowance when the request does not set max_tokens; reconciled with the actual usage afterwards
+DEFAULT_COMPLETION_TOKENS = 1024
+# Image tokens assumed when the image dimensions cannot be read
+DEFAULT_IMAGE_TOKENS = 1000
+# Pause applied on a rate-limit error without a Retry-After header
+DEFAULT_RATE_LIMIT_PAUSE = 5.0
+MAX_RETRY_AFTER = 120.0
+
+
+class RateLimit(BaseModel):
+    """
+    Request and token budgets of a model or provider.
+
+    Attributes:
+        rpm: Maximum number of requests per minute. None means unlimited.
+        tpm: Maximum number of tokens (prompt + completion) per minute. None means unlimited.
+    """
+
+    rpm: float | None = None
+    tpm: float | None = None
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to one minute of budget and refilling continuously.
+
+    The level may go negative when a request turns out to be more expensive than
+    estimated, which delays subsequent requests until the debt is repaid.
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Budget refilled per minute, which is also the bucket capacity.
+        """
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Return the seconds until `amount` can be consumed (0 if available now).
+
+        Requests larger than the capacity only wait for a full bucket.
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Remove `amount` from the bucket."""
+        self._refill()
+        self.level -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Add `amount` back to (or, if negative, remove it from) the bucket."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Schedules requests so that they stay within requests-per-minute and tokens-per-minute budgets.
+
+    Waiters are served in FIFO order. Token usage is estimated before sending and reconciled
+    with the actual usage afterwards. A rate-limit error from the provider pauses all
+    requests for its Retry-After period.
+    """
+
+    def __init__(self, rate_limit: RateLimit):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate_limit: The request and token budgets.
+        """
+        self.rate_limit = rate_limit
+        self._requests = TokenBucket(rate_limit.rpm) if rate_limit.rpm else None
+        self._tokens = TokenBucket(rate_limit.tpm) if rate_limit.tpm else None
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """
+        Wait until a request with the estimated token usage fits in the budgets, then reserve it.
+
+        Args:
+            estimated_tokens: Estimated prompt + completion tokens of the request.
+        """
+        async with self._lock:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if self._requests is not None:
+                    wait = max(wait, self._requests.wait_time(1))
+                if self._tokens is not None:
+                    wait = max(wait, self._tokens.wait_time(estimated_tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self._requests is not None:
+                self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(estimated_tokens)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Correct the token budget once the actual usage of a request is known.
+
+        Args:
+            estimated_tokens: The estimate passed to acquire.
+            actual_tokens: The total tokens reported by the provider.
+        """
+        if self._tokens is not None:
+            self._tokens.adjust(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back all requests for the given time (e.g., the provider's Retry-After).
+
+        Args:
+            seconds: Duration of the pause in seconds.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"Rate limited by provider, pausing requests for {seconds:.1f}s")
+
+
+class RateLimiters:
+    """
+    Registry of rate limiters keyed by model name or provider prefix.
+
+    A budget configured for a model name applies to that model only; a budget configured
+    for a provider prefix (e.g., "openai") is shared by all models of the provider.
+    """
+
+    def __init__(self, limits: Mapping[str, RateLimit] | None = None):
+        """
+        Initialize the registry.
+
+        Args:
+            limits: Budgets keyed by model name or provider prefix.
+        """
+        self.limits = dict(limits or {})
+        self._limiters: dict[str, RateLimiter] = {}
+
+    def for_model(self, model_name: str) -> RateLimiter | None:
+        """
+        Return the rate limiter that applies to a model.
+
+        Args:
+            model_name: The LiteLLM model name.
+
+        Returns:
+            The shared limiter, or None if no budget is configured for the model or its provider.
+        """
+        for key in (model_name, get_provider(model_name)):
+            if key in self.limits:
+                if key not in self._limiters:
+                    self._limiters[key] = RateLimiter(self.limits[key])
+                return self._limiters[key]
+        return None
+
+
+def parse_rate_limits(config: Mapping[str, Any]) -> dict[str, RateLimit]:
+    """
+    Parse rate limits given as {"<model or provider>": {"rpm": ..., "tpm": ...}}.
+
+    Args:
+        config: The raw configuration.
+
+    Returns:
+        Budgets keyed by model name or provider prefix.
+    """
+    return {key: RateLimit.model_validate(value) for key, value in config.items()}
+
+
+def get_retry_after(error: BaseException) -> float | None:
+    """
+    Read the Retry-After delay from a provider error.
+
+    Supports the `retry-after-ms` and `retry-after` headers (seconds or HTTP date).
+
+    Args:
+        error: The exception raised by the request.
+
+    Returns:
+        The delay in seconds, or None if the error carries no Retry-After header.
+    """
+    headers: Any = getattr(error, "litellm_response_headers", None) or getattr(error, "headers", None)
+    if not headers:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    try:
+        lowered = {str(k).lower(): str(v) for k, v in headers.items()}
+    except AttributeError:
+        return None
+
+    if "retry-after-ms" in lowered:
+        try:
+            return min(float(lowered["retry-after-ms"]) / 1000.0, MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+
+    value = lowered.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return min(max(retry_at.timestamp() - time.time(), 0.0), MAX_RETRY_AFTER)
+
+
+def _image_dimensions(data_url: str) -> tuple[int, int] | None:
+    """Read the width and height of a PNG or GIF data URL from its header."""
+    _, _, payload = data_url.partition(";base64,")
+    try:
+        header = base64.b64decode(payload[:44])
+    except ValueError:
+        return None
+    if header.startswith(b"\x89PNG\r\n\x1a\n") and len(header) >= 24:
+        width, height = struct.unpack(">II", header[16:24])
+        return int(width), int(height)
+    if header[:6] in (b"GIF87a", b"GIF89a") and len(header) >= 10:
+        width, height = struct.unpack("<HH", header[6:10])
+        return int(width), int(height)
+    return None
+
+
+def estimate_image_tokens(data_url: str) -> int:
+    """
+    Estimate the prompt tokens of an image.
+
+    Uses the OpenAI high-detail tiling rule (85 tokens plus 170 per 512px tile after scaling),
+    which is in the same range as the other providers.
+
+    Args:
+        data_url: The image as a base64 data URL.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    dimensions = _image_dimensions(data_url)
+    if dimensions is None:
+        return DEFAULT_IMAGE_TOKENS
+
+    width, height = (float(d) for d in dimensions)
+    # Fit within 2048x2048, then scale the shortest side down to 768
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = -(-int(width) // 512) * -(-int(height) // 512)
+    return 85 + 170 * tiles
+
+
+def estimate_prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    """
+    Estimate the prompt tokens (text and images) of a messages payload.
+
+    Text is counted as one token per three UTF-8 bytes, which is conservative for English and
+    close to one token per character for Japanese.
+
+    Args:
+        messages: The messages payload.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    tokens = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content.encode("utf-8")) // 3 + 1
+            continue
+        for item in content or []:
+            if item.get("type") == "text":
+                tokens += len(item.get("text", "").encode("utf-8")) // 3 + 1
+            elif item.get("type") == "image_url":
+                tokens += estimate_image_tokens(item.get("image_url", {}).get("url", ""))
+    return tokens
+
+
+def estimate_request_tokens(messages: list[dict[str, Any]], kwargs: Mapping[str, Any]) -> int:
+    """
+    Estimate the total tokens (prompt + completion) a request counts against a TPM budget.
+
+    Args:
+        messages: The messages payload.
+        kwargs: The extra parameters of the request (max_tokens is used if set).
+
+    Returns:
+        The estimated number of tokens.
+    """
+    return estimate_prompt_tokens(messages) + completion_allowance(kwargs)
+
+
+def completion_allowance(kwargs: Mapping[str, Any]) -> int:
+    """
+    Return the completion tokens assumed for a request before its usage is known.
+
+    Args:
+        kwargs: The extra parameters of the request (max_tokens is used if set).
+
+    Returns:
+        max_completion_tokens or max_tokens if set, else DEFAULT_COMPLETION_TOKENS.
+    """
+    return int(kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
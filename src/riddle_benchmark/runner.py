@@ -1,21 +1,47 @@
 import asyncio
 import json
+import time
+from collections import Counter
+from collections.abc import AsyncIterable, Callable, Iterable, Sized
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from tqdm import tqdm
 
-from riddle_benchmark.dataset.loader import DataLoader
+from riddle_benchmark.budget import SpendTracker
+from riddle_benchmark.concurrency import ConcurrencyLimiter, make_limiter
+from riddle_benchmark.dataset.loader import DataLoader, RiddleSelection
+from riddle_benchmark.dataset.preprocess import ImagePreprocessor
 from riddle_benchmark.dataset.schema import Riddle
-from riddle_benchmark.evaluation.evaluator import Evaluator
+from riddle_benchmark.evaluation.evaluator import AnswerIndex, Evaluator
+from riddle_benchmark.evaluation.metrics import RunStatistics
+from riddle_benchmark.journal import RecordKey, ResultJournal, load_journal, record_key
 from riddle_benchmark.models.base import Model
+from riddle_benchmark.models.cache import RequestDeduplicator, ResponseCache
+from riddle_benchmark.models.errors import BudgetExceededError, CircuitOpenError
+from riddle_benchmark.models.policy import RequestPolicy
 from riddle_benchmark.models.schemas import SimpleResponse, ThinkingResponse
+from riddle_benchmark.models.stats import RequestStats
+from riddle_benchmark.profiling import get_profiler, profile_stage
+from riddle_benchmark.ratelimit import RateLimiter
 from riddle_benchmark.utils import get_logger
+from riddle_benchmark.warehouse import ResultsWarehouse, content_hash
 
 logger = get_logger(__name__)
 
 
+def _image_payload_bytes(messages: list[dict[str, Any]]) -> int:
+    """Size of the image data URLs (base64) in the messages of a request."""
+    return sum(
+        len(part["image_url"]["url"])
+        for message in messages
+        if isinstance(message.get("content"), list)
+        for part in message["content"]
+        if part.get("type") == "image_url"
+    )
+
+
 class BenchmarkRunner:
     """
     Runner for the Riddle Benchmark.
@@ -25,9 +51,18 @@ class BenchmarkRunner:
         self,
         model_name: str,
         data_dir: Path | None = None,
+        selection: RiddleSelection | None = None,
         use_reason: bool = False,
         prompt: str | None = None,
         extra_params: dict[str, Any] | None = None,
+        response_cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        prompt_cache: bool = False,
+        request_policy: RequestPolicy | None = None,
+        image_preprocessor: ImagePreprocessor | None = None,
+        deduplicator: RequestDeduplicator | None = None,
+        spend: SpendTracker | None = None,
+        label: str | None = None,
         **model_kwargs: Any,
     ):
         """
@@ -36,87 +71,286 @@ class BenchmarkRunner:
         Args:
             model_name: Name of the model to benchmark.
             data_dir: Path to the dataset directory.
+            selection: Subset of the dataset to benchmark. If None, uses every riddle.
             use_reason: Whether to include reason in the response schema.
             prompt: Prompt to use for the model.
             extra_params: Additional model-specific parameters (e.g., reasoning_effort for OpenAI).
+            response_cache: Optional on-disk response cache shared with the model.
+            rate_limiter: Optional requests/tokens-per-minute limiter shared with the model.
+            prompt_cache: Whether to lay out the messages for provider-side prompt caching.
+            request_policy: Timeouts and hedging of the model's requests.
+            image_preprocessor: Optional stage deriving the images (e.g., downscaled) before they are encoded.
+            deduplicator: Optional deduplicator shared with other runners, through which identical
+                requests are sent once.
+            spend: Optional spend budget, possibly shared with other runners. Once it is exhausted,
+                the remaining riddles are not sent and are marked as unfinished in the report.
+            label: Name of this configuration in a sweep grid (e.g., "openai/gpt-5__p1"). Defaults
+                to the model name.
             **model_kwargs: Additional arguments for the model.
         """
         self.model_name = model_name
+        self.label = label or model_name
         self.use_reason = use_reason
         self.prompt = prompt
         self.extra_params = extra_params
+        self.selection = selection
+        self.prompt_cache = prompt_cache
+        self.request_policy = request_policy
+        self.image_preprocessor = image_preprocessor
 
         # Merge extra_params into model_kwargs
         merged_kwargs = {**model_kwargs}
         if extra_params:
             merged_kwargs.update(extra_params)
 
-        self.model = Model(model_name, **merged_kwargs)
-        self.loader = DataLoader(data_dir)
+        self.model = Model(
+            model_name,
+            response_cache=response_cache,
+            rate_limiter=rate_limiter,
+            prompt_cache=prompt_cache,
+            policy=request_policy,
+            deduplicator=deduplicator,
+            spend=spend,
+            **merged_kwargs,
+        )
+        self.loader = DataLoader(data_dir, selection)
         self.results: list[dict[str, Any]] = []
         self.summary: dict[str, Any] = {}
+        self.statistics = RunStatistics()
+        # Where the records of the last run were streamed, and the records it reused
+        self._journal_path: Path | None = None
+        self._resumed: dict[RecordKey, dict[str, Any]] = {}
+        self._samples = 1
 
-    async def run(self, concurrency: int = 5) -> dict[str, Any]:
+    async def run(
+        self,
+        concurrency: int | None = 5,
+        riddles: Iterable[Riddle] | AsyncIterable[Riddle] | None = None,
+        limiter: ConcurrencyLimiter | None = None,
+        journal: ResultJournal | None = None,
+        resumed: dict[RecordKey, dict[str, Any]] | None = None,
+        samples: int = 1,
+        on_record: Callable[[dict[str, Any]], None] | None = None,
+        total: int | None = None,
+    ) -> dict[str, Any]:
         """
         Run the benchmark asynchronously.
 
         Args:
-            concurrency: The maximum number of concurrent requests.
+            concurrency: The maximum number of concurrent requests. None adapts the limit
+                to the provider's latency and rate-limit errors (AIMD).
+            riddles: Riddles to solve. If None, streams them from the data loader. An asynchronous
+                iterable lets the caller release riddles as the run goes (e.g., in batches).
+            limiter: Concurrency limiter shared with other runners (e.g., per provider in a sweep).
+                If given, it bounds the concurrency instead of `concurrency`.
+            journal: Optional journal to which each result is appended as soon as it completes.
+                The records are then not kept in memory: the summary is aggregated as they complete,
+                and `details` reads them back from the journal.
+            resumed: Answered records of a previous run keyed by (riddle ID, sample index).
+                These samples are not solved again and their records are reused.
+            samples: Number of independent solves per riddle. With more than one sample, the
+                summary also reports pass@k, per-riddle solve rates and confidence intervals.
+            on_record: Optional callback receiving every record of the run as soon as it is
+                available, including the resumed ones.
+            total: Number of riddles shown by the progress bar when `riddles` has no length.
+                Counted from the data loader if None.
+
+        Riddles are streamed through a bounded queue to a fixed pool of workers, so that
+        only the riddles being solved (and their encoded images) are held in memory.
 
         Returns:
-            A dictionary containing the summary and detailed results.
+            A dictionary containing the summary and, unless they were streamed to a journal,
+            the detailed results.
         """
-        riddles = self.loader.load()
-        correct_count = 0
-        total_count = len(riddles)
+        # The total is only needed for the progress bar; counting reads the metadata, not the images
+        if total is not None:
+            total_count = total
+        else:
+            total_count = len(riddles) if isinstance(riddles, Sized) else self.loader.count()
+        source = self.loader.iter_load() if riddles is None else riddles
+        resumed = resumed or {}
 
         logger.info(f"Starting benchmark for model: {self.model_name}")
         logger.info(f"Total riddles: {total_count}")
-        logger.info(f"Concurrency: {concurrency}")
+        if samples > 1:
+            logger.info(f"Samples per riddle: {samples}")
+        if limiter is None:
+            logger.info(f"Concurrency: {concurrency if concurrency is not None else 'auto'}")
+            limiter = make_limiter(concurrency)
 
         schema: type[ThinkingResponse] | type[SimpleResponse] = ThinkingResponse if self.use_reason else SimpleResponse
 
-        semaphore = asyncio.Semaphore(concurrency)
+        # Messages (including the encoded image) are built just in time, once per riddle, and shared by
+        # its samples; they and the normalized answers are dropped when the last sample is done
+        messages_by_riddle: dict[str, asyncio.Future[tuple[list[dict[str, Any]], int]]] = {}
+        answer_index: AnswerIndex = {}
+        remaining_samples: Counter[str] = Counter()
+
+        def sample_fields(sample: int) -> dict[str, Any]:
+            return {"sample": sample} if samples > 1 else {}
+
+        async def process_riddle(riddle: Riddle, sample: int, enqueued_at: float) -> dict[str, Any]:
+            stats = RequestStats()
+            started_at: float | None = None
+            image_bytes: int | None = None
 
-        async def process_riddle(riddle: Riddle) -> dict[str, Any]:
-            async with semaphore:
-                try:
-                    # Solve
-                    prediction_obj = await self.model.solve(riddle, response_schema=schema, prompt=self.prompt)
+            def request_metrics() -> dict[str, Any]:
+                finished_at = time.perf_counter()
+                return {
+                    "queue_wait": (started_at if started_at is not None else finished_at) - enqueued_at,
+                    "latency": finished_at - started_at if started_at is not None else None,
+                    "image_bytes": image_bytes,
+                    **stats.model_dump(),
+                }
 
-                    raw_prediction = prediction_obj.answer
-                    reason = getattr(prediction_obj, "reason", None)
+            try:
+                prepared = messages_by_riddle.get(riddle.id)
+                if prepared is None:
+                    # Reading, hashing and re-encoding the image blocks: keep it off the event loop.
+                    # Samples of the riddle picked up meanwhile wait for the same preparation.
+                    prepared = messages_by_riddle[riddle.id] = asyncio.ensure_future(
+                        self._prepare_messages_in_thread(riddle)
+                    )
+                messages, image_bytes = await asyncio.shield(prepared)
 
-                    # Evaluate
-                    is_correct = Evaluator.evaluate(raw_prediction, riddle)
+                # Solve
+                # The model reports each attempt to the limiter, including retried rate-limit errors
+                async with limiter.slot(report=False):
+                    started_at = time.perf_counter()
+                    with profile_stage("solve"):
+                        prediction_obj = await self.model.solve(
+                            riddle,
+                            response_schema=schema,
+                            prompt=self.prompt,
+                            messages=messages,
+                            sample=sample,
+                            stats=stats,
+                            limiter=limiter,
+                        )
+                metrics = request_metrics()
 
-                    return {
-                        "riddle_id": riddle.id,
-                        "question": riddle.question,
-                        "prediction": raw_prediction,
-                        "reason": reason,
-                        "normalized_prediction": Evaluator.normalize(raw_prediction),
-                        "acceptable_answers": riddle.acceptable_answers,
-                        "is_correct": is_correct,
-                    }
-                except Exception as e:
-                    logger.error(f"Error solving riddle {riddle.id}: {e}", exc_info=True)
-                    return {"riddle_id": riddle.id, "error": str(e), "is_correct": False}
+                raw_prediction = prediction_obj.answer
+                reason = getattr(prediction_obj, "reason", None)
 
-        tasks = [process_riddle(riddle) for riddle in riddles]
+                # Evaluate
+                with profile_stage("evaluate"):
+                    normalized_prediction, is_correct = Evaluator.score(raw_prediction, answer_index[riddle.id])
 
-        # Use tqdm with as_completed to show progress
+                return {
+                    "riddle_id": riddle.id,
+                    **sample_fields(sample),
+                    "question": riddle.question,
+                    "prediction": raw_prediction,
+                    "reason": reason,
+                    "normalized_prediction": normalized_prediction,
+                    "acceptable_answers": riddle.acceptable_answers,
+                    "is_correct": is_correct,
+                    "metrics": metrics,
+                }
+            except BudgetExceededError as e:
+                # Not an error of the model: the riddle can be solved by resuming with a larger budget
+                logger.debug(f"Riddle {riddle.id} not sent: {e}")
+                return {
+                    "riddle_id": riddle.id,
+                    **sample_fields(sample),
+                    "error": str(e),
+                    "unfinished": True,
+                    "is_correct": False,
+                    "metrics": request_metrics(),
+                }
+            except Exception as e:
+                # Rejections by the circuit breaker repeat the error that opened it; skip the traceback
+                logger.error(f"Error solving riddle {riddle.id}: {e}", exc_info=not isinstance(e, CircuitOpenError))
+                return {
+                    "riddle_id": riddle.id,
+                    **sample_fields(sample),
+                    "error": str(e),
+                    "is_correct": False,
+                    "metrics": request_metrics(),
+                }
+            finally:
+                remaining_samples[riddle.id] -= 1
+                if remaining_samples[riddle.id] == 0:
+                    messages_by_riddle.pop(riddle.id, None)
+                    answer_index.pop(riddle.id, None)
+
+        workers = limiter.capacity
+        # Each item carries the time it was queued, so that the queue wait covers the time spent in the queue
+        queue: asyncio.Queue[tuple[Riddle, int, float] | None] = asyncio.Queue(maxsize=2 * workers)
         self.results = []
-        for future in tqdm(asyncio.as_completed(tasks), total=total_count, desc="Solving riddles"):
-            result = await future
-            self.results.append(result)
-            if result.get("is_correct"):
-                correct_count += 1
+        self.statistics = statistics = RunStatistics()
+        self._journal_path = journal.path if journal is not None else None
+        self._resumed = resumed
+        self._samples = samples
+        completed = reused = 0
+
+        def add_record(record: dict[str, Any]) -> None:
+            statistics.add(record)
+            if journal is None:
+                self.results.append(record)
+            if on_record is not None:
+                on_record(record)
+
+        async def enqueue(riddle: Riddle, progress: tqdm) -> None:
+            nonlocal reused
+            statistics.add_riddle(riddle.id)
+            # Reuse the answers of a previous run and solve only the remaining samples
+            todo = []
+            for sample in range(samples):
+                record = resumed.get((riddle.id, sample))
+                if record is None:
+                    todo.append(sample)
+                else:
+                    add_record(record)
+                    reused += 1
+                    with profile_stage("progress"):
+                        progress.update()
+            if not todo:
+                return
+            answer_index[riddle.id] = Evaluator.normalize_answers(riddle.acceptable_answers)
+            remaining_samples[riddle.id] = len(todo)
+            for sample in todo:
+                await queue.put((riddle, sample, time.perf_counter()))
+
+        async def produce(progress: tqdm) -> None:
+            if isinstance(source, AsyncIterable):
+                async for riddle in source:
+                    await enqueue(riddle, progress)
+            else:
+                for riddle in get_profiler().iterate("load", source):
+                    await enqueue(riddle, progress)
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def work(progress: tqdm) -> None:
+            nonlocal completed
+            while (item := await queue.get()) is not None:
+                result = await process_riddle(*item)
+                if journal is not None:
+                    with profile_stage("journal"):
+                        journal.write(result)
+                add_record(result)
+                completed += 1
+                with profile_stage("progress"):
+                    progress.update()
 
-        # Sort results by riddle_id for consistency
-        self.results.sort(key=lambda x: x["riddle_id"])
+        run_started_at = time.perf_counter()
+        with tqdm(total=total_count * samples, desc=f"Solving riddles ({self.model_name})") as progress:
+            try:
+                async with asyncio.TaskGroup() as group:
+                    group.create_task(produce(progress))
+                    for _ in range(workers):
+                        group.create_task(work(progress))
+            except ExceptionGroup as e:
+                # e.g. a missing image found by the loader
+                raise e.exceptions[0] from None
+        if reused:
+            logger.info(f"Resumed answers: {reused}")
 
-        accuracy = correct_count / total_count if total_count > 0 else 0
+        elapsed = time.perf_counter() - run_started_at
+
+        # Sort results by riddle_id (and sample) for consistency
+        self.results.sort(key=record_key)
 
         self.summary = {
             "model": self.model_name,
@@ -124,25 +358,78 @@ class BenchmarkRunner:
             "parameters": {
                 "use_reason": self.use_reason,
                 "prompt": self.prompt,
+                "prompt_cache": self.prompt_cache,
+                "image_variant": self.image_preprocessor.variant.name if self.image_preprocessor else None,
+                "request_policy": self.request_policy.model_dump(exclude_defaults=True)
+                if self.request_policy
+                else None,
                 "extra_params": self.extra_params,
                 "model_kwargs": self.model.kwargs,
+                "selection": self.selection.model_dump(exclude_none=True) if self.selection else None,
             },
-            "total_questions": total_count,
-            "correct_answers": correct_count,
-            "accuracy": accuracy,
+            **statistics.scores(samples),
+            "metrics": statistics.request_metrics(elapsed=elapsed, completed=completed),
         }
+        if self.model.spend is not None:
+            unfinished = statistics.unfinished
+            self.summary["budget"] = {**self.model.spend.summary(), "unfinished": unfinished}
+            if unfinished:
+                logger.warning(f"Spend budget exhausted: {unfinished} samples were not sent")
 
+        if journal is not None:
+            return {"summary": self.summary}
         return {"summary": self.summary, "details": self.results}
 
-    def save_report(self, output_path: Path) -> None:
+    def details(self) -> list[dict[str, Any]]:
+        """
+        Return the records of the last run, sorted by riddle and sample.
+
+        Records that were streamed to a journal are read back from it (the latest record of
+        each sample), except the resumed ones, which were not solved again.
+        """
+        if self._journal_path is None:
+            return self.results
+        journaled = load_journal(self._journal_path)
+        keys = sorted((riddle_id, sample) for riddle_id in self.statistics.outcomes for sample in range(self._samples))
+        records = []
+        for key in keys:
+            record = self._resumed.get(key) or journaled.get(key)
+            if record is not None:
+                records.append(record)
+        return records
+
+    async def _prepare_messages_in_thread(self, riddle: Riddle) -> tuple[list[dict[str, Any]], int]:
+        """Run _prepare_messages in a worker thread, timed as one stage on the event loop."""
+        with profile_stage("prepare_messages"):
+            return await asyncio.to_thread(self._prepare_messages, riddle)
+
+    def _prepare_messages(self, riddle: Riddle) -> tuple[list[dict[str, Any]], int]:
+        """
+        Build the messages of a riddle, with its derived image if any, and the size of the images in them.
+
+        Runs in a worker thread, so it is not timed by the stage profiler (which is not thread-safe).
+        """
+        if self.image_preprocessor is not None:
+            riddle = self.image_preprocessor.apply(riddle)
+        messages = self.model.build_messages(riddle, self.prompt)
+        return messages, _image_payload_bytes(messages)
+
+    def save_report(self, output_path: Path, warehouse: ResultsWarehouse | None = None) -> None:
         """
         Save the benchmark report to a JSON file.
 
         Args:
             output_path: Path to save the JSON report.
+            warehouse: Optional results database to which the report is also added.
         """
-        report = {"summary": self.summary, "details": self.results}
+        report = {"summary": self.summary, "details": self.details()}
+        data = json.dumps(report, indent=2, ensure_ascii=False).encode("utf-8")
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        with open(output_path, "wb") as f:
+            f.write(data)
         logger.info(f"Report saved to {output_path}")
+
+        if warehouse is not None:
+            # Same hash and source as ingesting the file later, so the run is not stored twice
+            warehouse.add_report(report, content_hash(data), source=str(output_path.resolve()))
+            logger.info(f"Report added to {warehouse.path}")
@@ -0,0 +1,493 @@
+import asyncio
+import itertools
+import random
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from riddle_benchmark.budget import SpendTracker
+from riddle_benchmark.concurrency import ConcurrencyLimiter, ProviderLimiters, make_limiter
+from riddle_benchmark.dataset.loader import DataLoader, RiddleSelection
+from riddle_benchmark.dataset.preprocess import ImagePreprocessor
+from riddle_benchmark.dataset.schema import Riddle
+from riddle_benchmark.evaluation.metrics import DEFAULT_CONFIDENCE, sequential_sign_test
+from riddle_benchmark.journal import RecordKey, ResultJournal, record_key
+from riddle_benchmark.models.cache import RequestDeduplicator, ResponseCache
+from riddle_benchmark.models.policy import RequestPolicy
+from riddle_benchmark.ratelimit import RateLimit, RateLimiters
+from riddle_benchmark.runner import BenchmarkRunner
+from riddle_benchmark.utils import get_logger, load_prompt
+
+logger = get_logger(__name__)
+
+# Models benchmarked in the README results
+MAJOR_MODELS = [
+    "openai/gpt-4o",
+    "openai/gpt-5.1-2025-11-13",
+    "openai/gpt-5-2025-08-07",
+    "openai/gpt-5-mini-2025-08-07",
+    "openai/gpt-5-nano-2025-08-07",
+    "gemini/gemini-3-pro-preview",
+    "gemini/gemini-2.5-pro",
+    "gemini/gemini-2.5-flash",
+    "gemini/gemini-2.5-flash-lite",
+    "bedrock/global.anthropic.claude-haiku-4-5-20251001-v1:0",
+    "bedrock/global.anthropic.claude-opus-4-5-20251101-v1:0",
+    "bedrock/global.anthropic.claude-sonnet-4-5-20250929-v1:0",
+]
+
+# Models that reject the reasoning_effort parameter
+REASONING_EFFORT_UNSUPPORTED = ["gpt-4o"]
+
+DEFAULT_PROVIDER_CONCURRENCY = 10
+
+# Riddles added to a comparison before the sequential test is checked again
+DEFAULT_COMPARE_BATCH = 10
+
+
+class SweepModel(BaseModel):
+    """
+    A model and its parameters in a sweep.
+
+    Attributes:
+        model: Name of the model to benchmark.
+        extra_params: Additional model-specific parameters.
+        prompt_id: Prompt ID of this model ("0" for no prompt). None uses the prompt of the sweep.
+        use_reason: Whether to include reason in the response schema. None uses the setting of the sweep.
+        label: Name of the configuration when a model appears several times (see SweepGrid).
+    """
+
+    model: str
+    extra_params: dict[str, Any] | None = None
+    prompt_id: str | None = None
+    use_reason: bool | None = None
+    label: str | None = None
+
+    @property
+    def name(self) -> str:
+        """The label, or the model name if there is none."""
+        return self.label or self.model
+
+
+class SweepGrid(BaseModel):
+    """
+    Grid of configurations benchmarked in one sweep, read from a JSON file.
+
+    Every combination of model, prompt, reason setting and extra parameters is a cell.
+    Cells whose requests coincide (e.g., reasoning_effort values of a model that does not
+    support it) are deduplicated by the sweep: such requests in flight at the same time are
+    sent once, and later ones are served by the response cache if there is one.
+
+    Attributes:
+        models: Names of the models to benchmark.
+        prompts: Prompt IDs ("0" for no prompt).
+        reason: Settings of the reason field of the response schema.
+        extra_params: Alternative sets of additional parameters, e.g. [{"reasoning_effort": "low"},
+            {"reasoning_effort": "high"}]. reasoning_effort is dropped for models that do not support it.
+        model_params: Additional parameters per model name, added to every cell of the model.
+    """
+
+    models: list[str] = Field(min_length=1)
+    prompts: list[str] = Field(default_factory=lambda: ["2"], min_length=1)
+    reason: list[bool] = Field(default_factory=lambda: [False], min_length=1)
+    extra_params: list[dict[str, Any]] = Field(default_factory=lambda: [dict[str, Any]()], min_length=1)
+    model_params: dict[str, dict[str, Any]] = Field(default_factory=dict)
+
+    def expand(self) -> list[SweepModel]:
+        """
+        List the cells of the grid.
+
+        Each cell is labeled with its model and the values of the dimensions that vary across
+        the grid, e.g. "openai/gpt-5__p1__reason__reasoning_effort-high".
+
+        Returns:
+            One SweepModel per cell, in the order of the models, prompts, reason settings and extra parameters.
+        """
+        cells = []
+        unsupported: set[str] = set()
+        for model, prompt_id, use_reason, params in itertools.product(
+            self.models, self.prompts, self.reason, self.extra_params
+        ):
+            merged = {**params, **self.model_params.get(model, {})}
+            if "reasoning_effort" in merged and not supports_reasoning_effort(model):
+                del merged["reasoning_effort"]
+                if model not in unsupported:
+                    unsupported.add(model)
+                    logger.warning(f"{model} does not support reasoning_effort, its cells share their requests")
+
+            parts = [model]
+            if len(self.prompts) > 1:
+                parts.append(f"p{prompt_id}")
+            if len(self.reason) > 1:
+                parts.append("reason" if use_reason else "noreason")
+            if len(self.extra_params) > 1:
+                # The parameters as written in the grid, so that every cell keeps a distinct label
+                parts.append("_".join(f"{key}-{value}" for key, value in sorted(params.items())) or "default")
+            cells.append(
+                SweepModel(
+                    model=model,
+                    extra_params=merged or None,
+                    prompt_id=prompt_id,
+                    use_reason=use_reason,
+                    label="__".join(parts),
+                )
+            )
+        return cells
+
+
+def supports_reasoning_effort(model_name: str) -> bool:
+    """
+    Check whether a model accepts the reasoning_effort parameter.
+
+    Args:
+        model_name: Name of the model.
+
+    Returns:
+        True if the model supports reasoning_effort.
+    """
+    return not any(name in model_name for name in REASONING_EFFORT_UNSUPPORTED)
+
+
+def load_sweep_grid(path: Path) -> SweepGrid:
+    """
+    Read a sweep grid from a JSON file.
+
+    Raises:
+        OSError: If the file cannot be read.
+        pydantic.ValidationError: If the file is not a valid grid.
+    """
+    return SweepGrid.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def build_sweep_models(
+    models: list[str],
+    reasoning_effort: str | None = None,
+    extra_params: dict[str, Any] | None = None,
+    model_params: dict[str, dict[str, Any]] | None = None,
+) -> list[SweepModel]:
+    """
+    Build the per-model parameters of a sweep.
+
+    Args:
+        models: Names of the models to benchmark.
+        reasoning_effort: reasoning_effort applied to every model that supports it. "none" disables it.
+        extra_params: Additional parameters applied to every model.
+        model_params: Additional parameters per model name, taking precedence over extra_params.
+
+    Returns:
+        List of SweepModel entries in the order of `models`.
+    """
+    sweep_models = []
+    for model in models:
+        params = {**(extra_params or {}), **(model_params or {}).get(model, {})}
+
+        if reasoning_effort and reasoning_effort != "none":
+            if supports_reasoning_effort(model):
+                params["reasoning_effort"] = reasoning_effort
+            else:
+                logger.warning(f"{model} does not support reasoning_effort, skipping reasoning parameter")
+
+        sweep_models.append(SweepModel(model=model, extra_params=params or None))
+    return sweep_models
+
+
+class SweepRunner:
+    """
+    Runs several BenchmarkRunners concurrently in a single event loop.
+
+    Each runner streams the riddles, and the encoded images are shared through the image
+    cache. Requests are bounded per provider so that models of the same provider share its
+    concurrency limiter.
+    """
+
+    def __init__(
+        self,
+        models: list[SweepModel],
+        data_dir: Path | None = None,
+        selection: RiddleSelection | None = None,
+        use_reason: bool = False,
+        prompt: str | None = None,
+        provider_concurrency: int | None = DEFAULT_PROVIDER_CONCURRENCY,
+        provider_limits: dict[str, int] | None = None,
+        response_cache: ResponseCache | None = None,
+        rate_limits: dict[str, RateLimit] | None = None,
+        samples: int = 1,
+        prompt_cache: bool = False,
+        request_policy: RequestPolicy | None = None,
+        image_preprocessor: ImagePreprocessor | None = None,
+        deduplicate: bool | None = None,
+        spend: SpendTracker | None = None,
+    ):
+        """
+        Initialize the sweep runner.
+
+        Args:
+            models: Models and their parameters to benchmark.
+            data_dir: Path to the dataset directory.
+            selection: Subset of the dataset to benchmark. If None, uses every riddle.
+            use_reason: Whether to include reason in the response schema.
+            prompt: Prompt to use for the models.
+            provider_concurrency: Default maximum number of concurrent requests per provider.
+                None adapts the limit of each provider to its latency and rate-limit errors.
+            provider_limits: Fixed maximum number of concurrent requests for specific providers
+                (e.g., {"bedrock": 2}).
+            response_cache: Optional on-disk response cache shared by all models.
+            rate_limits: Requests/tokens-per-minute budgets keyed by model name or provider prefix.
+            samples: Number of independent solves per riddle and model.
+            prompt_cache: Whether to lay out the messages for provider-side prompt caching.
+            request_policy: Timeouts and hedging of the requests of every model.
+            image_preprocessor: Optional stage deriving the images before they are encoded. The
+                derived images are cached on disk, so each one is computed once for all models.
+            deduplicate: Whether identical requests of different runners are sent once and shared.
+                None enables it when a model appears in several configurations (e.g., a grid).
+            spend: Optional spend budget of the whole sweep, shared by all models.
+        """
+        self.models = models
+        self.loader = DataLoader(data_dir, selection)
+        self.samples = samples
+        self.provider_concurrency = provider_concurrency
+        self.provider_limits = provider_limits or {}
+        self.limiters = ProviderLimiters(self._make_provider_limiter)
+        self.rate_limiters = RateLimiters(rate_limits)
+        if deduplicate is None:
+            deduplicate = len({sweep_model.model for sweep_model in models}) < len(models)
+        self.deduplicator = RequestDeduplicator() if deduplicate else None
+        self.spend = spend
+        self.runners = [
+            BenchmarkRunner(
+                model_name=sweep_model.model,
+                data_dir=data_dir,
+                selection=selection,
+                use_reason=sweep_model.use_reason if sweep_model.use_reason is not None else use_reason,
+                prompt=load_prompt(sweep_model.prompt_id) if sweep_model.prompt_id is not None else prompt,
+                extra_params=sweep_model.extra_params,
+                response_cache=response_cache,
+                rate_limiter=self.rate_limiters.for_model(sweep_model.model),
+                prompt_cache=prompt_cache,
+                request_policy=request_policy,
+                image_preprocessor=image_preprocessor,
+                deduplicator=self.deduplicator,
+                spend=spend,
+                label=sweep_model.label,
+            )
+            for sweep_model in models
+        ]
+
+    async def run(
+        self,
+        journals: dict[str, ResultJournal] | None = None,
+        resumed: dict[str, dict[RecordKey, dict[str, Any]]] | None = None,
+    ) -> list[dict[str, Any] | BaseException]:
+        """
+        Run all models concurrently.
+
+        Args:
+            journals: Journals to which results are appended, keyed by runner label (the model name
+                outside of grids).
+            resumed: Answered records of previous runs, keyed by runner label and (riddle ID, sample index).
+
+        Returns:
+            The result of each runner in the order of the models, or the exception it raised.
+        """
+        logger.info(f"Starting sweep over {len(self.runners)} models")
+        journals = journals or {}
+        resumed = resumed or {}
+        # Every runner streams the riddles from the dataset itself; their encoded images are
+        # shared through the process-wide image cache
+        return await asyncio.gather(
+            *(
+                runner.run(
+                    limiter=self.limiters.for_model(runner.model_name),
+                    journal=journals.get(runner.label),
+                    resumed=resumed.get(runner.label),
+                    samples=self.samples,
+                )
+                for runner in self.runners
+            ),
+            return_exceptions=True,
+        )
+
+    async def compare(
+        self,
+        confidence: float = DEFAULT_CONFIDENCE,
+        batch_size: int = DEFAULT_COMPARE_BATCH,
+        seed: int = 0,
+        journals: dict[str, ResultJournal] | None = None,
+        resumed: dict[str, dict[RecordKey, dict[str, Any]]] | None = None,
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """
+        Compare the models on paired riddles, stopping as soon as every pair is decided.
+
+        The riddles are shuffled and released to all models in batches, within a single run
+        per model; once every model has answered a batch, the paired outcomes of every pair of
+        models go through sequential_sign_test, with the error rate split across the pairs
+        (Bonferroni). Only answered samples are paired: errors and unfinished samples say
+        nothing about the models. No more riddles are released when all pairs are decided,
+        the selected riddles are exhausted (so the selection is the maximum budget) or the
+        spend budget is exhausted.
+
+        Args:
+            confidence: Confidence required for every pairwise decision.
+            batch_size: Number of riddles added between two checks of the test.
+            seed: Seed of the order in which riddles are added.
+            journals: Journals to which results are appended, keyed by runner label (the model name
+                outside of grids).
+            resumed: Answered records of previous runs, keyed by runner label and (riddle ID, sample index).
+
+        Returns:
+            The report of each runner (over the riddles used) in the order of the models, and
+            the comparison with the pairwise tests and the number of requests sent.
+        """
+        riddles = self.loader.load()
+        random.Random(seed).shuffle(riddles)
+        alpha = (1.0 - confidence) / max(1, len(self.runners) * (len(self.runners) - 1) // 2)
+
+        logger.info(f"Starting comparison of {len(self.runners)} models (confidence {confidence:.0%})")
+        journals = journals or {}
+        resumed = resumed or {}
+        # Correctness of the answered samples of each runner
+        outcomes: dict[str, dict[RecordKey, bool]] = {runner.label: {} for runner in self.runners}
+        batches: dict[str, asyncio.Queue[list[Riddle] | None]] = {
+            runner.label: asyncio.Queue() for runner in self.runners
+        }
+        batch_done = asyncio.Event()
+        pending = requests = used = 0
+        pairs: list[dict[str, Any]] = []
+        budget_exhausted = False
+
+        def record_outcome(label: str) -> Callable[[dict[str, Any]], None]:
+            def on_record(record: dict[str, Any]) -> None:
+                nonlocal pending, requests
+                key = record_key(record)
+                if "error" not in record:
+                    outcomes[label][key] = bool(record.get("is_correct"))
+                if key not in resumed.get(label, {}):
+                    requests += (record.get("metrics") or {}).get("attempts", 0)
+                pending -= 1
+                if pending == 0:
+                    batch_done.set()
+
+            return on_record
+
+        async def release(label: str) -> AsyncIterator[Riddle]:
+            while (batch := await batches[label].get()) is not None:
+                for riddle in batch:
+                    yield riddle
+
+        async def decide() -> None:
+            nonlocal pending, used, pairs, budget_exhausted
+            while True:
+                batch = riddles[used : used + batch_size]
+                used += len(batch)
+                pending = len(batch) * self.samples * len(self.runners)
+                batch_done.clear()
+                for queue in batches.values():
+                    queue.put_nowait(batch)
+                if pending:
+                    await batch_done.wait()
+                pairs = self._paired_tests(outcomes, alpha)
+                budget_exhausted = self.spend is not None and self.spend.exhausted
+                if used == len(riddles) or budget_exhausted or all(pair["decided"] for pair in pairs):
+                    break
+            for queue in batches.values():
+                queue.put_nowait(None)
+
+        async with asyncio.TaskGroup() as group:
+            group.create_task(decide())
+            tasks = [
+                group.create_task(
+                    runner.run(
+                        riddles=release(runner.label),
+                        limiter=self.limiters.for_model(runner.model_name),
+                        journal=journals.get(runner.label),
+                        resumed=resumed.get(runner.label),
+                        samples=self.samples,
+                        on_record=record_outcome(runner.label),
+                        total=len(riddles),
+                    )
+                )
+                for runner in self.runners
+            ]
+        reports = [task.result() for task in tasks]
+
+        comparison = {
+            "models": [runner.label for runner in self.runners],
+            "confidence": confidence,
+            "riddles_used": used,
+            "riddles_available": len(riddles),
+            "requests": requests,
+            "stopped_early": used < len(riddles),
+            "budget_exhausted": budget_exhausted,
+            "pairs": pairs,
+        }
+        return reports, comparison
+
+    def overview(self, outcomes: list[dict[str, Any] | BaseException], report_paths: dict[str, Path]) -> dict[str, Any]:
+        """
+        Consolidate the outcomes of the runners into one table, e.g. for a grid.
+
+        Args:
+            outcomes: The result of each runner (or the exception it raised), as returned by run.
+            report_paths: Paths of the saved reports, keyed by runner label.
+
+        Returns:
+            The configuration, results file, accuracy, cost and request counts of every runner,
+            and the number of requests shared between runners.
+        """
+        runs = []
+        for sweep_model, runner, outcome in zip(self.models, self.runners, outcomes, strict=True):
+            run: dict[str, Any] = {
+                "label": runner.label,
+                "model": runner.model_name,
+                "prompt_id": sweep_model.prompt_id,
+                "use_reason": runner.use_reason,
+                "extra_params": runner.extra_params,
+            }
+            if isinstance(outcome, BaseException):
+                run["error"] = str(outcome)
+            else:
+                summary = outcome["summary"]
+                metrics = summary.get("metrics") or {}
+                run.update(
+                    {
+                        "report": str(report_paths[runner.label]) if runner.label in report_paths else None,
+                        "accuracy": summary["accuracy"],
+                        "correct_answers": summary["correct_answers"],
+                        "total_questions": summary["total_questions"],
+                        "total_cost": metrics.get("total_cost"),
+                        "requests": metrics.get("requests"),
+                        "shared_requests": metrics.get("shared_requests"),
+                    }
+                )
+            runs.append(run)
+        return {
+            "shared_requests": self.deduplicator.shared if self.deduplicator is not None else 0,
+            "runs": runs,
+        }
+
+    @staticmethod
+    def _paired_tests(outcomes: dict[str, dict[RecordKey, bool]], alpha: float) -> list[dict[str, Any]]:
+        """Run the sequential test on every pair of models over the samples both have answered."""
+        pairs = []
+        for (first, first_outcomes), (second, second_outcomes) in itertools.combinations(outcomes.items(), 2):
+            wins = losses = 0
+            for key in first_outcomes.keys() & second_outcomes.keys():
+                first_correct = first_outcomes[key]
+                second_correct = second_outcomes[key]
+                wins += first_correct and not second_correct
+                losses += second_correct and not first_correct
+            test = sequential_sign_test(wins, losses, alpha)
+            if test["decided"]:
+                test["winner"] = first if wins > losses else second
+            pairs.append({"models": [first, second], **test})
+        return pairs
+
+    def _make_provider_limiter(self, provider: str) -> ConcurrencyLimiter:
+        if provider in self.provider_limits:
+            limit: int | None = self.provider_limits[provider]
+        else:
+            limit = self.provider_concurrency
+        logger.info(f"Provider {provider}: concurrency {limit if limit is not None else 'auto'}")
+        return make_limiter(limit)
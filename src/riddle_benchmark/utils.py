@@ -35,3 +35,37 @@ def get_image_assets_path() -> Path:
 def get_prompt_assets_path() -> Path:
     """Return the path to the prompt assets directory."""
     return get_assets_path() / "prompts"
+
+
+def load_prompt(prompt_id: str) -> str | None:
+    """
+    Read the prompt file of a prompt ID (assets/prompts/{id:02d}.txt).
+
+    Args:
+        prompt_id: The prompt ID, e.g. "1". "0" means no prompt.
+
+    Returns:
+        The prompt, or None for "0" or a missing prompt file.
+    """
+    if not prompt_id or prompt_id == "0":
+        return None
+    prompt_path = get_prompt_assets_path() / f"{int(prompt_id):02d}.txt"
+    if not prompt_path.exists():
+        get_logger(__name__).warning(f"Prompt file not found: {prompt_path}")
+        return None
+    return prompt_path.read_text(encoding="utf-8")
+
+
+def get_provider(model_name: str) -> str:
+    """
+    Return the provider prefix of a LiteLLM model name.
+
+    Args:
+        model_name: The model name (e.g., "gemini/gemini-2.5-pro").
+
+    Returns:
+        The provider prefix (e.g., "gemini"), or "default" if the name has no prefix.
+    """
+    if "/" in model_name:
+        return model_name.split("/", 1)[0]
+    return "default"
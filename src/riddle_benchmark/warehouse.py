@@ -0,0 +1,353 @@
+import functools
+import hashlib
+import json
+import sqlite3
+from collections.abc import Iterable
+from datetime import datetime
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from riddle_benchmark.utils import get_logger, get_prompt_assets_path
+
+logger = get_logger(__name__)
+
+DEFAULT_WAREHOUSE_PATH = Path("riddle_results.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    content_hash TEXT NOT NULL UNIQUE,
+    model TEXT NOT NULL,
+    timestamp TEXT,
+    prompt TEXT,
+    prompt_id TEXT,
+    use_reason INTEGER,
+    extra_params TEXT,
+    selection TEXT,
+    image_variant TEXT,
+    parameters TEXT,
+    samples INTEGER NOT NULL,
+    total_questions INTEGER,
+    correct_answers INTEGER,
+    accuracy REAL,
+    elapsed REAL,
+    throughput REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_cost REAL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    riddle_id TEXT NOT NULL,
+    sample INTEGER NOT NULL,
+    prediction TEXT,
+    normalized_prediction TEXT,
+    is_correct INTEGER NOT NULL,
+    error TEXT,
+    latency REAL,
+    queue_wait REAL,
+    attempts INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    reasoning_tokens INTEGER,
+    cost REAL,
+    PRIMARY KEY (run_id, riddle_id, sample)
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs (model);
+CREATE INDEX IF NOT EXISTS runs_prompt ON runs (prompt_id);
+CREATE INDEX IF NOT EXISTS runs_source ON runs (source);
+CREATE INDEX IF NOT EXISTS records_riddle ON records (riddle_id);
+"""
+
+_RUN_COLUMNS = [
+    "source",
+    "content_hash",
+    "model",
+    "timestamp",
+    "prompt",
+    "prompt_id",
+    "use_reason",
+    "extra_params",
+    "selection",
+    "image_variant",
+    "parameters",
+    "samples",
+    "total_questions",
+    "correct_answers",
+    "accuracy",
+    "elapsed",
+    "throughput",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_cost",
+    "ingested_at",
+]
+
+_RECORD_COLUMNS = [
+    "run_id",
+    "riddle_id",
+    "sample",
+    "prediction",
+    "normalized_prediction",
+    "is_correct",
+    "error",
+    "latency",
+    "queue_wait",
+    "attempts",
+    "prompt_tokens",
+    "completion_tokens",
+    "reasoning_tokens",
+    "cost",
+]
+
+# Latest run of each configuration, ranked by accuracy. Runs on another subset of the dataset
+# (e.g., a --limit smoke test or one shard), image variant or number of samples are ranked
+# separately, so that they do not replace the full run of the same model and parameters.
+_LEADERBOARD_QUERY = """
+SELECT
+    model,
+    prompt_id,
+    use_reason,
+    extra_params,
+    selection,
+    image_variant,
+    samples,
+    accuracy,
+    correct_answers,
+    total_questions,
+    total_cost,
+    (SELECT AVG(latency) FROM records WHERE records.run_id = latest.id) AS mean_latency,
+    runs_count,
+    timestamp
+FROM (
+    SELECT
+        runs.*,
+        COUNT(*) OVER configuration AS runs_count,
+        ROW_NUMBER() OVER (configuration ORDER BY timestamp DESC, id DESC) AS recency
+    FROM runs
+    WHERE (:model IS NULL OR model LIKE :model)
+    WINDOW configuration AS (
+        PARTITION BY model, prompt_id, use_reason, extra_params, selection, image_variant, samples
+    )
+) AS latest
+WHERE recency = 1
+ORDER BY accuracy DESC, model
+LIMIT :limit
+"""
+
+
+def prompt_id(prompt: str | None) -> str:
+    """
+    Identify a prompt by the ID of the bundled prompt with the same text ("0" for no prompt).
+
+    Prompts that match no bundled prompt (e.g., an edited prompt file) are identified by
+    "#" followed by a short hash of their text.
+    """
+    if not prompt:
+        return "0"
+    bundled = _bundled_prompt_ids().get(prompt)
+    if bundled is not None:
+        return bundled
+    return "#" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+
+
+@functools.cache
+def _bundled_prompt_ids() -> dict[str, str]:
+    """Map the text of each bundled prompt to its ID."""
+    return {
+        path.read_text(encoding="utf-8"): str(int(path.stem))
+        for path in sorted(get_prompt_assets_path().glob("*.txt"))
+        if path.stem.isdigit()
+    }
+
+
+def content_hash(data: bytes) -> str:
+    """Return the hash used to recognize an already ingested report."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultsWarehouse:
+    """
+    SQLite database of benchmark runs and their per-riddle records.
+
+    Reports are identified by the hash of their JSON file: ingesting an unchanged file
+    again is a no-op, and a report rewritten at the same path (e.g., re-scored) replaces
+    its previous run.
+    """
+
+    def __init__(self, path: Path = DEFAULT_WAREHOUSE_PATH):
+        """
+        Open (and create if needed) the database.
+
+        Args:
+            path: Path of the SQLite file.
+        """
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def add_report(self, report: dict[str, Any], report_hash: str, source: str | None = None) -> int | None:
+        """
+        Store a report unless a report with the same hash is already stored.
+
+        Args:
+            report: A report as written by BenchmarkRunner.save_report.
+            report_hash: Hash of the report file (see content_hash).
+            source: Path of the report file. A previous run from the same path is replaced.
+
+        Returns:
+            The ID of the new run, or None if the report was already stored.
+        """
+        if self._connection.execute("SELECT 1 FROM runs WHERE content_hash = ?", (report_hash,)).fetchone():
+            return None
+
+        summary = report.get("summary", {})
+        parameters = summary.get("parameters", {})
+        metrics = summary.get("metrics") or {}
+        run = {
+            "source": source,
+            "content_hash": report_hash,
+            "model": summary.get("model", ""),
+            "timestamp": summary.get("timestamp"),
+            "prompt": parameters.get("prompt"),
+            "prompt_id": prompt_id(parameters.get("prompt")),
+            "use_reason": parameters.get("use_reason"),
+            "extra_params": json.dumps(parameters.get("extra_params") or {}, sort_keys=True, ensure_ascii=False),
+            "selection": _selection_key(parameters.get("selection")),
+            "image_variant": parameters.get("image_variant"),
+            "parameters": json.dumps(parameters, ensure_ascii=False),
+            "samples": summary.get("samples", 1),
+            "total_questions": summary.get("total_questions"),
+            "correct_answers": summary.get("correct_answers"),
+            "accuracy": summary.get("accuracy"),
+            "elapsed": metrics.get("elapsed"),
+            "throughput": metrics.get("throughput"),
+            "prompt_tokens": metrics.get("prompt_tokens"),
+            "completion_tokens": metrics.get("completion_tokens"),
+            "total_cost": metrics.get("total_cost"),
+            "ingested_at": datetime.now().isoformat(),
+        }
+
+        with self._connection:
+            if source is not None:
+                self._connection.execute("DELETE FROM runs WHERE source = ?", (source,))
+            cursor = self._connection.execute(
+                f"INSERT INTO runs ({', '.join(_RUN_COLUMNS)}) VALUES ({', '.join('?' * len(_RUN_COLUMNS))})",
+                [run[column] for column in _RUN_COLUMNS],
+            )
+            run_id = cursor.lastrowid
+            if run_id is None:
+                raise RuntimeError("SQLite did not return the ID of the new run")
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO records ({', '.join(_RECORD_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_RECORD_COLUMNS))})",
+                (_record_row(run_id, record) for record in report.get("details", [])),
+            )
+        return run_id
+
+    def ingest_file(self, path: Path) -> bool:
+        """
+        Store a report file unless it is already stored.
+
+        Args:
+            path: Path of the JSON report.
+
+        Returns:
+            Whether the file was ingested (False if it was already stored).
+        """
+        data = path.read_bytes()
+        report_hash = content_hash(data)
+        if self._connection.execute("SELECT 1 FROM runs WHERE content_hash = ?", (report_hash,)).fetchone():
+            return False
+        return self.add_report(json.loads(data), report_hash, source=str(path.resolve())) is not None
+
+    def ingest_files(self, paths: Iterable[Path]) -> tuple[int, int]:
+        """
+        Store report files, skipping the ones already stored and the unreadable ones.
+
+        Args:
+            paths: Paths of the JSON reports.
+
+        Returns:
+            The number of ingested and skipped files.
+        """
+        ingested = skipped = 0
+        for path in paths:
+            try:
+                if self.ingest_file(path):
+                    ingested += 1
+                else:
+                    skipped += 1
+            except (OSError, json.JSONDecodeError, AttributeError) as e:
+                logger.warning(f"Skipping {path}: {e}")
+                skipped += 1
+        return ingested, skipped
+
+    def leaderboard(self, model: str | None = None, limit: int = 100) -> list[dict[str, Any]]:
+        """
+        Rank the latest run of each configuration by accuracy.
+
+        A configuration is a model, prompt, reason setting and extra parameters, run on a
+        dataset selection with an image variant and a number of samples.
+
+        Args:
+            model: Optional SQL LIKE pattern of the model names (e.g., "openai/%").
+            limit: Maximum number of rows.
+
+        Returns:
+            One row per configuration with its accuracy, counts, cost, mean latency
+            and the number of stored runs.
+        """
+        rows = self._connection.execute(_LEADERBOARD_QUERY, {"model": model, "limit": limit}).fetchall()
+        return [dict(row) for row in rows]
+
+
+def _selection_key(selection: dict[str, Any] | None) -> str:
+    """Canonical JSON of a dataset selection ("{}" for the whole dataset), ignoring the seed if nothing is drawn."""
+    fields = {name: value for name, value in (selection or {}).items() if value is not None}
+    if "sample" not in fields:
+        fields.pop("seed", None)
+    return json.dumps(fields, sort_keys=True, ensure_ascii=False)
+
+
+def _record_row(run_id: int, record: dict[str, Any]) -> list[Any]:
+    """Flatten a result record into a row of the records table."""
+    metrics = record.get("metrics") or {}
+    row = {
+        "run_id": run_id,
+        "riddle_id": record["riddle_id"],
+        "sample": record.get("sample", 0),
+        "prediction": record.get("prediction"),
+        "normalized_prediction": record.get("normalized_prediction"),
+        "is_correct": bool(record.get("is_correct")),
+        "error": record.get("error"),
+        "latency": metrics.get("latency"),
+        "queue_wait": metrics.get("queue_wait"),
+        "attempts": metrics.get("attempts"),
+        "prompt_tokens": metrics.get("prompt_tokens"),
+        "completion_tokens": metrics.get("completion_tokens"),
+        "reasoning_tokens": metrics.get("reasoning_tokens"),
+        "cost": metrics.get("cost"),
+    }
+    return [row[column] for column in _RECORD_COLUMNS]
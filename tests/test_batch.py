@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from riddle_benchmark.batch import (
+    BatchManifest,
+    export_batch,
+    ingest_batch_output,
+    load_batch_output,
+    make_custom_id,
+    manifest_path_for,
+    parse_custom_id,
+)
+from riddle_benchmark.dataset.schema import Riddle
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def riddles(tmp_path):
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(PNG_HEADER + b"data")
+    return [
+        Riddle(id="001", image_path=image_path, question="q1", acceptable_answers=["りんご"]),
+        Riddle(id="002", image_path=image_path, question="q2", acceptable_answers=["W"]),
+    ]
+
+
+def _output_line(custom_id: str, content: str | None = None, status_code: int = 200) -> str:
+    body: dict[str, Any] = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-2024-08-06",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+    }
+    if status_code != 200:
+        body = {"error": {"message": "Invalid request"}}
+    return json.dumps({"custom_id": custom_id, "response": {"status_code": status_code, "body": body}, "error": None})
+
+
+def test_custom_id_roundtrip():
+    assert parse_custom_id(make_custom_id("a#b", 3)) == ("a#b", 3)
+    with pytest.raises(ValueError):
+        parse_custom_id("no-sample")
+
+
+def test_export_batch(riddles, tmp_path):
+    output_path = tmp_path / "batch" / "requests.jsonl"
+    manifest = export_batch(
+        riddles, output_path, "openai/gpt-4o", prompt="Prompt", extra_params={"temperature": 0.5}, samples=2
+    )
+
+    requests = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert [request["custom_id"] for request in requests] == ["001#0", "001#1", "002#0", "002#1"]
+    body = requests[0]["body"]
+    assert requests[0]["url"] == "/v1/chat/completions"
+    assert body["model"] == "gpt-4o"
+    assert body["temperature"] == 0.5
+    assert body["response_format"]["json_schema"]["name"] == "SimpleResponse"
+    content = body["messages"][0]["content"]
+    assert content[0]["text"] == "Prompt\n\nQuestion: q1"
+    assert content[1]["image_url"]["url"].startswith("data:image/png;base64,")
+
+    saved = BatchManifest.model_validate_json(manifest_path_for(output_path).read_text(encoding="utf-8"))
+    assert saved == manifest
+    assert saved.riddle_ids == ["001", "002"]
+    assert saved.samples == 2
+
+
+def test_export_batch_unsupported_provider(riddles, tmp_path):
+    with pytest.raises(ValueError):
+        export_batch(riddles, tmp_path / "requests.jsonl", "gemini/gemini-2.5-pro")
+
+
+def test_ingest_batch_output(riddles, tmp_path):
+    output_path = tmp_path / "output.jsonl"
+    output_path.write_text(
+        "\n".join(
+            [
+                _output_line("002#0", json.dumps({"answer": "Ｗ"})),
+                _output_line("001#0", json.dumps({"answer": "みかん"})),
+                _output_line("001#1", status_code=400),
+                "not json",
+            ]
+        ),
+        encoding="utf-8",
+    )
+    manifest = BatchManifest(model="openai/gpt-4o", samples=2, riddle_ids=["001", "002"], created_at="")
+
+    report = ingest_batch_output(manifest, load_batch_output(output_path), riddles)
+
+    details = {(record["riddle_id"], record["sample"]): record for record in report["details"]}
+    assert [(record["riddle_id"], record["sample"]) for record in report["details"]] == list(details)
+    assert details[("001", 0)]["is_correct"] is False
+    assert details[("001", 0)]["prediction"] == "みかん"
+    assert details[("001", 1)]["error"] == "Batch request failed with status 400: Invalid request"
+    assert details[("002", 0)]["is_correct"] is True
+    assert details[("002", 0)]["normalized_prediction"] == "w"
+    assert details[("002", 0)]["metrics"]["prompt_tokens"] == 100
+    assert details[("002", 1)]["error"] == "Missing from the batch output"
+
+    summary = report["summary"]
+    assert summary["model"] == "openai/gpt-4o"
+    assert summary["parameters"]["batch"] is True
+    assert summary["correct_answers"] == 1
+    assert summary["total_samples"] == 4
+    assert summary["pass_at_k"]["2"] == 0.5
+
+
+def test_ingest_batch_output_invalid_content(riddles):
+    manifest = BatchManifest(model="openai/gpt-4o", riddle_ids=["001"], created_at="")
+    outputs = {("001", 0): json.loads(_output_line("001#0", "not json"))}
+
+    report = ingest_batch_output(manifest, outputs, riddles[:1])
+
+    assert "error" in report["details"][0]
+    assert report["summary"]["accuracy"] == 0
+
+
+def test_ingest_batch_output_repairs_wrapped_json(riddles):
+    manifest = BatchManifest(model="openai/gpt-4o", riddle_ids=["001"], created_at="")
+    content = '```json\n{"answer": "りんご"}\n```'
+    outputs = {("001", 0): json.loads(_output_line("001#0", content))}
+
+    report = ingest_batch_output(manifest, outputs, riddles[:1])
+
+    assert report["details"][0]["prediction"] == "りんご"
+    assert "error" not in report["details"][0]
+
+
+def test_load_batch_output_skips_malformed_lines(tmp_path):
+    path = tmp_path / "output.jsonl"
+    path.write_text(_output_line("001#0", "{}") + '\n{"custom_id": "bad"}\n\n', encoding="utf-8")
+    assert list(load_batch_output(path)) == [("001", 0)]
+
+
+def test_manifest_path_for():
+    assert manifest_path_for(Path("out/requests.jsonl")) == Path("out/requests.manifest.json")
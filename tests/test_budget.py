@@ -0,0 +1,82 @@
+from unittest.mock import patch
+
+import pytest
+
+from riddle_benchmark.budget import SpendBudget, SpendTracker
+from riddle_benchmark.models.errors import BudgetExceededError
+
+
+@pytest.fixture(autouse=True)
+def prices():
+    # $1 per million prompt tokens and $4 per million completion tokens, whatever the model
+    with patch(
+        "riddle_benchmark.budget.litellm.cost_per_token",
+        side_effect=lambda model, prompt_tokens, completion_tokens: (prompt_tokens * 1e-6, completion_tokens * 4e-6),
+    ):
+        yield
+
+
+def test_reserve_and_settle():
+    tracker = SpendTracker(SpendBudget(max_cost=1.0))
+
+    reservation = tracker.reserve("gpt-4o", 1000, 1000)
+    assert reservation.cost == pytest.approx(0.005)
+    assert (tracker.reserved_cost, tracker.reserved_tokens) == pytest.approx((0.005, 2000))
+
+    tracker.settle(reservation, 1500, 0.003)
+    assert (tracker.spent_cost, tracker.spent_tokens) == pytest.approx((0.003, 1500))
+    assert (tracker.reserved_cost, tracker.reserved_tokens) == pytest.approx((0.0, 0))
+
+    # Failed requests are not counted
+    tracker.release(tracker.reserve("gpt-4o", 1000, 1000))
+    assert tracker.spent_tokens == 1500
+    assert tracker.reserved_tokens == 0
+
+
+def test_projection_learns_from_actual_spend():
+    tracker = SpendTracker(SpendBudget(max_tokens=100_000))
+    assert tracker.project("o3", 1000, 1000) == pytest.approx((0.005, 2000))
+
+    # Reasoning tokens make the requests more expensive than the completion allowance
+    tracker.settle(tracker.reserve("o3", 1000, 1000), 9000, 0.04)
+    assert tracker.project("o3", 1000, 1000) == pytest.approx((0.04, 9000))
+    # Other models keep their own projection
+    assert tracker.project("gpt-4o", 1000, 1000) == pytest.approx((0.005, 2000))
+
+
+def test_refuses_requests_beyond_budget():
+    tracker = SpendTracker(SpendBudget(max_tokens=5000))
+
+    first = tracker.reserve("gpt-4o", 1000, 1000)
+    tracker.reserve("gpt-4o", 1000, 1000)
+    # The requests in flight count towards the budget
+    with pytest.raises(BudgetExceededError):
+        tracker.reserve("gpt-4o", 1000, 1000)
+    assert tracker.exhausted
+
+    # Once exhausted, no new request is started even if the budget frees up
+    tracker.release(first)
+    with pytest.raises(BudgetExceededError):
+        tracker.reserve("gpt-4o", 100, 100)
+
+    assert tracker.summary() == {
+        "max_cost": None,
+        "max_tokens": 5000,
+        "spent_cost": 0.0,
+        "spent_tokens": 0,
+        "exhausted": True,
+        "refused_requests": 2,
+    }
+
+
+def test_unpriced_models_count_reported_cost():
+    tracker = SpendTracker(SpendBudget(max_cost=0.01))
+
+    with patch("riddle_benchmark.budget.litellm.cost_per_token", side_effect=Exception("not mapped")):
+        reservation = tracker.reserve("local/fake", 1000, 1000)
+    assert reservation.cost == 0.0
+
+    tracker.settle(reservation, 2000, 0.006)
+    # Projected from the reported cost of its previous requests
+    with pytest.raises(BudgetExceededError):
+        tracker.reserve("local/fake", 1000, 1000)
@@ -0,0 +1,150 @@
+import asyncio
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from riddle_benchmark.models.cache import CacheMode, RequestDeduplicator, ResponseCache
+from riddle_benchmark.models.schemas import SimpleResponse, ThinkingResponse
+
+
+@pytest.fixture
+def messages():
+    return [{"role": "user", "content": [{"type": "text", "text": "Question: q"}]}]
+
+
+def test_make_key_is_stable(messages):
+    key1 = ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {"temperature": 0.5})
+    key2 = ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {"temperature": 0.5})
+    assert key1 == key2
+
+
+def test_make_key_depends_on_request(messages):
+    base = ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {})
+    assert base != ResponseCache.make_key("gpt-5", messages, SimpleResponse, {})
+    assert base != ResponseCache.make_key("gpt-4o", messages, ThinkingResponse, {})
+    assert base != ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {"reasoning_effort": "high"})
+    other_messages = [{"role": "user", "content": [{"type": "text", "text": "Question: other"}]}]
+    assert base != ResponseCache.make_key("gpt-4o", other_messages, SimpleResponse, {})
+
+
+def test_make_key_per_sample(messages):
+    base = ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {})
+    # The first sample shares the key of a single request; the others get their own entries
+    assert ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {}, sample=0) == base
+    assert ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {}, sample=1) != base
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path)
+    assert cache.get("abc123") is None
+
+    cache.put("abc123", '{"answer": "a"}')
+    assert cache.get("abc123") == '{"answer": "a"}'
+
+
+@pytest.mark.parametrize(
+    "mode, can_read, can_write",
+    [
+        (CacheMode.READ, True, True),
+        (CacheMode.WRITE, False, True),
+        (CacheMode.READONLY, True, False),
+        (CacheMode.OFF, False, False),
+    ],
+)
+def test_cache_modes(tmp_path, mode, can_read, can_write):
+    ResponseCache(cache_dir=tmp_path).put("abc123", "cached")
+
+    cache = ResponseCache(cache_dir=tmp_path, mode=mode)
+    assert (cache.get("abc123") == "cached") is can_read
+
+    cache.put("def456", "new")
+    assert (ResponseCache(cache_dir=tmp_path).get("def456") == "new") is can_write
+
+
+def test_replay_forces_readonly(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path, mode=CacheMode.WRITE, replay=True)
+    assert cache.mode == CacheMode.READONLY
+    assert cache.replay
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    content = "x" * 100
+    cache = ResponseCache(cache_dir=tmp_path, max_bytes=400)
+
+    for i, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.put(key, content)
+        os.utime(cache._entry_path(key), (1000 + i, 1000 + i))
+
+    # Reading "aa01" makes it the most recently used entry
+    assert cache.get("aa01") == content
+
+    cache.put("dd04", content)
+
+    assert cache.get("bb02") is None
+    assert cache.get("aa01") == content
+    assert cache.get("dd04") == content
+
+
+def test_eviction_indexes_existing_entries_once(tmp_path):
+    content = "x" * 100
+    previous = ResponseCache(cache_dir=tmp_path, max_bytes=None)
+    for i, key in enumerate(["aa01", "bb02", "cc03"]):
+        previous.put(key, content)
+        os.utime(previous._entry_path(key), (1000 + i, 1000 + i))
+    # A read by an earlier run refreshes the entry
+    assert previous.get("aa01") == content
+
+    cache = ResponseCache(cache_dir=tmp_path, max_bytes=400)
+    with patch.object(Path, "glob", wraps=tmp_path.glob) as glob:
+        cache.put("dd04", content)
+        cache.put("ee05", content)
+    glob.assert_called_once()
+
+    assert not cache._entry_path("bb02").exists()
+    assert not cache._entry_path("cc03").exists()
+    assert cache.get("aa01") == content
+
+
+@pytest.mark.asyncio
+async def test_deduplicator_shares_identical_requests():
+    deduplicator = RequestDeduplicator()
+    sent: list[str] = []
+
+    async def send(key: str) -> str:
+        sent.append(key)
+        await asyncio.sleep(0.01)
+        return f"response-{key}"
+
+    results = list(
+        await asyncio.gather(
+            deduplicator.fetch("a", lambda: send("a")),
+            deduplicator.fetch("a", lambda: send("a")),
+            deduplicator.fetch("b", lambda: send("b")),
+        )
+    )
+
+    assert sent == ["a", "b"]
+    assert results == [("response-a", False), ("response-a", True), ("response-b", False)]
+    assert deduplicator.shared == 1
+
+    # Completed requests are not kept: a later identical request is sent again
+    assert await deduplicator.fetch("a", lambda: send("a")) == ("response-a", False)
+    assert sent == ["a", "b", "a"]
+    assert not deduplicator._tasks
+
+
+@pytest.mark.asyncio
+async def test_deduplicator_forgets_failures():
+    deduplicator = RequestDeduplicator()
+
+    async def fail() -> str:
+        raise RuntimeError("boom")
+
+    async def succeed() -> str:
+        return "response"
+
+    with pytest.raises(RuntimeError):
+        await deduplicator.fetch("a", fail)
+    assert await deduplicator.fetch("a", succeed) == ("response", False)
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Startup budget of `riddle-benchmark --help` in seconds. Importing LiteLLM alone takes
+# several seconds, so exceeding this means a heavy dependency is imported eagerly again.
+HELP_BUDGET_SECONDS = 1.0
+
+HEAVY_MODULES = ["litellm", "tenacity", "tqdm", "pydantic"]
+
+_PROBE = """
+import sys
+from riddle_benchmark.cli import main
+
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+print("loaded:" + ",".join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def _run_cli(*argv: str) -> tuple[float, list[str]]:
+    """Run the CLI in a fresh interpreter and return its wall time and the heavy modules it imported."""
+    started_at = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(modules=HEAVY_MODULES), *argv],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - started_at
+    loaded = completed.stdout.splitlines()[-1].removeprefix("loaded:")
+    return elapsed, [name for name in loaded.split(",") if name]
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["--samples", "0"], ["rescore", "--help"], ["pack", "--help"]])
+def test_cli_defers_heavy_imports(argv):
+    _, loaded = _run_cli(*argv)
+    assert loaded == []
+
+
+def test_cli_help_startup_budget():
+    # Best of three, so that a cold disk cache does not make the test flaky
+    elapsed = min(_run_cli("--help")[0] for _ in range(3))
+    assert elapsed < HELP_BUDGET_SECONDS
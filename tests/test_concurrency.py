@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from riddle_benchmark.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimiter,
+    ProviderLimiters,
+    is_rate_limit_error,
+    make_limiter,
+    parse_concurrency,
+)
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(FakeRateLimitError())
+    assert not is_rate_limit_error(ValueError("bad"))
+
+
+def test_parse_concurrency():
+    assert parse_concurrency("auto") is None
+    assert parse_concurrency("8") == 8
+    with pytest.raises(ValueError):
+        parse_concurrency("0")
+    with pytest.raises(ValueError):
+        parse_concurrency("many")
+
+
+def test_make_limiter():
+    assert isinstance(make_limiter(None), AdaptiveConcurrencyLimiter)
+    fixed = make_limiter(3)
+    assert not isinstance(fixed, AdaptiveConcurrencyLimiter)
+    assert fixed.limit == 3
+
+
+@pytest.mark.asyncio
+async def test_limiter_bounds_in_flight_requests():
+    limiter = ConcurrencyLimiter(2)
+    peak = 0
+
+    async def request() -> None:
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(request() for _ in range(6)))
+
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_releases_slot_on_error():
+    limiter = ConcurrencyLimiter(1)
+
+    with pytest.raises(ValueError):
+        async with limiter.slot():
+            raise ValueError("boom")
+
+    assert limiter.in_flight == 0
+
+
+def test_adaptive_limiter_increases_while_healthy():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=5)
+    for _ in range(50):
+        limiter.on_complete(1.0, None)
+    assert limiter.limit == 5
+
+
+def test_adaptive_limiter_backs_off_on_rate_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, min_limit=2)
+    limiter.on_complete(1.0, FakeRateLimitError())
+    assert limiter.limit == 8
+
+    for _ in range(10):
+        limiter.on_complete(1.0, FakeRateLimitError())
+    assert limiter.limit == 2
+
+
+def test_adaptive_limiter_backs_off_on_latency_spike():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+    limiter.on_complete(1.0, None)
+    before = limiter._limit
+    limiter.on_complete(5.0, None)
+    assert limiter._limit < before
+
+
+def test_adaptive_limiter_backs_off_on_error_rate():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, error_rate_threshold=0.2)
+    for _ in range(5):
+        limiter.on_complete(1.0, None)
+    before = limiter._limit
+    for _ in range(3):
+        limiter.on_complete(1.0, ValueError("server error"))
+    assert limiter._limit < before
+
+
+def test_provider_limiters_share_by_prefix():
+    limiters = ProviderLimiters(lambda provider: ConcurrencyLimiter(3))
+    assert limiters.for_model("openai/gpt-4o") is limiters.for_model("openai/gpt-5")
+    assert limiters.for_model("openai/gpt-4o") is not limiters.for_model("gemini/gemini-2.5-pro")
+    assert [provider for provider, _ in limiters.items()] == ["openai", "gemini"]
@@ -1,9 +1,11 @@
 import json
+from collections.abc import Iterator
 from pathlib import Path
+from typing import Any
 
 import pytest
 
-from riddle_benchmark.dataset.loader import DataLoader
+from riddle_benchmark.dataset.loader import DataLoader, RiddleSelection, parse_shard
 from riddle_benchmark.dataset.schema import Riddle
 
 
@@ -90,3 +92,87 @@ def test_dataloader_missing_image(tmp_path):
 
     with pytest.raises(ValueError, match="Image file not found"):
         loader.load()
+
+
+def test_dataloader_load_answers(mock_assets_dir):
+    """Test loading the answers without the images."""
+    (mock_assets_dir / "images" / "test_riddle.png").unlink()
+    loader = DataLoader(data_dir=mock_assets_dir)
+
+    assert loader.load_answers() == {"test_001": ["test", "TEST"]}
+
+
+@pytest.fixture
+def large_assets_dir(tmp_path):
+    """Create a mock assets directory with ten riddles."""
+    assets_dir = tmp_path / "assets"
+    (assets_dir / "images").mkdir(parents=True)
+    with open(assets_dir / "metadata.jsonl", "w", encoding="utf-8") as f:
+        for i in range(10):
+            (assets_dir / "images" / f"{i:03d}.png").touch()
+            f.write(json.dumps({"id": f"{i:03d}", "file_name": f"images/{i:03d}.png", "answers": [str(i)]}) + "\n")
+    return assets_dir
+
+
+def _load_ids(assets_dir: Path, **selection: Any) -> list[str]:
+    return [riddle.id for riddle in DataLoader(assets_dir, RiddleSelection(**selection)).load()]
+
+
+def test_dataloader_selection(large_assets_dir):
+    """Test selecting riddles by ID, limit, random sample and shard."""
+    assert _load_ids(large_assets_dir, ids=["005", "001", "missing"]) == ["001", "005"]
+    assert _load_ids(large_assets_dir, limit=3) == ["000", "001", "002"]
+    assert _load_ids(large_assets_dir, shard=(1, 4)) == ["001", "005", "009"]
+
+    sampled = _load_ids(large_assets_dir, sample=4, seed=1)
+    assert len(sampled) == 4
+    assert sampled == sorted(sampled)
+    assert _load_ids(large_assets_dir, sample=4, seed=1) == sampled
+    assert _load_ids(large_assets_dir, sample=20) == _load_ids(large_assets_dir)
+
+    # The shards of a selection partition it
+    shards = [_load_ids(large_assets_dir, sample=7, seed=3, shard=(i, 3)) for i in range(3)]
+    assert sorted(sum(shards, [])) == _load_ids(large_assets_dir, sample=7, seed=3)
+
+
+def test_dataloader_selection_skips_images(large_assets_dir):
+    """Images of riddles outside the selection are never checked."""
+    (large_assets_dir / "images" / "003.png").unlink()
+    assert _load_ids(large_assets_dir, ids=["001", "002"]) == ["001", "002"]
+    with pytest.raises(ValueError):
+        DataLoader(large_assets_dir).load()
+    # Counting does not check the images either
+    assert DataLoader(large_assets_dir, RiddleSelection(shard=(1, 4))).count() == 3
+    assert DataLoader(large_assets_dir).count() == 10
+
+
+def test_dataloader_load_metadata_skips_images(large_assets_dir):
+    """Loading the metadata only does not need the images."""
+    (large_assets_dir / "images" / "003.png").unlink()
+    riddles = DataLoader(large_assets_dir, RiddleSelection(ids=["003"])).load_metadata()
+    assert [(riddle.id, riddle.acceptable_answers) for riddle in riddles] == [("003", ["3"])]
+
+
+def test_selection_limit_streams():
+    """A limit stops consuming the metadata once enough entries are selected."""
+    consumed = []
+
+    def entries() -> Iterator[dict[str, Any]]:
+        for i in range(1000):
+            consumed.append(i)
+            yield {"id": f"{i:03d}"}
+
+    selected = list(RiddleSelection(limit=3).apply(entries()))
+    assert [entry["id"] for entry in selected] == ["000", "001", "002"]
+    assert len(consumed) == 3
+
+
+@pytest.mark.parametrize("value, expected", [("0/4", (0, 4)), ("3/4", (3, 4))])
+def test_parse_shard(value, expected):
+    assert parse_shard(value) == expected
+
+
+@pytest.mark.parametrize("value", ["4/4", "1", "a/b", "-1/2"])
+def test_parse_shard_invalid(value):
+    with pytest.raises(ValueError):
+        parse_shard(value)
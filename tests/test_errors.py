@@ -0,0 +1,159 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from litellm import exceptions
+
+from riddle_benchmark.models.base import Model
+from riddle_benchmark.models.errors import (
+    BudgetExceededError,
+    CircuitBreaker,
+    CircuitOpenError,
+    ErrorKind,
+    classify_error,
+)
+from riddle_benchmark.models.policy import RequestPolicy
+from riddle_benchmark.models.schemas import SimpleResponse
+from riddle_benchmark.models.stats import RequestStats
+
+_REQUEST = httpx.Request("POST", "https://example.com")
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (exceptions.RateLimitError("slow down", "openai", "gpt-4o"), ErrorKind.RATE_LIMIT),
+        (exceptions.Timeout("timed out", "gpt-4o", "openai"), ErrorKind.TRANSIENT),
+        (exceptions.InternalServerError("boom", "openai", "gpt-4o"), ErrorKind.TRANSIENT),
+        (exceptions.APIConnectionError("refused", "openai", "gpt-4o", request=_REQUEST), ErrorKind.TRANSIENT),
+        (TimeoutError("Attempt timed out"), ErrorKind.TRANSIENT),
+        (Exception("unknown"), ErrorKind.TRANSIENT),
+        (exceptions.AuthenticationError("bad key", "openai", "gpt-4o"), ErrorKind.CONFIG),
+        (exceptions.NotFoundError("no such model", "gpt-4o", "openai"), ErrorKind.CONFIG),
+        (
+            exceptions.PermissionDeniedError("forbidden", "openai", "gpt-4o", httpx.Response(403, request=_REQUEST)),
+            ErrorKind.CONFIG,
+        ),
+        (exceptions.UnsupportedParamsError("unsupported parameter", "openai", "gpt-4o"), ErrorKind.CONFIG),
+        (exceptions.BadRequestError("invalid image", "gpt-4o", "openai"), ErrorKind.REQUEST),
+        (
+            exceptions.UnprocessableEntityError("bad json", "gpt-4o", "openai", httpx.Response(422, request=_REQUEST)),
+            ErrorKind.REQUEST,
+        ),
+        (exceptions.ContentPolicyViolationError("refused", "gpt-4o", "openai"), ErrorKind.REQUEST),
+        (exceptions.ContextWindowExceededError("too long", "gpt-4o", "openai"), ErrorKind.REQUEST),
+        (BudgetExceededError("Spend budget exhausted"), ErrorKind.REQUEST),
+        (ValueError("Model returned empty content"), ErrorKind.SCHEMA),
+        (json.JSONDecodeError("bad", "", 0), ErrorKind.SCHEMA),
+    ],
+)
+def test_classify_error(error, expected):
+    assert classify_error(error) == expected
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker("model", threshold=2, cooldown=0.05)
+    breaker.record_failure(RuntimeError("down"))
+    breaker.check()
+    breaker.record_failure(RuntimeError("down"))
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError, match="down"):
+        breaker.check()
+
+    # After the cooldown a single trial request is admitted; its failure reopens the circuit
+    breaker._opened_at = 0.0
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_failure(RuntimeError("still down"))
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker._opened_at = 0.0
+    breaker.check()
+    breaker.record_success()
+    assert not breaker.is_open
+    breaker.check()
+
+
+def _response(content: str) -> MagicMock:
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content=content))]
+    return response
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_fails_fast_on_config_errors(mock_completion):
+    mock_completion.side_effect = exceptions.AuthenticationError("bad key", "openai", "gpt-4o")
+    model = Model(model_name="gpt-4o", policy=RequestPolicy(breaker_threshold=2))
+    riddle = MagicMock(id="1")
+
+    for _ in range(2):
+        stats = RequestStats()
+        with pytest.raises(exceptions.AuthenticationError):
+            await model.solve(riddle, SimpleResponse, messages=[], stats=stats)
+        # Not retried
+        assert stats.attempts == 1
+
+    # The circuit is open: the provider is no longer called
+    with pytest.raises(CircuitOpenError):
+        await model.solve(riddle, SimpleResponse, messages=[])
+    assert mock_completion.call_count == 2
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_rejected_requests_leave_the_breaker_alone(mock_completion):
+    config_error = exceptions.AuthenticationError("bad key", "openai", "gpt-4o")
+    rejected = exceptions.ContentPolicyViolationError("refused", "gpt-4o", "openai")
+    errors = [config_error, rejected, config_error]
+    mock_completion.side_effect = errors
+    model = Model(model_name="gpt-4o", policy=RequestPolicy(breaker_threshold=2))
+    assert model.breaker is not None
+    riddle = MagicMock(id="1")
+
+    for error in errors:
+        with pytest.raises(type(error)):
+            await model.solve(riddle, SimpleResponse, messages=[])
+
+    # The rejected request did not reset the count of consecutive failures
+    assert model.breaker.is_open
+
+    # An inconclusive trial lets the next request try again
+    model.breaker._opened_at = 0.0
+    mock_completion.side_effect = [rejected, _response('{"answer": "a"}')]
+    with pytest.raises(exceptions.ContentPolicyViolationError):
+        await model.solve(riddle, SimpleResponse, messages=[])
+    assert (await model.solve(riddle, SimpleResponse, messages=[])).answer == "a"
+    assert not model.breaker.is_open
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_asks_again_on_schema_errors(mock_completion):
+    mock_completion.side_effect = [_response("I think the answer is a"), _response('{"answer": "a"}')]
+    model = Model(model_name="gpt-4o")
+
+    stats = RequestStats()
+    # No backoff before asking again
+    result = await asyncio.wait_for(model.solve(MagicMock(id="1"), SimpleResponse, messages=[], stats=stats), 0.5)
+
+    assert result.answer == "a"
+    assert stats.attempts == 2
+    assert model.breaker is not None and not model.breaker.is_open
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_repairs_wrapped_json(mock_completion):
+    mock_completion.return_value = _response('Here you go:\n```json\n{"answer": "a"}\n```')
+    model = Model(model_name="gpt-4o")
+
+    stats = RequestStats()
+    result = await model.solve(MagicMock(id="1"), SimpleResponse, messages=[], stats=stats)
+
+    assert result.answer == "a"
+    assert stats.attempts == 1
@@ -41,3 +41,23 @@ def test_evaluate_incorrect(mock_riddle):
     assert not Evaluator.evaluate("banana", mock_riddle)
     assert not Evaluator.evaluate("りんごです", mock_riddle)  # Exact match requirement (normalized)
     assert not Evaluator.evaluate("✕", mock_riddle)  # Wrong symbol
+
+
+def test_build_index():
+    index = Evaluator.build_index({"1": ["りんご", "Ａｐｐｌｅ", "apple"], "2": []})
+    assert index == {"1": frozenset({"りんご", "apple"}), "2": frozenset()}
+
+
+def test_score(mock_riddle):
+    normalized_answers = Evaluator.normalize_answers(mock_riddle.acceptable_answers)
+    assert Evaluator.score(" Ａｐｐｌｅ ", normalized_answers) == ("apple", True)
+    assert Evaluator.score("みかん", normalized_answers) == ("みかん", False)
+
+
+def test_evaluate_batch():
+    index = Evaluator.build_index({"1": ["りんご"], "2": ["◯"]})
+    predictions = [("1", "りんご"), ("2", "✕"), ("1", " りんご\n")]
+    assert Evaluator.evaluate_batch(predictions, index) == [("りんご", True), ("✕", False), ("りんご", True)]
+
+    with pytest.raises(KeyError):
+        Evaluator.evaluate_batch([("3", "a")], index)
@@ -0,0 +1,68 @@
+import pytest
+from litellm.exceptions import RateLimitError, ServiceUnavailableError
+
+from riddle_benchmark.bench import HarnessScenario, make_png, make_synthetic_riddles, run_scenario
+from riddle_benchmark.models.base import Model
+from riddle_benchmark.models.fake import FAKE_MODEL, FakeLLM, FakeProviderConfig
+from riddle_benchmark.models.schemas import ThinkingResponse
+from riddle_benchmark.models.stats import RequestStats
+from riddle_benchmark.ratelimit import get_retry_after
+
+
+@pytest.fixture
+def riddle(tmp_path):
+    return make_synthetic_riddles(1, tmp_path, images=1)[0]
+
+
+@pytest.mark.asyncio
+async def test_fake_model_returns_schema_valid_answer(riddle):
+    stats = RequestStats()
+    model = Model(FAKE_MODEL, answer="こたえ")
+    result = await model.solve(riddle, ThinkingResponse, stats=stats)
+
+    assert result.answer == "こたえ"
+    assert result.reason == "fake reason"
+    assert stats.attempts == 1
+    assert stats.prompt_tokens is not None and stats.prompt_tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_fake_provider_injects_rate_limits(riddle):
+    fake = FakeLLM(seed=0)
+    messages = Model(FAKE_MODEL).build_messages(riddle)
+
+    with pytest.raises(RateLimitError) as exc_info:
+        await fake.acompletion(
+            model="fake", messages=messages, optional_params={"rate_limit_rate": 1.0, "retry_after": 2}
+        )
+    assert get_retry_after(exc_info.value) == 2.0
+
+    with pytest.raises(ServiceUnavailableError):
+        await fake.acompletion(model="fake", messages=messages, optional_params={"error_rate": 1.0})
+
+
+def test_fake_provider_latency():
+    fake = FakeLLM(seed=0)
+    assert fake.sample_latency(FakeProviderConfig()) == 0.0
+    assert fake.sample_latency(FakeProviderConfig(latency=0.5)) == 0.5
+    draws = [fake.sample_latency(FakeProviderConfig(latency=0.5, latency_sigma=0.5)) for _ in range(200)]
+    assert min(draws) < 0.5 < max(draws)
+
+
+def test_make_png_header():
+    png = make_png(960, 540)
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    assert png[16:24] == (960).to_bytes(4, "big") + (540).to_bytes(4, "big")
+
+
+@pytest.mark.asyncio
+async def test_run_scenario(tmp_path):
+    scenario = HarnessScenario(name="test", riddles=20, images=2, concurrency=4, samples=2)
+    report = await run_scenario(scenario, tmp_path, trace_memory=True)
+
+    assert report["requests"] == 40
+    assert report["errors"] == 0
+    assert report["requests_per_sec"] > 0
+    assert report["latency"]["p50"] is not None
+    assert 0 < report["slot_utilization"] <= 1
+    assert report["peak_traced_mb"] > 0
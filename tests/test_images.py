@@ -0,0 +1,101 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from riddle_benchmark.models.images import ImageCache, detect_mime_type, encode_data_url
+from riddle_benchmark.utils import get_image_assets_path
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.mark.parametrize(
+    "data, path, expected",
+    [
+        (PNG_HEADER + b"rest", None, "image/png"),
+        (b"\xff\xd8\xff\xe0rest", None, "image/jpeg"),
+        (b"GIF89arest", None, "image/gif"),
+        (b"RIFF\x00\x00\x00\x00WEBPrest", None, "image/webp"),
+        (PNG_HEADER + b"rest", Path("mislabeled.jpg"), "image/png"),  # Content wins over extension
+        (b"unknown", Path("image.png"), "image/png"),  # Extension fallback
+        (b"unknown", None, "image/jpeg"),  # Default
+    ],
+)
+def test_detect_mime_type(data, path, expected):
+    assert detect_mime_type(data, path) == expected
+
+
+def test_encode_data_url():
+    assert encode_data_url(b"fake_image_content", Path("a.jpg")) == "data:image/jpeg;base64,ZmFrZV9pbWFnZV9jb250ZW50"
+
+
+def test_asset_images_are_png():
+    cache = ImageCache()
+    data_url = cache.get_data_url(get_image_assets_path() / "001.png")
+    assert data_url.startswith("data:image/png;base64,")
+
+
+def test_image_cache_encodes_once(tmp_path):
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(PNG_HEADER + b"data")
+    cache = ImageCache()
+
+    with patch.object(ImageCache, "_encode", wraps=ImageCache._encode) as mock_encode:
+        first = cache.get_data_url(image_path)
+        second = cache.get_data_url(image_path)
+
+    assert first is second
+    assert mock_encode.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_image_cache_detects_modification(tmp_path):
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(PNG_HEADER + b"old")
+    cache = ImageCache()
+    old_url = cache.get_data_url(image_path)
+
+    image_path.write_bytes(PNG_HEADER + b"new content")
+    new_url = cache.get_data_url(image_path)
+
+    assert new_url != old_url
+    assert cache.misses == 2
+
+
+def test_image_cache_respects_memory_budget(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.png"
+        path.write_bytes(PNG_HEADER + bytes([i]) * 30)
+        paths.append(path)
+
+    one_entry = len(encode_data_url(paths[0].read_bytes()))
+    cache = ImageCache(max_bytes=one_entry * 2)
+    for path in paths:
+        cache.get_data_url(path)
+
+    assert cache.total_bytes <= cache.max_bytes
+
+    # The least recently used image was evicted and is encoded again
+    cache.get_data_url(paths[0])
+    assert cache.misses == 4
+
+    cache.resize(0)
+    assert cache.total_bytes == 0
+
+
+def test_image_cache_from_bytes():
+    cache = ImageCache()
+    data = memoryview(b"xx" + PNG_HEADER)[2:]
+
+    data_url = cache.get_data_url_from_bytes("pack/images/001.png", data)
+    assert data_url == encode_data_url(PNG_HEADER)
+    assert cache.get_data_url_from_bytes("pack/images/001.png", data) == data_url
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A known MIME type skips detection
+    assert cache.get_data_url_from_bytes("pack/images/002", b"data", "image/gif").startswith("data:image/gif;")
+
+    # The same name and size with other bytes (e.g., another pack) is another image
+    for image in (PNG_HEADER + b"a", PNG_HEADER + b"b"):
+        assert cache.get_data_url_from_bytes("pack/images/003.png", image) == encode_data_url(image)
@@ -0,0 +1,79 @@
+import json
+from unittest.mock import patch
+
+from riddle_benchmark.journal import (
+    ResultJournal,
+    completed_records,
+    find_journal,
+    journal_path_for,
+    load_journal,
+)
+
+
+def test_journal_write_and_load(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with ResultJournal(path) as journal:
+        journal.write({"riddle_id": "1", "error": "API Error", "is_correct": False})
+        journal.write({"riddle_id": "2", "prediction": "答え", "is_correct": True})
+
+    # Reopening appends to the existing records
+    with ResultJournal(path) as journal:
+        journal.write({"riddle_id": "1", "prediction": "a", "is_correct": False})
+
+    records = load_journal(path)
+    assert records == {
+        ("1", 0): {"riddle_id": "1", "prediction": "a", "is_correct": False},
+        ("2", 0): {"riddle_id": "2", "prediction": "答え", "is_correct": True},
+    }
+
+
+def test_journal_fsync_batching(tmp_path):
+    with patch("riddle_benchmark.journal.os.fsync") as mock_fsync:
+        journal = ResultJournal(tmp_path / "results.jsonl", fsync_every=3, fsync_interval=3600)
+        for i in range(7):
+            journal.write({"riddle_id": str(i)})
+        assert mock_fsync.call_count == 2
+
+        journal.close()
+        assert mock_fsync.call_count == 3
+
+
+def test_load_journal_skips_truncated_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text(json.dumps({"riddle_id": "1", "is_correct": True}) + '\n{"riddle_id": "2", "pred', encoding="utf-8")
+
+    assert list(load_journal(path)) == [("1", 0)]
+
+
+def test_load_journal_keys_samples(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with ResultJournal(path) as journal:
+        journal.write({"riddle_id": "1", "sample": 0, "is_correct": True})
+        journal.write({"riddle_id": "1", "sample": 1, "is_correct": False})
+
+    assert list(load_journal(path)) == [("1", 0), ("1", 1)]
+
+
+def test_completed_records():
+    records = {
+        ("1", 0): {"riddle_id": "1", "is_correct": True},
+        ("2", 0): {"riddle_id": "2", "error": "API Error", "is_correct": False},
+    }
+    assert list(completed_records(records)) == [("1", 0)]
+
+
+def test_find_journal(tmp_path):
+    for name in [
+        "results_gpt-5_20250101_000000.jsonl",
+        "results_gpt-5_20250102_000000.jsonl",
+        "results_gpt-5_20250102_000000.json",
+        "results_gpt-5-mini_20250103_000000.jsonl",
+    ]:
+        (tmp_path / name).touch()
+
+    assert find_journal(tmp_path, "openai/gpt-5") == tmp_path / "results_gpt-5_20250102_000000.jsonl"
+    assert find_journal(tmp_path, "gpt-4o") is None
+
+
+def test_journal_path_for(tmp_path):
+    assert journal_path_for(tmp_path / "results_a_1.json") == tmp_path / "results_a_1.jsonl"
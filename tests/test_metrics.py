@@ -0,0 +1,102 @@
+from typing import Any
+
+import pytest
+
+from riddle_benchmark.evaluation.metrics import (
+    compute_sample_statistics,
+    default_ks,
+    pass_at_k,
+    sequential_sign_test,
+    summarize_request_metrics,
+)
+
+
+@pytest.mark.parametrize(
+    "n, c, k, expected",
+    [
+        (4, 0, 1, 0.0),
+        (4, 1, 1, 0.25),
+        (4, 1, 2, 0.5),
+        (4, 3, 2, 1.0),
+        (4, 4, 4, 1.0),
+        (5, 2, 3, 0.9),
+    ],
+)
+def test_pass_at_k(n, c, k, expected):
+    assert pass_at_k(n, c, k) == pytest.approx(expected)
+
+
+def test_default_ks():
+    assert default_ks(1) == [1]
+    assert default_ks(5) == [1, 2, 4, 5]
+    assert default_ks(8) == [1, 2, 4, 8]
+
+
+def test_compute_sample_statistics():
+    outcomes = {
+        "1": [True, True, True, True],
+        "2": [True, False, False, False],
+        "3": [False, False, False, False],
+    }
+    statistics = compute_sample_statistics(outcomes)
+
+    assert statistics["mean_accuracy"] == pytest.approx(5 / 12)
+    assert statistics["solve_rate"] == {"1": 1.0, "2": 0.25, "3": 0.0}
+    assert statistics["pass_at_k"]["1"] == pytest.approx(5 / 12)
+    assert statistics["pass_at_k"]["4"] == pytest.approx(2 / 3)
+
+    low, high = statistics["accuracy_ci"]
+    assert 0.0 <= low < 5 / 12 < high <= 1.0
+    for k, (low, high) in statistics["pass_at_k_ci"].items():
+        assert low <= statistics["pass_at_k"][k] <= high
+
+    # The bootstrap is seeded, so the intervals are reproducible
+    assert compute_sample_statistics(outcomes) == statistics
+
+
+def test_compute_sample_statistics_empty():
+    statistics = compute_sample_statistics({})
+    assert statistics["mean_accuracy"] == 0.0
+    assert statistics["accuracy_ci"] == [0.0, 0.0]
+
+
+def test_summarize_request_metrics():
+    metrics: list[dict[str, Any]] = [
+        {"latency": float(i), "queue_wait": 0.5, "attempts": 1, "cache_hit": False, "prompt_tokens": 100, "cost": 0.01}
+        for i in range(1, 101)
+    ]
+    metrics[0].update(attempts=3)
+    metrics[1].update(cache_hit=True, prompt_tokens=None, cost=None)
+
+    summary = summarize_request_metrics(metrics, elapsed=10.0, completed=50)
+
+    assert summary["requests"] == 100
+    assert summary["latency"]["p50"] == pytest.approx(50.5)
+    assert summary["latency"]["p99"] == pytest.approx(99.01)
+    assert summary["queue_wait"]["mean"] == pytest.approx(0.5)
+    assert summary["throughput"] == pytest.approx(5.0)
+    assert summary["retried_requests"] == 1
+    assert summary["cache_hits"] == 1
+    assert summary["prompt_tokens"] == 9900
+    assert summary["completion_tokens"] is None
+    assert summary["total_cost"] == pytest.approx(0.99)
+
+
+def test_sequential_sign_test():
+    # No discordant pairs carry no evidence
+    assert sequential_sign_test(0, 0, alpha=0.05) == {
+        "wins": 0,
+        "losses": 0,
+        "evidence": pytest.approx(1.0),
+        "p_value": pytest.approx(1.0),
+        "decided": False,
+    }
+
+    # 2^n / (n + 1) for a clean sweep: 8 wins are needed at 95% confidence
+    assert sequential_sign_test(7, 0, alpha=0.05)["evidence"] == pytest.approx(16.0)
+    assert not sequential_sign_test(7, 0, alpha=0.05)["decided"]
+    assert sequential_sign_test(8, 0, alpha=0.05)["decided"]
+    assert sequential_sign_test(0, 8, alpha=0.05)["decided"]
+
+    # Balanced outcomes never decide
+    assert not sequential_sign_test(50, 50, alpha=0.05)["decided"]
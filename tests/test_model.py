@@ -1,12 +1,29 @@
+import asyncio
 import json
+import mimetypes
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
+from litellm.exceptions import RateLimitError
 
+from riddle_benchmark.budget import SpendBudget, SpendTracker
+from riddle_benchmark.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimiter
 from riddle_benchmark.dataset.schema import Riddle
 from riddle_benchmark.models.base import Model
+from riddle_benchmark.models.cache import CacheMissError, ResponseCache
+from riddle_benchmark.models.errors import BudgetExceededError
+from riddle_benchmark.models.policy import LatencyTracker, RequestPolicy
 from riddle_benchmark.models.schemas import SimpleResponse
+from riddle_benchmark.models.stats import RequestStats
+from riddle_benchmark.ratelimit import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def init_mimetypes():
+    # mimetypes loads its tables lazily with open(), which the tests below patch
+    mimetypes.init()
 
 
 @pytest.fixture
@@ -99,6 +116,28 @@ async def test_model_solve_with_prompt(mock_open, mock_completion, mock_riddle):
     assert "Question:" in content[0]["text"]
 
 
+@pytest.mark.parametrize(
+    ("model_name", "marked"), [("gpt-4o", False), ("bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0", True)]
+)
+@patch("builtins.open", new_callable=MagicMock)
+def test_build_messages_prompt_cache(mock_open, mock_riddle, model_name, marked):
+    mock_open.return_value.__enter__.return_value.read.return_value = b"fake_image_content"
+    prompt = "You are a riddle solver."
+    model = Model(model_name=model_name, prompt_cache=True)
+
+    messages = model.build_messages(mock_riddle, prompt)
+
+    # The prompt is a system message of its own, identical for every riddle
+    assert [message["role"] for message in messages] == ["system", "user"]
+    system_part = messages[0]["content"][0]
+    assert system_part["text"] == prompt
+    assert ("cache_control" in system_part) is marked
+    user_content = messages[1]["content"]
+    assert prompt not in user_content[0]["text"]
+    assert "Question: What is this?" in user_content[0]["text"]
+    assert user_content[1]["type"] == "image_url"
+
+
 @patch("riddle_benchmark.models.base.litellm.acompletion")
 @patch("builtins.open", new_callable=MagicMock)
 @pytest.mark.asyncio
@@ -155,3 +194,288 @@ async def test_model_solve_no_question(mock_open, mock_completion, mock_riddle):
     assert text_part is not None
     assert "Question:" not in text_part["text"]
     assert "Hint: It's a test." in text_part["text"]
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@patch("builtins.open", new_callable=MagicMock)
+@pytest.mark.asyncio
+async def test_model_solve_uses_response_cache(mock_open, mock_completion, mock_riddle, tmp_path):
+    mock_file = MagicMock()
+    mock_file.read.return_value = b"fake_image_content"
+    mock_open.return_value.__enter__.return_value = mock_file
+
+    model = Model(model_name="gpt-4o", response_cache=ResponseCache(cache_dir=tmp_path))
+    messages = model.build_messages(mock_riddle)
+    key = ResponseCache.make_key("gpt-4o", messages, SimpleResponse, {})
+
+    with patch.object(ResponseCache, "get", return_value=json.dumps({"answer": "cached answer"})) as mock_get:
+        stats = RequestStats()
+        result = await model.solve(mock_riddle, SimpleResponse, stats=stats)
+
+    assert result.answer == "cached answer"
+    assert stats.cache_hit is True
+    assert stats.attempts == 0
+    mock_get.assert_called_once_with(key)
+    mock_completion.assert_not_called()
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_solve_repairs_cached_content(mock_completion, mock_riddle, tmp_path):
+    mock_completion.return_value.choices = [MagicMock(message=MagicMock(content='```json\n{"answer": "a"}\n```'))]
+    model = Model(model_name="gpt-4o", response_cache=ResponseCache(cache_dir=tmp_path))
+
+    first = await model.solve(mock_riddle, SimpleResponse, messages=[])
+    stats = RequestStats()
+    second = await model.solve(mock_riddle, SimpleResponse, messages=[], stats=stats)
+
+    # The raw content was cached and is repaired again on the hit
+    assert first.answer == second.answer == "a"
+    assert stats.cache_hit is True
+    mock_completion.assert_called_once()
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@patch("builtins.open", new_callable=MagicMock)
+@pytest.mark.asyncio
+async def test_model_solve_replay_miss(mock_open, mock_completion, mock_riddle, tmp_path):
+    mock_file = MagicMock()
+    mock_file.read.return_value = b"fake_image_content"
+    mock_open.return_value.__enter__.return_value = mock_file
+
+    model = Model(model_name="gpt-4o", response_cache=ResponseCache(cache_dir=tmp_path, replay=True))
+
+    with pytest.raises(CacheMissError):
+        await model.solve(mock_riddle, SimpleResponse)
+
+    mock_completion.assert_not_called()
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@patch("builtins.open", new_callable=MagicMock)
+@pytest.mark.asyncio
+async def test_model_solve_rate_limited_retry(mock_open, mock_completion, mock_riddle):
+    mock_file = MagicMock()
+    mock_file.read.return_value = b"fake_image_content"
+    mock_open.return_value.__enter__.return_value = mock_file
+
+    rate_limit_error = RateLimitError(
+        "rate limited",
+        llm_provider="openai",
+        model="gpt-4o",
+        response=httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "http://test")),
+    )
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content=json.dumps({"answer": "answer"})))]
+    mock_response.usage.total_tokens = 100
+    # More consecutive rate-limit errors than the default attempt limit
+    mock_completion.side_effect = [rate_limit_error] * 3 + [mock_response]
+
+    rate_limiter = MagicMock(spec=RateLimiter)
+    model = Model(model_name="gpt-4o", rate_limiter=rate_limiter)
+    result = await model.solve(mock_riddle, SimpleResponse)
+
+    assert result.answer == "answer"
+    assert mock_completion.call_count == 4
+    assert rate_limiter.acquire.call_count == 4
+    rate_limiter.pause.assert_called_with(0.0)
+    rate_limiter.reconcile.assert_called_once()
+    assert rate_limiter.reconcile.call_args.args[1] == 100
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_solve_reports_attempts_to_limiter(mock_completion, mock_riddle):
+    rate_limit_error = RateLimitError(
+        "rate limited",
+        llm_provider="openai",
+        model="gpt-4o",
+        response=httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "http://test")),
+    )
+    mock_completion.side_effect = [rate_limit_error, rate_limit_error, _response("answer")]
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+    model = Model(model_name="gpt-4o")
+    async with limiter.slot(report=False):
+        result = await model.solve(mock_riddle, SimpleResponse, messages=[], limiter=limiter)
+
+    assert result.answer == "answer"
+    # Both retried 429s cut the limit, although the solve call succeeded
+    assert limiter.limit < 4
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@patch("builtins.open", new_callable=MagicMock)
+@pytest.mark.asyncio
+async def test_model_solve_records_stats(mock_open, mock_completion, mock_riddle):
+    mock_file = MagicMock()
+    mock_file.read.return_value = b"fake_image_content"
+    mock_open.return_value.__enter__.return_value = mock_file
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content=json.dumps({"answer": "answer"})))]
+    mock_response.usage.prompt_tokens = 900
+    mock_response.usage.prompt_tokens_details.cached_tokens = 600
+    mock_response.usage.completion_tokens = 300
+    mock_response.usage.completion_tokens_details.reasoning_tokens = 200
+    mock_response._hidden_params = {"response_cost": 0.0042}
+    mock_completion.side_effect = [Exception("API Error"), mock_response]
+
+    stats = RequestStats()
+    model = Model(model_name="gpt-4o")
+    with patch("riddle_benchmark.models.base._backoff", return_value=0):
+        await model.solve(mock_riddle, SimpleResponse, stats=stats)
+
+    assert stats == RequestStats(
+        attempts=2, prompt_tokens=900, cached_tokens=600, completion_tokens=300, reasoning_tokens=200, cost=0.0042
+    )
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_solve_sums_stats_over_schema_retries(mock_completion, mock_riddle):
+    malformed = MagicMock()
+    malformed.choices = [MagicMock(message=MagicMock(content="not json"))]
+    malformed.usage.prompt_tokens = 900
+    malformed.usage.completion_tokens = 50
+    malformed._hidden_params = {"response_cost": 0.002}
+    response = _response("answer")
+    response.usage.prompt_tokens = 900
+    response.usage.completion_tokens = 30
+    response._hidden_params = {"response_cost": 0.001}
+    mock_completion.side_effect = [malformed, response]
+
+    stats = RequestStats()
+    model = Model(model_name="gpt-4o")
+    with patch("riddle_benchmark.models.base._backoff", return_value=0):
+        result = await model.solve(mock_riddle, SimpleResponse, messages=[], stats=stats)
+
+    assert result.answer == "answer"
+    assert (stats.attempts, stats.prompt_tokens, stats.completion_tokens) == (2, 1800, 80)
+    assert stats.cost == pytest.approx(0.003)
+
+
+def test_request_stats_keeps_total_of_unreported_usage():
+    priced = MagicMock(usage=None, _hidden_params={"response_cost": 0.002})
+    unpriced = MagicMock(usage=None, _hidden_params={})
+
+    stats = RequestStats()
+    with patch("riddle_benchmark.models.stats.litellm.completion_cost", side_effect=Exception("not priced")):
+        stats.record_response(priced)
+        stats.record_response(unpriced)
+
+    assert stats.cost == 0.002
+    assert stats.prompt_tokens is None
+
+
+def _response(answer: str) -> MagicMock:
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content=json.dumps({"answer": answer})))]
+    return response
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_solve_retries_timed_out_attempt(mock_completion, mock_riddle):
+    calls = 0
+
+    async def completion(**kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(10)
+        return _response("answer")
+
+    mock_completion.side_effect = completion
+
+    stats = RequestStats()
+    limiter = ConcurrencyLimiter(8)
+    outcomes: list[BaseException | None] = []
+    limiter.on_complete = lambda latency, error: outcomes.append(error)  # type: ignore[method-assign]
+    model = Model(model_name="gpt-4o", policy=RequestPolicy(timeout=0.05))
+    with patch("riddle_benchmark.models.base._backoff", return_value=0):
+        result = await model.solve(mock_riddle, SimpleResponse, messages=[], stats=stats, limiter=limiter)
+
+    assert result.answer == "answer"
+    assert stats.attempts == 2
+    # The timed-out attempt is reported to the limiter as a failure
+    assert len(outcomes) == 2
+    assert isinstance(outcomes[0], TimeoutError)
+    assert outcomes[1] is None
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_solve_spend_budget(mock_completion, mock_riddle):
+    response = _response("answer")
+    response.usage.total_tokens = 3000
+    response._hidden_params = {"response_cost": 0.01}
+    mock_completion.return_value = response
+
+    spend = SpendTracker(SpendBudget(max_tokens=5000))
+    model = Model(model_name="gpt-4o", spend=spend, max_tokens=1000)
+    await model.solve(mock_riddle, SimpleResponse, messages=[])
+    assert (spend.spent_tokens, spend.spent_cost) == (3000, 0.01)
+
+    # Another request like the first one would exceed the budget: it is not sent, nor retried
+    with pytest.raises(BudgetExceededError):
+        await model.solve(mock_riddle, SimpleResponse, messages=[], sample=1)
+    assert mock_completion.call_count == 1
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_solve_deadline(mock_completion, mock_riddle):
+    async def completion(**kwargs):
+        await asyncio.sleep(10)
+
+    mock_completion.side_effect = completion
+
+    model = Model(model_name="gpt-4o", policy=RequestPolicy(deadline=0.05))
+    with pytest.raises(TimeoutError, match="within 0.05s"):
+        await model.solve(mock_riddle, SimpleResponse, messages=[])
+
+
+@patch("riddle_benchmark.models.base.litellm.acompletion")
+@pytest.mark.asyncio
+async def test_model_solve_hedges_slow_request(mock_completion, mock_riddle):
+    calls = 0
+    cancelled = False
+
+    async def completion(**kwargs):
+        nonlocal calls, cancelled
+        calls += 1
+        if calls == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            return _response("slow")
+        return _response("fast")
+
+    mock_completion.side_effect = completion
+
+    model = Model(model_name="gpt-4o", policy=RequestPolicy(hedge=True, hedge_min_samples=1))
+    assert model.latencies is not None
+    model.latencies.record(0.01)
+
+    stats = RequestStats()
+    result = await asyncio.wait_for(model.solve(mock_riddle, SimpleResponse, messages=[], stats=stats), timeout=5)
+
+    assert result.answer == "fast"
+    assert stats.hedged is True
+    assert stats.attempts == 1
+    assert cancelled
+
+
+def test_latency_tracker():
+    tracker = LatencyTracker(quantile=0.9, min_samples=10)
+    for latency in range(1, 10):
+        tracker.record(float(latency))
+    assert tracker.threshold() is None
+
+    tracker.record(10.0)
+    assert tracker.threshold() == 10.0
+    tracker.record(0.5)
+    assert tracker.threshold() == 9.0
@@ -0,0 +1,86 @@
+import json
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from riddle_benchmark.dataset.loader import DataLoader, RiddleSelection
+from riddle_benchmark.dataset.packed import PackedDataset, is_packed_dataset, pack_dataset
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def assets_dir(tmp_path):
+    assets_dir = tmp_path / "assets"
+    (assets_dir / "images").mkdir(parents=True)
+    with open(assets_dir / "metadata.jsonl", "w", encoding="utf-8") as f:
+        for i in range(3):
+            (assets_dir / "images" / f"{i:03d}.png").write_bytes(PNG_HEADER + bytes([i]) * (i + 1))
+            entry = {"id": f"{i:03d}", "file_name": f"images/{i:03d}.png", "answers": [f"答え{i}"], "hint": "h"}
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return assets_dir
+
+
+def test_pack_and_load(assets_dir, tmp_path):
+    packed_path = tmp_path / "dataset.ridpack"
+    assert DataLoader(assets_dir).pack(packed_path) == 3
+    assert is_packed_dataset(packed_path)
+    assert not is_packed_dataset(assets_dir)
+
+    # The images are read from the packed file only
+    for image in (assets_dir / "images").iterdir():
+        image.unlink()
+
+    riddles = DataLoader(packed_path).load()
+    assert [riddle.id for riddle in riddles] == ["000", "001", "002"]
+    riddle = riddles[2]
+    assert riddle.acceptable_answers == ["答え2"]
+    assert riddle.hint == "h"
+    assert riddle.image_path == packed_path / "images" / "002.png"
+    assert riddle.image_mime_type == "image/png"
+    assert isinstance(riddle.image_data, memoryview)
+    assert bytes(riddle.image_data) == PNG_HEADER + b"\x02\x02\x02"
+
+    assert DataLoader(packed_path).load_answers() == {"000": ["答え0"], "001": ["答え1"], "002": ["答え2"]}
+    assert [r.id for r in DataLoader(packed_path, RiddleSelection(ids=["001"])).load()] == ["001"]
+
+
+def test_pack_selection(assets_dir, tmp_path):
+    packed_path = tmp_path / "dataset.ridpack"
+    assert DataLoader(assets_dir, RiddleSelection(ids=["002"])).pack(packed_path) == 1
+    assert [entry["id"] for entry in PackedDataset(packed_path).entries] == ["002"]
+
+
+def test_pack_missing_image(assets_dir, tmp_path):
+    (assets_dir / "images" / "001.png").unlink()
+    with pytest.raises(ValueError):
+        DataLoader(assets_dir).pack(tmp_path / "dataset.ridpack")
+
+
+def test_pack_image_changed_while_packing(assets_dir, tmp_path):
+    entries = [json.loads(line) for line in (assets_dir / "metadata.jsonl").read_text(encoding="utf-8").splitlines()]
+
+    def changing_entries() -> Iterator[dict[str, Any]]:
+        yield from entries
+        # After the sizes are indexed, before the images are copied
+        (assets_dir / "images" / "000.png").write_bytes(PNG_HEADER + b"\x00" * 10)
+
+    packed_path = tmp_path / "dataset.ridpack"
+    with pytest.raises(ValueError, match="changed while packing"):
+        pack_dataset(changing_entries(), assets_dir, packed_path)
+    assert not packed_path.exists()
+
+
+def test_pack_already_packed(assets_dir, tmp_path):
+    packed_path = tmp_path / "dataset.ridpack"
+    DataLoader(assets_dir).pack(packed_path)
+    with pytest.raises(ValueError):
+        DataLoader(packed_path).pack(tmp_path / "again.ridpack")
+
+
+def test_packed_dataset_invalid(tmp_path):
+    path = tmp_path / "invalid.ridpack"
+    path.write_bytes(b"not a packed dataset")
+    with pytest.raises(ValueError):
+        PackedDataset(path)
@@ -0,0 +1,90 @@
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from riddle_benchmark.dataset.preprocess import ImagePreprocessor, ImageVariant
+from riddle_benchmark.dataset.schema import Riddle
+from riddle_benchmark.models.images import ImageFormat
+
+
+def _png(size: tuple[int, int], mode: str = "RGBA") -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size, "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("variant", "expected"),
+    [
+        (ImageVariant(), "original"),
+        (ImageVariant(max_edge=768), "max768"),
+        (ImageVariant(max_edge=512, format=ImageFormat.JPEG, quality=80), "max512-jpeg-q80"),
+        # PNG is lossless: the quality would change nothing
+        (ImageVariant(max_edge=512, format=ImageFormat.PNG, quality=80), "max512-png"),
+    ],
+)
+def test_variant_name(variant, expected):
+    assert variant.name == expected
+
+
+def test_derive_downscales_and_reencodes(tmp_path):
+    preprocessor = ImagePreprocessor(ImageVariant(max_edge=100, format=ImageFormat.JPEG, quality=80), tmp_path)
+
+    data = preprocessor.derive(_png((400, 200)))
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (100, 50)
+    assert (preprocessor.hits, preprocessor.misses) == (0, 1)
+
+
+def test_derive_keeps_unchanged_images(tmp_path):
+    source = _png((64, 64))
+    preprocessor = ImagePreprocessor(ImageVariant(max_edge=100), tmp_path)
+
+    # Already small enough and no re-encoding asked for
+    assert preprocessor.derive(source) == source
+
+
+def test_quality_is_ignored_for_lossless_output(tmp_path):
+    source = _png((64, 64))
+    png = ImageVariant(format=ImageFormat.PNG, quality=80)
+    assert ImagePreprocessor(png, tmp_path).make_key(source) == ImagePreprocessor(
+        ImageVariant(format=ImageFormat.PNG), tmp_path
+    ).make_key(source)
+
+    # A PNG source kept in its format is not re-encoded for a quality
+    assert ImagePreprocessor(ImageVariant(quality=80), tmp_path).derive(source) == source
+
+
+def test_derived_images_are_cached_per_source_and_variant(tmp_path):
+    source = _png((400, 200))
+    variant = ImageVariant(max_edge=100)
+
+    first = ImagePreprocessor(variant, tmp_path).derive(source)
+    preprocessor = ImagePreprocessor(variant, tmp_path)
+    assert preprocessor.derive(source) == first
+    assert (preprocessor.hits, preprocessor.misses) == (1, 0)
+
+    # Another variant or an edited source is derived again
+    ImagePreprocessor(ImageVariant(max_edge=50), tmp_path).derive(source)
+    preprocessor.derive(_png((400, 201)))
+    assert len(list(tmp_path.glob("*/*.img"))) == 3
+
+
+def test_apply_renames_image_after_variant(tmp_path):
+    image_path = tmp_path / "images" / "001.png"
+    image_path.parent.mkdir()
+    image_path.write_bytes(_png((400, 200)))
+    riddle = Riddle(id="001", image_path=image_path, acceptable_answers=["a"])
+
+    derived = ImagePreprocessor(ImageVariant(max_edge=100, format=ImageFormat.WEBP), tmp_path / "cache").apply(riddle)
+
+    assert derived.image_path == Path(tmp_path / "images" / "001.max100-webp.webp")
+    assert derived.image_mime_type == "image/webp"
+    assert derived.image_data is not None
+    assert len(derived.image_data) < image_path.stat().st_size
+    # The loaded riddle is left untouched
+    assert riddle.image_data is None
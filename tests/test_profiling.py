@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from riddle_benchmark.profiling import StageProfiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler()
+
+    with profiler.stage("load"):
+        pass
+    assert list(profiler.iterate("load", [1, 2])) == [1, 2]
+
+    profiler.start()
+    assert profiler.stop()["stages"] == {}
+
+
+def test_stage_timings_and_overhead():
+    profiler = StageProfiler()
+    profiler.start()
+
+    assert list(profiler.iterate("load", ["a", "b"])) == ["a", "b"]
+    for _ in range(2):
+        with profiler.stage("solve"):
+            time.sleep(0.01)
+        with profiler.stage("evaluate"):
+            pass
+    report = profiler.stop()
+
+    stages = report["stages"]
+    # Sorted by total time
+    assert next(iter(stages)) == "solve"
+    # The end of the iteration is timed too
+    assert stages["load"]["count"] == 3
+    assert stages["solve"]["count"] == 2
+    assert stages["solve"]["max"] >= 0.01
+    assert stages["evaluate"]["allocated"] is None
+    # Time spent awaiting the provider is not harness overhead
+    overhead = stages["load"]["total"] + stages["evaluate"]["total"]
+    assert report["overhead_per_request"] == pytest.approx(overhead / 2)
+    assert "cprofile" not in report
+    assert "memory" not in report
+
+
+def test_worker_thread_stage_is_not_overhead():
+    profiler = StageProfiler()
+    profiler.start(trace_memory=True)
+
+    with profiler.stage("prepare_messages"):
+        time.sleep(0.01)
+    for _ in range(2):
+        with profiler.stage("solve"):
+            pass
+    report = profiler.stop()
+
+    assert report["stages"]["prepare_messages"]["allocated"] is None
+    # Spread over the two requests, not over the three awaiting stages
+    assert report["overhead_per_request"] == 0.0
+
+
+def test_captures():
+    profiler = StageProfiler()
+    profiler.start(cprofile=True, trace_memory=True)
+
+    with profiler.stage("evaluate"):
+        data = [bytes(1024) for _ in range(100)]
+    with profiler.stage("solve"):
+        pass
+    report = profiler.stop(top=5)
+
+    assert data
+    assert report["stages"]["evaluate"]["allocated"] >= 100 * 1024
+    assert report["stages"]["solve"]["allocated"] is None
+    assert 0 < len(report["cprofile"]) <= 5
+    assert report["memory"]["peak"] >= 100 * 1024
+    assert len(report["memory"]["top"]) <= 5
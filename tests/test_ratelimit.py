@@ -0,0 +1,146 @@
+import httpx
+import pytest
+
+from riddle_benchmark.models.images import ImageCache
+from riddle_benchmark.ratelimit import (
+    DEFAULT_COMPLETION_TOKENS,
+    DEFAULT_IMAGE_TOKENS,
+    RateLimit,
+    RateLimiter,
+    RateLimiters,
+    TokenBucket,
+    estimate_image_tokens,
+    estimate_request_tokens,
+    get_retry_after,
+    parse_rate_limits,
+)
+from riddle_benchmark.utils import get_image_assets_path
+
+
+class FakeClock:
+    """Replaces time.monotonic and asyncio.sleep so that waits complete instantly."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.slept: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr("riddle_benchmark.ratelimit.time.monotonic", fake.monotonic)
+    monkeypatch.setattr("riddle_benchmark.ratelimit.asyncio.sleep", fake.sleep)
+    return fake
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.wait_time(60) == 0.0
+
+    bucket.consume(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+
+    clock.now += 30
+    assert bucket.wait_time(30) == 0.0
+    # Requests larger than the capacity only wait for a full bucket
+    assert bucket.wait_time(1000) == pytest.approx(30.0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_enforces_rpm(clock):
+    limiter = RateLimiter(RateLimit(rpm=60))
+    for _ in range(60):
+        await limiter.acquire(0)
+    assert clock.slept == []
+
+    await limiter.acquire(0)
+    assert sum(clock.slept) == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_enforces_tpm_and_reconciles(clock):
+    limiter = RateLimiter(RateLimit(tpm=6000))
+    await limiter.acquire(6000)
+
+    # The request used less than estimated, so the difference is available again
+    limiter.reconcile(estimated_tokens=6000, actual_tokens=1000)
+    await limiter.acquire(5000)
+    assert clock.slept == []
+
+    await limiter.acquire(100)
+    assert sum(clock.slept) == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_pause(clock):
+    limiter = RateLimiter(RateLimit(rpm=1000))
+    limiter.pause(7.0)
+    await limiter.acquire(0)
+    assert sum(clock.slept) == pytest.approx(7.0)
+
+
+def test_rate_limiters_registry():
+    limiters = RateLimiters(parse_rate_limits({"openai": {"rpm": 500}, "openai/gpt-5": {"tpm": 1000}}))
+
+    shared = limiters.for_model("openai/gpt-4o")
+    assert shared is not None
+    assert shared is limiters.for_model("openai/gpt-5-mini")
+
+    dedicated = limiters.for_model("openai/gpt-5")
+    assert dedicated is not None
+    assert dedicated is not shared
+    assert dedicated.rate_limit.tpm == 1000
+
+    assert limiters.for_model("gemini/gemini-2.5-pro") is None
+
+
+def _error_with_headers(headers: dict[str, str]) -> Exception:
+    error = Exception("rate limited")
+    error.response = httpx.Response(429, headers=headers)  # type: ignore[attr-defined]
+    return error
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after": "3"}, 3.0),
+        ({"Retry-After": "2.5"}, 2.5),
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({"retry-after": "100000"}, 120.0),  # Capped
+        ({}, None),
+    ],
+)
+def test_get_retry_after(headers, expected):
+    assert get_retry_after(_error_with_headers(headers)) == expected
+
+
+def test_get_retry_after_without_response():
+    assert get_retry_after(ValueError("bad")) is None
+
+
+def test_estimate_image_tokens():
+    data_url = ImageCache().get_data_url(get_image_assets_path() / "001.png")
+    # 960x540 -> 2x2 tiles of 512px
+    assert estimate_image_tokens(data_url) == 85 + 170 * 4
+    assert estimate_image_tokens("data:image/jpeg;base64,/9j/4AAQ") == DEFAULT_IMAGE_TOKENS
+
+
+def test_estimate_request_tokens():
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "abcdef"},
+                {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,/9j/4AAQ"}},
+            ],
+        }
+    ]
+    assert estimate_request_tokens(messages, {}) == 3 + DEFAULT_IMAGE_TOKENS + DEFAULT_COMPLETION_TOKENS
+    assert estimate_request_tokens(messages, {"max_tokens": 10}) == 3 + DEFAULT_IMAGE_TOKENS + 10
@@ -0,0 +1,116 @@
+import json
+from typing import Any
+
+import pytest
+
+from riddle_benchmark.evaluation.evaluator import Evaluator
+from riddle_benchmark.evaluation.rescore import find_reports, merge_reports, rescore_file, rescore_report
+
+
+def test_rescore_report():
+    answers = {"1": ["a", "b"], "2": ["c"]}
+    report: dict[str, Any] = {
+        "summary": {"model": "test-model", "accuracy": 0.0, "correct_answers": 0, "total_questions": 3},
+        "details": [
+            {"riddle_id": "1", "prediction": " B ", "acceptable_answers": ["a"], "is_correct": False},
+            {"riddle_id": "2", "error": "API Error", "is_correct": False},
+            # No longer in the metadata: the previous evaluation is kept
+            {"riddle_id": "3", "prediction": "x", "acceptable_answers": ["x"], "is_correct": True},
+        ],
+    }
+
+    rescore_report(report, answers, Evaluator.build_index(answers))
+
+    first = report["details"][0]
+    assert first["is_correct"] is True
+    assert first["normalized_prediction"] == "b"
+    assert first["acceptable_answers"] == ["a", "b"]
+    assert report["details"][1] == {"riddle_id": "2", "error": "API Error", "is_correct": False}
+    assert report["details"][2]["is_correct"] is True
+
+    summary = report["summary"]
+    assert summary["model"] == "test-model"
+    assert summary["correct_answers"] == 2
+    assert summary["total_questions"] == 3
+    assert summary["accuracy"] == 2 / 3
+    assert "rescored_at" in summary
+
+
+def test_rescore_report_samples():
+    answers = {"1": ["a"]}
+    report: dict[str, Any] = {
+        "summary": {"samples": 2},
+        "details": [
+            {"riddle_id": "1", "sample": 0, "prediction": "a", "is_correct": False},
+            {"riddle_id": "1", "sample": 1, "prediction": "b", "is_correct": False},
+        ],
+    }
+
+    summary = rescore_report(report, answers, Evaluator.build_index(answers))["summary"]
+
+    assert summary["correct_answers"] == 1
+    assert summary["total_samples"] == 2
+    assert summary["accuracy"] == 0.5
+    assert summary["pass_at_k"] == {"1": 0.5, "2": 1.0}
+
+
+def test_rescore_file(tmp_path):
+    answers = {"1": ["a"]}
+    path = tmp_path / "results_model_20250101_000000.json"
+    path.write_text(
+        json.dumps({"summary": {"accuracy": 0.0}, "details": [{"riddle_id": "1", "prediction": "A"}]}),
+        encoding="utf-8",
+    )
+
+    previous, report = rescore_file(path, answers, Evaluator.build_index(answers), tmp_path / "out" / path.name)
+
+    assert previous == {"accuracy": 0.0}
+    assert report["summary"]["accuracy"] == 1.0
+    with open(tmp_path / "out" / path.name, encoding="utf-8") as f:
+        assert json.load(f)["summary"]["accuracy"] == 1.0
+    # The original report is left untouched
+    assert json.loads(path.read_text(encoding="utf-8"))["summary"] == {"accuracy": 0.0}
+
+
+def test_find_reports(tmp_path):
+    (tmp_path / "results_a.json").write_text("{}")
+    (tmp_path / "results_b.json").write_text("{}")
+    (tmp_path / "results_b.jsonl").write_text("")
+    (tmp_path / "other.json").write_text("{}")
+
+    reports = find_reports([tmp_path, tmp_path / "other.json", tmp_path / "results_a.json"])
+
+    assert reports == [tmp_path / "other.json", tmp_path / "results_a.json", tmp_path / "results_b.json"]
+
+
+def test_merge_reports():
+    shards = [
+        {
+            "summary": {
+                "model": "test-model",
+                "parameters": {"selection": {"shard": [i, 2], "seed": 0}},
+                "metrics": {"elapsed": 2.0 + i},
+            },
+            "details": [
+                {"riddle_id": riddle_id, "is_correct": riddle_id == "1", "metrics": {"latency": 1.0}}
+                for riddle_id in riddle_ids
+            ],
+        }
+        for i, riddle_ids in enumerate([["1", "3"], ["2"]])
+    ]
+
+    merged = merge_reports(shards)
+
+    assert [record["riddle_id"] for record in merged["details"]] == ["1", "2", "3"]
+    summary = merged["summary"]
+    assert summary["model"] == "test-model"
+    assert summary["parameters"]["selection"] == {"seed": 0}
+    assert summary["total_questions"] == 3
+    assert summary["correct_answers"] == 1
+    assert summary["metrics"]["elapsed"] == 3.0
+    assert summary["merged_from"] == 2
+
+
+def test_merge_reports_different_models():
+    with pytest.raises(ValueError):
+        merge_reports([{"summary": {"model": "a"}}, {"summary": {"model": "b"}}])
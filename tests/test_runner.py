@@ -1,11 +1,17 @@
+import asyncio
 import json
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from riddle_benchmark.budget import SpendBudget, SpendTracker
+from riddle_benchmark.dataset.preprocess import ImagePreprocessor, ImageVariant
 from riddle_benchmark.dataset.schema import Riddle
+from riddle_benchmark.journal import ResultJournal, completed_records, load_journal
+from riddle_benchmark.models.errors import BudgetExceededError
 from riddle_benchmark.models.schemas import SimpleResponse
+from riddle_benchmark.profiling import get_profiler
 from riddle_benchmark.runner import BenchmarkRunner
 
 
@@ -17,14 +23,19 @@ def mock_riddles():
     ]
 
 
+def _stream(mock_loader: MagicMock, riddles: list[Riddle]) -> None:
+    """Make the mocked loader stream the riddles, as the runner does not load them all up front."""
+    mock_loader.iter_load.side_effect = lambda: iter(riddles)
+    mock_loader.count.return_value = len(riddles)
+
+
 @patch("riddle_benchmark.runner.DataLoader")
 @patch("riddle_benchmark.runner.Model")
-@patch("riddle_benchmark.runner.Evaluator")
 @pytest.mark.asyncio
-async def test_runner_run(mock_evaluator, mock_model_class, mock_loader_class, mock_riddles):
+async def test_runner_run(mock_model_class, mock_loader_class, mock_riddles):
     # Setup mocks
     mock_loader = mock_loader_class.return_value
-    mock_loader.load.return_value = mock_riddles
+    _stream(mock_loader, mock_riddles)
 
     mock_model = mock_model_class.return_value
     # First riddle correct, second incorrect
@@ -42,23 +53,6 @@ async def test_runner_run(mock_evaluator, mock_model_class, mock_loader_class, m
     mock_model.solve = mock_solve
     mock_model.kwargs = {"temperature": 0.7}  # Mock kwargs for summary
 
-    # Mock evaluate to return True if prediction matches acceptable_answers
-    # Note: evaluate is a classmethod, so when called as Evaluator.evaluate(prediction, riddle),
-    # Python automatically passes cls as the first argument, so we get (cls, prediction, riddle)
-    def mock_evaluate(*args, **kwargs):
-        # When called as Evaluator.evaluate(prediction, riddle), args is (cls, prediction, riddle)
-        # But when mocked, the mock might not pass cls, so handle both cases
-        if len(args) == 2:
-            prediction, riddle = args
-        else:
-            cls, prediction, riddle = args
-        return prediction in riddle.acceptable_answers
-
-    # Use side_effect to properly handle the classmethod call
-    mock_evaluator.evaluate.side_effect = mock_evaluate
-    # normalize is a staticmethod
-    mock_evaluator.normalize = lambda x: x  # Identity for test
-
     # Initialize runner
     runner = BenchmarkRunner(model_name="test-model", temperature=0.7, prompt="SysPrompt")
 
@@ -66,7 +60,16 @@ async def test_runner_run(mock_evaluator, mock_model_class, mock_loader_class, m
     results = await runner.run()
 
     # Verify model initialization
-    mock_model_class.assert_called_with("test-model", temperature=0.7)
+    mock_model_class.assert_called_with(
+        "test-model",
+        response_cache=None,
+        rate_limiter=None,
+        prompt_cache=False,
+        policy=None,
+        deduplicator=None,
+        spend=None,
+        temperature=0.7,
+    )
 
     # Verify results structure
     assert "summary" in results
@@ -84,11 +87,18 @@ async def test_runner_run(mock_evaluator, mock_model_class, mock_loader_class, m
     detail_2 = next(d for d in details if d["riddle_id"] == "2")
 
     assert detail_1["is_correct"] is True
+    assert detail_1["normalized_prediction"] == "a1"
     assert detail_2["is_correct"] is False
 
     # Verify summary matches details
     assert summary["correct_answers"] == 1
     assert summary["accuracy"] == 0.5
+
+    # Every record carries its request metrics, aggregated in the summary
+    assert detail_1["metrics"]["latency"] >= 0
+    assert detail_1["metrics"]["queue_wait"] >= 0
+    assert summary["metrics"]["requests"] == 2
+    assert summary["metrics"]["latency"]["p50"] is not None
     # difficulty/category checks removed
 
 
@@ -98,7 +108,7 @@ async def test_runner_run(mock_evaluator, mock_model_class, mock_loader_class, m
 async def test_runner_error_handling(mock_model_class, mock_loader_class, mock_riddles):
     # Setup mocks
     mock_loader = mock_loader_class.return_value
-    mock_loader.load.return_value = [mock_riddles[0]]
+    _stream(mock_loader, [mock_riddles[0]])
 
     mock_model = mock_model_class.return_value
 
@@ -122,6 +132,80 @@ async def test_runner_error_handling(mock_model_class, mock_loader_class, mock_r
     assert summary["accuracy"] == 0.0
 
 
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_runner_marks_unfinished_riddles(mock_model_class, mock_loader_class, mock_riddles, tmp_path):
+    _stream(mock_loader_class.return_value, mock_riddles)
+
+    async def mock_solve(riddle, *args, **kwargs):
+        if riddle.id == "2":
+            raise BudgetExceededError("Spend budget exhausted")
+        return SimpleResponse(answer="a1")
+
+    spend = SpendTracker(SpendBudget(max_cost=1.0))
+    mock_model = mock_model_class.return_value
+    mock_model.solve = mock_solve
+    mock_model.kwargs = {}
+    mock_model.spend = spend
+
+    runner = BenchmarkRunner(model_name="test-model", spend=spend)
+    with ResultJournal(tmp_path / "run.jsonl") as journal:
+        results = await runner.run(journal=journal)
+
+    # The records were streamed to the journal and are read back from it
+    assert "details" not in results
+    assert runner.results == []
+    details = {record["riddle_id"]: record for record in runner.details()}
+    assert "unfinished" not in details["1"]
+    assert details["2"]["unfinished"] is True
+    assert results["summary"]["budget"]["unfinished"] == 1
+    # Unfinished riddles are solved again when the run is resumed
+    assert set(completed_records(load_journal(tmp_path / "run.jsonl"))) == {("1", 0)}
+
+
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_runner_measures_queue_wait(mock_model_class, mock_loader_class):
+    riddles = [Riddle(id=str(i), image_path=Path(f"{i}.png"), acceptable_answers=["a"]) for i in range(3)]
+    _stream(mock_loader_class.return_value, riddles)
+
+    async def mock_solve(riddle, *args, **kwargs):
+        await asyncio.sleep(0.05)
+        return SimpleResponse(answer="a")
+
+    mock_model_class.return_value.solve = mock_solve
+    mock_model_class.return_value.kwargs = {}
+
+    results = await BenchmarkRunner(model_name="test-model").run(concurrency=1)
+
+    # With one worker, the last riddle waits in the queue while the first two are solved
+    waits = sorted(record["metrics"]["queue_wait"] for record in results["details"])
+    assert waits[-1] >= 0.09
+
+
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_runner_profiles_message_preparation_once_per_riddle(mock_model_class, mock_loader_class, mock_riddles):
+    _stream(mock_loader_class.return_value, mock_riddles)
+    mock_model_class.return_value.solve = AsyncMock(return_value=SimpleResponse(answer="a1"))
+    mock_model_class.return_value.build_messages.return_value = []
+    mock_model_class.return_value.kwargs = {}
+
+    profiler = get_profiler()
+    profiler.start()
+    try:
+        await BenchmarkRunner(model_name="test-model").run(samples=2)
+    finally:
+        stages = profiler.stop()["stages"]
+
+    # Timed on the event loop around the worker thread, not inside it
+    assert stages["prepare_messages"]["count"] == 2
+    assert stages["solve"]["count"] == 4
+
+
 def test_save_report(tmp_path):
     runner = BenchmarkRunner(model_name="test")
     # Manually populate results/summary to test save
@@ -136,3 +220,153 @@ def test_save_report(tmp_path):
         data = json.load(f)
         assert data["summary"] == {"test": "summary"}
         assert data["details"] == [{"test": "result"}]
+
+
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_runner_resume(mock_model_class, mock_loader_class, mock_riddles, tmp_path):
+    _stream(mock_loader_class.return_value, mock_riddles)
+
+    solved: list[str] = []
+
+    async def mock_solve(riddle, *args, **kwargs):
+        solved.append(riddle.id)
+        return SimpleResponse(answer="a2")
+
+    mock_model_class.return_value.solve = mock_solve
+    mock_model_class.return_value.kwargs = {}
+
+    resumed = {("1", 0): {"riddle_id": "1", "prediction": "a1", "is_correct": True}}
+    journal_path = tmp_path / "results.jsonl"
+    runner = BenchmarkRunner(model_name="test-model")
+    with ResultJournal(journal_path) as journal:
+        results = await runner.run(journal=journal, resumed=resumed)
+
+    # Only the riddle without an answer is solved again
+    assert solved == ["2"]
+    # The resumed record is reported with the new one
+    assert [d["riddle_id"] for d in runner.details()] == ["1", "2"]
+    assert results["summary"]["total_questions"] == 2
+    assert results["summary"]["correct_answers"] == 2
+
+    # Newly solved riddles are appended to the journal
+    assert list(load_journal(journal_path)) == [("2", 0)]
+
+
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_runner_samples(mock_model_class, mock_loader_class, mock_riddles):
+    _stream(mock_loader_class.return_value, mock_riddles)
+
+    mock_model = mock_model_class.return_value
+    mock_model.build_messages.side_effect = lambda riddle, prompt: [{"riddle": riddle.id}]
+    calls: list[tuple[str, int]] = []
+
+    async def mock_solve(riddle, *args, messages=None, sample=0, **kwargs):
+        assert messages == [{"riddle": riddle.id}]
+        calls.append((riddle.id, sample))
+        # Riddle 1 is solved by every other sample, riddle 2 never
+        return SimpleResponse(answer="a1" if riddle.id == "1" and sample % 2 == 0 else "wrong")
+
+    mock_model.solve = mock_solve
+    mock_model.kwargs = {}
+
+    runner = BenchmarkRunner(model_name="test-model")
+    results = await runner.run(samples=4)
+
+    assert sorted(calls) == [(riddle_id, sample) for riddle_id in ["1", "2"] for sample in range(4)]
+    # Messages are built once per riddle and shared by its samples
+    assert mock_model.build_messages.call_count == 2
+
+    details = results["details"]
+    assert [(d["riddle_id"], d["sample"]) for d in details] == sorted(calls)
+
+    summary = results["summary"]
+    assert summary["samples"] == 4
+    assert summary["total_samples"] == 8
+    assert summary["correct_answers"] == 2
+    assert summary["accuracy"] == 0.25
+    assert summary["solve_rate"] == {"1": 0.5, "2": 0.0}
+    assert summary["pass_at_k"]["1"] == 0.25
+    assert summary["pass_at_k"]["4"] == 0.5
+    low, high = summary["accuracy_ci"]
+    assert 0.0 <= low <= 0.25 <= high <= 0.5
+
+
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_runner_streams_riddles(mock_model_class, mock_loader_class):
+    riddles = [
+        Riddle(id=f"{i:03d}", image_path=Path(f"img{i}.png"), question="q", acceptable_answers=["a"]) for i in range(50)
+    ]
+    produced = 0
+
+    def iter_load():
+        nonlocal produced
+        for riddle in riddles:
+            produced += 1
+            yield riddle
+
+    mock_loader_class.return_value.iter_load.side_effect = iter_load
+    mock_loader_class.return_value.count.return_value = len(riddles)
+
+    mock_model = mock_model_class.return_value
+    mock_model.build_messages.side_effect = lambda riddle, prompt: [{"riddle": riddle.id}]
+    mock_model.kwargs = {}
+    solved = 0
+    max_ahead = 0
+
+    async def mock_solve(riddle, *args, **kwargs):
+        nonlocal solved, max_ahead
+        # Riddles read from the loader but not solved yet are queued or in flight
+        max_ahead = max(max_ahead, produced - solved)
+        await asyncio.sleep(0)
+        solved += 1
+        return SimpleResponse(answer="a")
+
+    mock_model.solve = mock_solve
+
+    runner = BenchmarkRunner(model_name="test-model")
+    results = await runner.run(concurrency=2)
+
+    assert results["summary"]["total_questions"] == 50
+    assert results["summary"]["correct_answers"] == 50
+    assert [d["riddle_id"] for d in results["details"]] == [riddle.id for riddle in riddles]
+    # Two workers and a queue of four: the loader is never read far ahead of the solved riddles
+    assert max_ahead <= 2 + 4 + 1
+
+
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_runner_image_preprocessor(mock_model_class, mock_loader_class, tmp_path):
+    image_path = tmp_path / "img1.png"
+    image_path.write_bytes(b"\x89PNG\r\n\x1a\n source")
+    riddle = Riddle(id="1", image_path=image_path, question="q1", acceptable_answers=["a1"])
+    _stream(mock_loader_class.return_value, [riddle])
+
+    mock_model = mock_model_class.return_value
+    mock_model.build_messages.side_effect = lambda riddle, prompt: [
+        {"role": "user", "content": [{"type": "image_url", "image_url": {"url": f"data:,{riddle.image_path.name}"}}]}
+    ]
+    mock_model.kwargs = {}
+
+    async def mock_solve(*args, **kwargs):
+        return SimpleResponse(answer="a1")
+
+    mock_model.solve = mock_solve
+    preprocessor = ImagePreprocessor(ImageVariant(max_edge=64), cache_dir=None)
+
+    with patch.object(preprocessor, "derive", return_value=b"\x89PNG\r\n\x1a\n derived") as derive:
+        runner = BenchmarkRunner(model_name="test-model", image_preprocessor=preprocessor)
+        results = await runner.run()
+
+    derive.assert_called_once_with(image_path.read_bytes())
+    # The messages are built from the derived image, renamed after the variant
+    assert mock_model.build_messages.call_args.args[0].image_path.name == "img1.max64.png"
+    assert results["details"][0]["metrics"]["image_bytes"] == len("data:,img1.max64.png")
+    assert results["summary"]["parameters"]["image_variant"] == "max64"
+    assert results["summary"]["metrics"]["image_bytes"] == len("data:,img1.max64.png")
@@ -0,0 +1,259 @@
+import asyncio
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from riddle_benchmark.dataset.schema import Riddle
+from riddle_benchmark.models.schemas import SimpleResponse
+from riddle_benchmark.sweep import (
+    SweepGrid,
+    SweepModel,
+    SweepRunner,
+    build_sweep_models,
+    load_sweep_grid,
+    supports_reasoning_effort,
+)
+from riddle_benchmark.utils import get_provider
+
+
+@pytest.mark.parametrize(
+    "model_name, expected",
+    [
+        ("openai/gpt-4o", False),
+        ("openai/gpt-5-2025-08-07", True),
+        ("gemini/gemini-2.5-pro", True),
+        ("bedrock/global.anthropic.claude-opus-4-5-20251101-v1:0", True),
+    ],
+)
+def test_supports_reasoning_effort(model_name, expected):
+    assert supports_reasoning_effort(model_name) is expected
+
+
+def test_get_provider():
+    assert get_provider("gemini/gemini-2.5-pro") == "gemini"
+    assert get_provider("bedrock/global.anthropic.claude-haiku-4-5-20251001-v1:0") == "bedrock"
+    assert get_provider("gpt-4o") == "default"
+
+
+def test_build_sweep_models():
+    sweep_models = build_sweep_models(
+        ["openai/gpt-4o", "openai/gpt-5"],
+        reasoning_effort="high",
+        extra_params={"temperature": 1.0},
+        model_params={"openai/gpt-5": {"temperature": 0.5}},
+    )
+
+    assert sweep_models == [
+        SweepModel(model="openai/gpt-4o", extra_params={"temperature": 1.0}),
+        SweepModel(model="openai/gpt-5", extra_params={"temperature": 0.5, "reasoning_effort": "high"}),
+    ]
+
+
+def test_build_sweep_models_without_params():
+    sweep_models = build_sweep_models(["openai/gpt-5"], reasoning_effort="none")
+    assert sweep_models == [SweepModel(model="openai/gpt-5", extra_params=None)]
+
+
+def test_sweep_grid_expand():
+    grid = SweepGrid(
+        models=["openai/gpt-5", "openai/gpt-4o"],
+        prompts=["1", "2"],
+        extra_params=[{"reasoning_effort": "low"}, {"reasoning_effort": "high"}],
+        model_params={"openai/gpt-5": {"temperature": 1.0}},
+    )
+
+    cells = grid.expand()
+
+    assert len(cells) == 8
+    assert cells[0] == SweepModel(
+        model="openai/gpt-5",
+        extra_params={"reasoning_effort": "low", "temperature": 1.0},
+        prompt_id="1",
+        use_reason=False,
+        label="openai/gpt-5__p1__reasoning_effort-low",
+    )
+    # Every cell keeps a distinct label, even when its parameters are dropped
+    assert len({cell.name for cell in cells}) == 8
+    gpt_4o = [cell for cell in cells if cell.model == "openai/gpt-4o"]
+    assert all(cell.extra_params is None for cell in gpt_4o)
+    assert gpt_4o[1].label == "openai/gpt-4o__p1__reasoning_effort-high"
+
+
+def test_load_sweep_grid(tmp_path):
+    path = tmp_path / "grid.json"
+    path.write_text('{"models": ["openai/a"], "reason": [false, true]}')
+
+    cells = load_sweep_grid(path).expand()
+
+    assert [cell.name for cell in cells] == ["openai/a__noreason", "openai/a__reason"]
+    assert all(cell.prompt_id == "2" for cell in cells)
+
+
+@patch("riddle_benchmark.sweep.DataLoader")
+def test_sweep_runner_deduplicates_repeated_models(mock_loader_class):
+    # Only cells of the same model can send identical requests
+    assert SweepRunner([SweepModel(model="openai/a"), SweepModel(model="openai/b")]).deduplicator is None
+
+    sweep = SweepRunner(
+        [SweepModel(model="openai/a", label="openai/a__x"), SweepModel(model="openai/a", label="openai/a__y")]
+    )
+    assert sweep.deduplicator is not None
+    assert [runner.label for runner in sweep.runners] == ["openai/a__x", "openai/a__y"]
+    assert all(runner.model.deduplicator is sweep.deduplicator for runner in sweep.runners)
+
+
+@patch("riddle_benchmark.runner.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_sweep_runner_runs_models_concurrently(mock_model_class, mock_loader_class):
+    riddles = [Riddle(id=str(i), image_path=Path(f"{i}.png"), acceptable_answers=["a"]) for i in range(6)]
+    mock_loader_class.return_value.iter_load.side_effect = lambda: iter(riddles)
+    mock_loader_class.return_value.count.return_value = len(riddles)
+
+    in_flight: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def mock_solve(riddle, *args, **kwargs):
+        in_flight["openai"] = in_flight.get("openai", 0) + 1
+        peak["openai"] = max(peak.get("openai", 0), in_flight["openai"])
+        await asyncio.sleep(0.01)
+        in_flight["openai"] -= 1
+        return SimpleResponse(answer="a")
+
+    mock_model_class.return_value.solve = mock_solve
+    mock_model_class.return_value.kwargs = {}
+
+    sweep = SweepRunner(
+        [SweepModel(model="openai/a"), SweepModel(model="openai/b")],
+        provider_limits={"openai": 3},
+    )
+    outcomes = await sweep.run()
+
+    # Each runner streams the riddles instead of the sweep loading them all
+    assert mock_loader_class.return_value.iter_load.call_count == 2
+
+    assert len(outcomes) == 2
+    for outcome in outcomes:
+        assert isinstance(outcome, dict)
+        assert outcome["summary"]["accuracy"] == 1.0
+
+    # Both models share the provider limit
+    assert peak["openai"] == 3
+
+
+@patch("riddle_benchmark.sweep.DataLoader")
+@patch("riddle_benchmark.sweep.BenchmarkRunner")
+@pytest.mark.asyncio
+async def test_sweep_runner_isolates_failures(mock_runner_class, mock_loader_class):
+    mock_loader_class.return_value.load.return_value = []
+
+    async def mock_run(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    mock_runner_class.return_value.run = mock_run
+    mock_runner_class.return_value.model_name = "openai/a"
+
+    sweep = SweepRunner([SweepModel(model="openai/a")])
+    outcomes = await sweep.run()
+
+    assert isinstance(outcomes[0], RuntimeError)
+
+
+@patch("riddle_benchmark.sweep.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_sweep_runner_compare_stops_early(mock_model_class, mock_loader_class):
+    riddles = [Riddle(id=str(i), image_path=Path(f"{i}.png"), acceptable_answers=["a"]) for i in range(100)]
+    mock_loader_class.return_value.load.return_value = riddles
+
+    # Model "strong" solves every riddle and "weak" none: the comparison is clear-cut
+    models = {}
+
+    def make_model(model_name, **kwargs):
+        model = MagicMock(kwargs={})
+
+        async def solve(riddle, *args, stats, **kwargs):
+            stats.attempts = 1
+            return SimpleResponse(answer="a" if model_name == "openai/strong" else "b")
+
+        model.solve = solve
+        models[model_name] = model
+        return model
+
+    mock_model_class.side_effect = make_model
+
+    sweep = SweepRunner([SweepModel(model="openai/strong"), SweepModel(model="openai/weak")])
+    reports, comparison = await sweep.compare(confidence=0.95, batch_size=5)
+
+    assert comparison["stopped_early"] is True
+    assert comparison["riddles_used"] == 10
+    assert comparison["requests"] == 20
+    (pair,) = comparison["pairs"]
+    assert pair["decided"] is True
+    assert pair["winner"] == "openai/strong"
+    assert pair["wins"] == 10
+
+    assert [report["summary"]["total_questions"] for report in reports] == [10, 10]
+    assert reports[0]["summary"]["accuracy"] == 1.0
+    assert reports[1]["summary"]["accuracy"] == 0.0
+    assert reports[0]["summary"]["metrics"]["requests"] == 10
+
+
+@patch("riddle_benchmark.sweep.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_sweep_runner_compare_ignores_errors(mock_model_class, mock_loader_class):
+    riddles = [Riddle(id=str(i), image_path=Path(f"{i}.png"), acceptable_answers=["a"]) for i in range(20)]
+    mock_loader_class.return_value.load.return_value = riddles
+
+    def make_model(model_name, **kwargs):
+        model = MagicMock(kwargs={})
+
+        async def solve(riddle, *args, stats, **kwargs):
+            stats.attempts = 1
+            if model_name == "openai/broken":
+                raise RuntimeError("down")
+            return SimpleResponse(answer="a")
+
+        model.solve = solve
+        return model
+
+    mock_model_class.side_effect = make_model
+
+    sweep = SweepRunner([SweepModel(model="openai/strong"), SweepModel(model="openai/broken")])
+    # Answers of a previous run are reused and not counted as requests
+    resumed = {"openai/strong": {("0", 0): {"riddle_id": "0", "prediction": "a", "is_correct": True}}}
+    reports, comparison = await sweep.compare(batch_size=5, seed=1, resumed=resumed)
+
+    # Failed requests are not losses of the broken model: nothing is paired
+    (pair,) = comparison["pairs"]
+    assert (pair["wins"], pair["losses"], pair["decided"]) == (0, 0, False)
+    assert comparison["riddles_used"] == 20
+    assert comparison["requests"] == 19 + 20
+    # One run per model over all the batches
+    assert reports[0]["summary"]["metrics"]["requests"] == 19
+    assert reports[0]["summary"]["correct_answers"] == 20
+
+
+@patch("riddle_benchmark.sweep.DataLoader")
+@patch("riddle_benchmark.runner.Model")
+@pytest.mark.asyncio
+async def test_sweep_runner_compare_exhausts_budget(mock_model_class, mock_loader_class):
+    riddles = [Riddle(id=str(i), image_path=Path(f"{i}.png"), acceptable_answers=["a"]) for i in range(6)]
+    mock_loader_class.return_value.load.return_value = riddles
+
+    async def solve(riddle, *args, **kwargs):
+        return SimpleResponse(answer="a")
+
+    mock_model_class.return_value.solve = solve
+    mock_model_class.return_value.kwargs = {}
+
+    sweep = SweepRunner([SweepModel(model="openai/a"), SweepModel(model="openai/b")])
+    reports, comparison = await sweep.compare(batch_size=4)
+
+    # Identical models are never decided: every riddle is used
+    assert comparison["stopped_early"] is False
+    assert comparison["riddles_used"] == 6
+    assert comparison["pairs"][0]["decided"] is False
+    assert "winner" not in comparison["pairs"][0]
@@ -0,0 +1,150 @@
+import json
+from pathlib import Path
+from typing import Any
+
+from riddle_benchmark.runner import BenchmarkRunner
+from riddle_benchmark.utils import load_prompt
+from riddle_benchmark.warehouse import ResultsWarehouse, prompt_id
+
+
+def _report(
+    model: str,
+    correct: list[bool],
+    prompt: str | None = "p",
+    timestamp: str = "2025-01-01T00:00:00",
+    extra_params: dict[str, Any] | None = None,
+    selection: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    return {
+        "summary": {
+            "model": model,
+            "timestamp": timestamp,
+            "parameters": {"use_reason": False, "prompt": prompt, "extra_params": extra_params, "selection": selection},
+            "total_questions": len(correct),
+            "correct_answers": sum(correct),
+            "accuracy": sum(correct) / len(correct),
+            "metrics": {"elapsed": 1.0, "total_cost": 0.01},
+        },
+        "details": [
+            {
+                "riddle_id": str(i),
+                "prediction": "a",
+                "is_correct": is_correct,
+                "metrics": {"latency": 1.0 + i, "prompt_tokens": 10},
+            }
+            for i, is_correct in enumerate(correct)
+        ],
+    }
+
+
+def _write(path: Path, report: dict[str, Any]) -> Path:
+    path.write_text(json.dumps(report), encoding="utf-8")
+    return path
+
+
+def test_ingest_skips_unchanged_files(tmp_path):
+    first = _write(tmp_path / "results_a.json", _report("model-a", [True, False]))
+    second = _write(tmp_path / "results_b.json", _report("model-b", [True, True]))
+
+    with ResultsWarehouse(tmp_path / "results.db") as warehouse:
+        assert warehouse.ingest_files([first, second]) == (2, 0)
+        assert warehouse.ingest_files([first, second]) == (0, 2)
+
+        rows = warehouse.leaderboard()
+
+    assert [row["model"] for row in rows] == ["model-b", "model-a"]
+    assert rows[1]["accuracy"] == 0.5
+    assert rows[1]["correct_answers"] == 1
+    assert rows[1]["total_cost"] == 0.01
+    assert rows[1]["mean_latency"] == 1.5
+    assert rows[1]["runs_count"] == 1
+
+
+def test_ingest_replaces_rewritten_file(tmp_path):
+    path = _write(tmp_path / "results_a.json", _report("model-a", [False, False]))
+    db_path = tmp_path / "results.db"
+
+    with ResultsWarehouse(db_path) as warehouse:
+        assert warehouse.ingest_file(path)
+    # e.g. the report was re-scored in place
+    _write(path, _report("model-a", [True, False]))
+    with ResultsWarehouse(db_path) as warehouse:
+        assert warehouse.ingest_file(path)
+        rows = warehouse.leaderboard()
+
+    assert len(rows) == 1
+    assert rows[0]["accuracy"] == 0.5
+    assert rows[0]["runs_count"] == 1
+
+
+def test_ingest_skips_invalid_files(tmp_path):
+    path = tmp_path / "results_broken.json"
+    path.write_text("{", encoding="utf-8")
+
+    with ResultsWarehouse(tmp_path / "results.db") as warehouse:
+        assert warehouse.ingest_files([path, tmp_path / "missing.json"]) == (0, 2)
+
+
+def test_leaderboard_latest_run_per_configuration(tmp_path):
+    with ResultsWarehouse(tmp_path / "results.db") as warehouse:
+        warehouse.add_report(_report("model-a", [True], timestamp="2025-01-01T00:00:00"), "h1")
+        warehouse.add_report(_report("model-a", [False], timestamp="2025-02-01T00:00:00"), "h2")
+        warehouse.add_report(_report("model-a", [True], prompt="q"), "h3")
+        warehouse.add_report(_report("model-a", [True], extra_params={"temperature": 0, "top_p": 1}), "h4")
+        warehouse.add_report(_report("model-a", [True, False], extra_params={"top_p": 1, "temperature": 0}), "h5")
+        warehouse.add_report(_report("other", [True]), "h6")
+
+        rows = warehouse.leaderboard(model="model-%")
+        limited = warehouse.leaderboard(limit=1)
+
+    assert [(row["prompt_id"], row["extra_params"], row["accuracy"], row["runs_count"]) for row in rows] == [
+        (prompt_id("q"), "{}", 1.0, 1),
+        (prompt_id("p"), '{"temperature": 0, "top_p": 1}', 0.5, 2),
+        (prompt_id("p"), "{}", 0.0, 2),
+    ]
+    assert len(limited) == 1
+
+
+def test_leaderboard_ranks_partial_selections_separately(tmp_path):
+    with ResultsWarehouse(tmp_path / "results.db") as warehouse:
+        warehouse.add_report(_report("model-a", [True, False, True, True], selection={"seed": 0}), "h1")
+        # A later smoke test on a few riddles and a shard do not replace the full run
+        warehouse.add_report(
+            _report("model-a", [False], timestamp="2025-02-01T00:00:00", selection={"seed": 0, "limit": 1}), "h2"
+        )
+        warehouse.add_report(
+            _report("model-a", [True, True], timestamp="2025-02-01T00:00:00", selection={"shard": [0, 2]}), "h3"
+        )
+        # Only the latest run over the whole dataset is shown for it
+        warehouse.add_report(_report("model-a", [True, True, True, False], timestamp="2025-03-01T00:00:00"), "h4")
+
+        rows = warehouse.leaderboard()
+
+    assert [(row["selection"], row["accuracy"], row["runs_count"]) for row in rows] == [
+        ('{"shard": [0, 2]}', 1.0, 1),
+        ("{}", 0.75, 2),
+        ('{"limit": 1}', 0.0, 1),
+    ]
+
+
+def test_prompt_id():
+    assert prompt_id(None) == "0"
+    assert prompt_id(load_prompt("2")) == "2"
+    assert prompt_id("custom\n") == prompt_id("custom\n") != prompt_id("other\n")
+    assert prompt_id("custom\n").startswith("#")
+    assert len(prompt_id("custom\n")) == 9
+
+
+def test_save_report_adds_to_warehouse(tmp_path):
+    runner = BenchmarkRunner(model_name="test")
+    runner.summary = _report("test", [True])["summary"]
+    runner.results = _report("test", [True])["details"]
+    output_path = tmp_path / "results_test.json"
+
+    with ResultsWarehouse(tmp_path / "results.db") as warehouse:
+        runner.save_report(output_path, warehouse)
+        # The saved file is recognized as already stored
+        assert not warehouse.ingest_file(output_path)
+        rows = warehouse.leaderboard()
+
+    assert [row["model"] for row in rows] == ["test"]